@@ -0,0 +1,174 @@
+"""
+Memory held by the discord.py caches under each cache profile of
+pururu.infrastructure.adapters.discord.cache_profile. A long run of gateway traffic (guild create, voice joins, leaves,
+moves and mute toggles of every member, plus chat messages when the profile subscribes to them) is parsed by the client
+connection state, as the gateway would deliver it, and tracemalloc samples the memory traced at regular checkpoints.
+
+Run from src/: python -m benchmarks.discord_cache_memory --members 5000 --voice 300 --players 20 --events 100000
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import random
+import tracemalloc
+from unittest.mock import patch
+
+import discord
+
+import benchmarks.generators as generators
+import pururu.utils as utils
+from pururu.application.services.guild_registry import GuildContext, GuildRegistry, GuildSettings
+from pururu.infrastructure.adapters.discord.cache_profile import DEFAULT, LEAN
+from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
+
+GUILD_ID = 1000
+BOT_ID = 1
+FIRST_USER_ID = 10  # member0, the first player of generators.build_players
+TEXT_CHANNEL_ID = 2000
+VOICE_CHANNEL_IDS = [3000 + i for i in range(5)]
+JOINED_AT = "2024-01-01T00:00:00+00:00"
+
+
+class CountingHandler:
+    """
+    Guild handler only counting the voice updates that pass the pre-filter
+    """
+
+    def __init__(self):
+        self.updates = 0
+
+    def handle_voice_state_update_dc_event(self, member: str, before_channel: str, after_channel: str) -> None:
+        self.updates += 1
+
+
+def user_payload(user_id: int) -> dict:
+    name = f"member{user_id - FIRST_USER_ID}" if user_id >= FIRST_USER_ID else f"bot{user_id}"
+    return {"id": str(user_id), "username": name, "discriminator": "0", "avatar": None, "global_name": None}
+
+
+def member_payload(user_id: int) -> dict:
+    return {"user": user_payload(user_id), "roles": [], "joined_at": JOINED_AT, "deaf": False, "mute": False,
+            "flags": 0}
+
+
+def voice_state_payload(user_id: int, channel_id: int | None, self_mute: bool) -> dict:
+    return {"guild_id": str(GUILD_ID), "channel_id": str(channel_id) if channel_id else None, "user_id": str(user_id),
+            "session_id": f"session{user_id}", "deaf": False, "mute": False, "self_deaf": False,
+            "self_mute": self_mute, "self_video": False, "suppress": False, "request_to_speak_timestamp": None,
+            "member": member_payload(user_id)}
+
+
+def guild_payload(members: int, in_voice: dict[int, int]) -> dict:
+    """
+    GUILD_CREATE of a large guild: Discord only sends the members in a voice channel and the bot itself
+    """
+    channels = [{"id": str(TEXT_CHANNEL_ID), "type": 0, "name": "general", "position": 0,
+                 "permission_overwrites": []}]
+    channels += [{"id": str(channel_id), "type": 2, "name": f"voice{i}", "position": i + 1, "bitrate": 64000,
+                  "user_limit": 0, "permission_overwrites": []} for i, channel_id in enumerate(VOICE_CHANNEL_IDS)]
+    voice_states = [voice_state_payload(user_id, channel_id, False) for user_id, channel_id in in_voice.items()]
+    for voice_state in voice_states:
+        del voice_state["member"]
+    return {"id": str(GUILD_ID), "name": "guild", "icon": None, "owner_id": str(BOT_ID), "features": [],
+            "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False}],
+            "emojis": [], "stickers": [], "member_count": members, "large": members > 250, "unavailable": False,
+            "channels": channels, "voice_states": voice_states,
+            "members": [member_payload(BOT_ID)] + [member_payload(user_id) for user_id in in_voice]}
+
+
+def message_payload(message_id: int, user_id: int, rng: random.Random) -> dict:
+    return {"id": str(message_id), "channel_id": str(TEXT_CHANNEL_ID), "guild_id": str(GUILD_ID),
+            "author": user_payload(user_id), "member": {"roles": [], "joined_at": JOINED_AT, "deaf": False,
+                                                        "mute": False, "flags": 0},
+            "content": "".join(rng.choice("abcdefghij ") for _ in range(rng.randint(10, 200))),
+            "timestamp": JOINED_AT, "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0}
+
+
+async def run(profile: str, members: int, voice: int, players: int, events: int, checkpoints: int,
+              seed: int) -> tuple[list[int], int, int]:
+    """
+    :return: traced bytes at each checkpoint, traced peak and voice updates passed to the guild handler
+    """
+    rng = random.Random(seed)
+    message_rng = random.Random(seed + 1)  # the voice traffic is the same whatever the profile subscribes to
+    user_ids = list(range(FIRST_USER_ID, FIRST_USER_ID + members))
+    in_voice = {user_id: rng.choice(VOICE_CHANNEL_IDS) for user_id in rng.sample(user_ids, voice)}
+    handler = CountingHandler()
+    registry = GuildRegistry()
+    registry.register(GuildContext(GuildSettings(GUILD_ID, generators.build_players(players), "", {}), handler))
+
+    gc.collect()
+    tracemalloc.start()
+    with patch("pururu.config.DISCORD_CACHE_PROFILE", profile):
+        bot = PururuDiscordBot(registry)
+    await bot._async_setup_hook()  # binds the client to the running loop, as login does
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+    state.parse_guild_create(guild_payload(members, in_voice))
+
+    sizes = []
+    for event in range(1, events + 1):
+        if bot.intents.guild_messages and message_rng.random() < 0.3:
+            state.parse_message_create(message_payload(event, message_rng.choice(user_ids), message_rng))
+        # Half of the voice traffic is played by the roster
+        user_id = rng.choice(user_ids[:players] if rng.random() < 0.5 else user_ids)
+        channel_id = in_voice.get(user_id)
+        roll = rng.random()
+        if channel_id is None:
+            channel_id = in_voice[user_id] = rng.choice(VOICE_CHANNEL_IDS)
+        elif roll < 0.3:
+            pass  # mute toggle
+        elif roll < 0.6:
+            channel_id = in_voice[user_id] = rng.choice(VOICE_CHANNEL_IDS)
+        else:
+            del in_voice[user_id]
+            channel_id = None
+        state.parse_voice_state_update(voice_state_payload(user_id, channel_id, roll < 0.3))
+        if event % 1000 == 0:
+            await asyncio.sleep(0)  # runs the dispatched listeners
+            # and waits for the voice updates they queued, the checkpoints measure the caches only
+            await asyncio.get_running_loop().run_in_executor(bot.voice_executor, lambda: None)
+            await asyncio.sleep(0)
+        if event % (events // checkpoints) == 0:
+            gc.collect()
+            sizes.append(tracemalloc.get_traced_memory()[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await bot.close()
+    return sizes, peak, handler.updates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory of the discord.py caches by cache profile")
+    parser.add_argument("--members", type=int, default=5000, help="members of the guild")
+    parser.add_argument("--voice", type=int, default=300, help="members in a voice channel at start")
+    parser.add_argument("--players", type=int, default=20, help="roster members")
+    parser.add_argument("--events", type=int, default=100000, help="voice state updates of the run")
+    parser.add_argument("--checkpoints", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.configure_logging()
+    logging.getLogger("pururu").propagate = False
+    logging.getLogger("discord").setLevel(logging.ERROR)
+    print(f"members={args.members} voice={args.voice} players={args.players} events={args.events}")
+    finals = {}
+    updates_by_profile = {}
+    for profile in [DEFAULT, LEAN]:
+        sizes, peak, updates = asyncio.run(run(profile, args.members, args.voice, args.players, args.events,
+                                               args.checkpoints, args.seed))
+        finals[profile] = sizes[-1]
+        updates_by_profile[profile] = updates
+        print(f"{profile:7}: " + " -> ".join(f"{size / 1024:.0f}" for size in sizes)
+              + f" KiB, peak {peak / 1024:.0f} KiB, {updates} player updates")
+    print(f"lean retains {finals[LEAN] / finals[DEFAULT]:.0%} of the default profile")
+    if updates_by_profile[DEFAULT] != updates_by_profile[LEAN]:
+        print(f"WARNING: the profiles passed {updates_by_profile} player updates, the lean profile changes what the"
+              f" bot sees")
+
+
+if __name__ == '__main__':
+    main()
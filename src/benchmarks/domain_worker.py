@@ -0,0 +1,54 @@
+"""
+Throughput benchmark: PururuService calls in-process vs through the domain worker process.
+
+Run from src/: python -m benchmarks.domain_worker [calls] [threads]
+"""
+import sys
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from pururu.domain.services.pururu_service import PururuService
+from pururu.infrastructure.worker.domain_worker import DomainServiceProxy, DomainWorker
+
+
+def build_bench_service() -> PururuService:
+    return PururuService(Mock())
+
+
+def run_calls(service, calls: int, threads: int) -> float:
+    def worker(offset: int):
+        for i in range(calls // threads):
+            player = f"member{offset}_{i % 10}"
+            service.add_player(player, datetime(2024, 1, 1, 20))
+            service.remove_player(player, datetime(2024, 1, 1, 21))
+            service.register_bot_event(None)
+
+    pool = [threading.Thread(target=worker, args=(idx,)) for idx in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main(calls: int = 3000, threads: int = 4) -> None:
+    with patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 3600):
+        in_process = run_calls(build_bench_service(), calls, threads)
+        proxy = DomainServiceProxy(DomainWorker(build_bench_service))
+        proxy.start()
+        proxy.health_check()
+        split = run_calls(proxy, calls, threads)
+        health = proxy.health_check()
+        proxy.stop()
+    total = calls // threads * threads * 3
+    print(f"calls={total} threads={threads}")
+    print(f"in-process    : {total / in_process:10.0f} calls/s")
+    print(f"domain worker : {total / split:10.0f} calls/s ({split / total * 1e6:.1f} us/call)")
+    print(f"worker health : {health}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,82 @@
+"""
+Deterministic synthetic data for the benchmarks: players, attendance history, sheet rows and long sessions.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pururu.infrastructure.adapters.google_sheets.mapper as mapper
+import pururu.utils as utils
+from pururu.domain.current_session import CurrentSession
+from pururu.domain.entities import Attendance, AttendanceEventType, MemberAttendance
+
+SESSION_START = datetime(2024, 1, 1, 20)
+EVENT_TYPES = [event_type for event_type in AttendanceEventType if event_type != AttendanceEventType.UNKNOWN]
+
+
+def build_players(players: int) -> list[str]:
+    return [f"member{i}" for i in range(players)]
+
+
+def build_player_mapping(players: int) -> dict[str, str]:
+    """
+    Asistencia columns of each player, three columns per player (attendance, justified, motive) as in the sheet
+    """
+    return {player: mapper.__index_to_column(2 + i * 3) for i, player in enumerate(build_players(players))}
+
+
+def build_attendances(games: int, players: int, seed: int = 0) -> list[Attendance]:
+    """
+    One game per day with ~80% attendance, ~30% of the absences justified and random event types
+    """
+    rng = random.Random(seed)
+    first_day = datetime(2020, 1, 1)
+    attendances = []
+    for game_id in range(2, games + 2):
+        members = []
+        for player in build_players(players):
+            attended = rng.random() < 0.8
+            members.append(MemberAttendance(player, attended, not attended and rng.random() < 0.3, ""))
+        game_date = utils.format_time(first_day + timedelta(days=game_id))
+        attendances.append(Attendance(game_id, members, game_date, rng.choice(EVENT_TYPES)))
+    return attendances
+
+
+def build_attendance_rows(games: int, players: int, seed: int = 0) -> list[list[str]]:
+    """
+    Asistencia sheet rows as returned by values_get, matching build_player_mapping
+    """
+    return [mapper.attendance_to_sheet(attendance).to_row_values()
+            for attendance in build_attendances(games, players, seed)]
+
+
+def build_session(players: int, intervals: int, seed: int = 0) -> CurrentSession:
+    """
+    Session where every player joined and left `intervals` times, e.g. an unstable connection on a long night.
+    Every player ends offline.
+    """
+    rng = random.Random(seed)
+    session = CurrentSession()
+    for player in build_players(players):
+        time = SESSION_START
+        for _ in range(intervals):
+            time += timedelta(seconds=rng.randint(1, 120))
+            session.clock_in(player, time)
+            time += timedelta(seconds=rng.randint(60, 900))
+            session.clock_out(player, time)
+    return session
+
+
+def session_end(session: CurrentSession) -> datetime:
+    return max(utils.parse_time(clock_outs[-1]) for clock_outs in session.players_clock_outs.values() if clock_outs)
+
+
+def copy_session(session: CurrentSession) -> CurrentSession:
+    """
+    Copy of the session clockings, for the operations that mutate them
+    """
+    copy = CurrentSession()
+    copy.game_id = session.game_id
+    copy.online_players = set(session.online_players)
+    copy.players_clock_ins = {player: list(times) for player, times in session.players_clock_ins.items()}
+    copy.players_clock_outs = {player: list(times) for player, times in session.players_clock_outs.items()}
+    return copy
@@ -0,0 +1,95 @@
+"""
+Memory cost of each guild served by the bot process: the guild stacks of pururu.application.services.guild_registry
+(event system, domain service with its session and leaderboard, handler, flap damper) are built over in-memory
+databases holding the attendance matrix cache, as the Google Sheets adapter does once warm. tracemalloc measures the
+bytes retained by the registry for each guild count; the slope is the cost of one more guild.
+
+Run from src/: python -m benchmarks.guild_memory --guilds 1 10 100 --players 20 --games 300
+"""
+import argparse
+import gc
+import logging
+import tracemalloc
+from datetime import datetime
+
+import benchmarks.generators as generators
+from benchmarks.virtual_week import MemoryDatabase
+import pururu.utils as utils
+from pururu.application.services.guild_registry import GuildRegistry, GuildSettings, build_guild_context
+from pururu.clock import VirtualClock
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.services.pururu_service import PururuService
+
+CHANNEL = "General"
+
+
+class CachedDatabase(MemoryDatabase):
+    """
+    MemoryDatabase holding only the attendance matrix of its games, as the attendance_matrix cache of the Google
+    Sheets adapter
+    """
+
+    def __init__(self, games: int, players: int, seed: int):
+        super().__init__()
+        self.attendance_matrix = AttendanceMatrix.of(generators.build_attendances(games, players, seed))
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        return self.attendance_matrix
+
+
+def build_registry(guilds: int, players: int, games: int, online: int) -> GuildRegistry:
+    """
+    Guild stacks with warm caches and `online` players in the voice channel of each guild
+    """
+    virtual_clock = VirtualClock(datetime(2024, 1, 1, 20))
+    registry = GuildRegistry()
+    guild_players = generators.build_players(players)
+    for guild_id in range(1, guilds + 1):
+        settings = GuildSettings(guild_id, guild_players, f"spreadsheet{guild_id}",
+                                 generators.build_player_mapping(players))
+        service = PururuService(CachedDatabase(games, players, guild_id), virtual_clock, settings.players)
+        guild = registry.register(build_guild_context(settings, service, virtual_clock))
+        guild.pururu_handler.warm_up()
+        for player in guild_players[:online]:
+            guild.voice_handler.handle_voice_state_update_dc_event(player, None, CHANNEL)
+    return registry
+
+
+def retained(guilds: int, players: int, games: int, online: int) -> int:
+    """
+    Bytes still allocated by the registry once built
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    registry = build_registry(guilds, players, games, online)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del registry
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory retained by each guild stack")
+    parser.add_argument("--guilds", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--players", type=int, default=20, help="players of each guild")
+    parser.add_argument("--games", type=int, default=300, help="games in the attendance matrix of each guild")
+    parser.add_argument("--online", type=int, default=8, help="players in the voice channel of each guild")
+    args = parser.parse_args()
+
+    utils.configure_logging()
+    logging.getLogger("pururu").propagate = False
+    retained(1, args.players, args.games, args.online)  # warms the imports and interned strings
+    print(f"players={args.players} games={args.games} online={args.online}")
+    for label, games in [("empty", 0), ("warm", args.games)]:
+        sizes = [(guilds, retained(guilds, args.players, games, args.online)) for guilds in args.guilds]
+        (first, first_size), (last, last_size) = sizes[0], sizes[-1]
+        slope = (last_size - first_size) / (last - first) if last != first else first_size / first
+        print(f"{label:5}: " + ", ".join(f"{guilds} guilds {size / 1024:.0f} KiB" for guilds, size in sizes)
+              + f" -> {slope / 1024:.1f} KiB per guild")
+
+
+if __name__ == '__main__':
+    main()
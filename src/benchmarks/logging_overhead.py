@@ -0,0 +1,57 @@
+"""
+Benchmark: per-event logging overhead, legacy get_logger (basicConfig(force=True) on every call, eager f-strings,
+synchronous stream handler) vs the queue-backed logging configured once with lazy formatting.
+
+Run from src/: python -m benchmarks.logging_overhead [events]
+"""
+import logging
+import os
+import sys
+import timeit
+from datetime import datetime
+from unittest.mock import patch
+
+import pururu.utils as utils
+from pururu.domain.current_session import CurrentSession
+
+
+def legacy_get_logger(name: str, stream) -> logging.Logger:
+    logging.basicConfig(format=utils.LOG_FORMAT, datefmt=utils.FORMATTED_TIME_STR, level="INFO", force=True,
+                        stream=stream)
+    return logging.getLogger(name)
+
+
+def build_session() -> CurrentSession:
+    session = CurrentSession()
+    for i in range(10):
+        session.clock_in(f"member{i}", datetime(2024, 1, 1, 20))
+    return session
+
+
+def main(events: int = 20000) -> None:
+    session = build_session()
+    with open(os.devnull, "w") as devnull:
+        legacy = legacy_get_logger("bench", devnull)
+        results = {
+            "get_logger (legacy)": timeit.timeit(lambda: legacy_get_logger("bench", devnull), number=events),
+            "disabled debug, f-string (legacy)": timeit.timeit(
+                lambda: legacy.debug(f"Session {session}"), number=events),
+            "enabled info, sync stream (legacy)": timeit.timeit(
+                lambda: legacy.info(f"Player {'member1'} clock in {session.game_id}"), number=events),
+        }
+        with patch("sys.stderr", devnull), patch("pururu.config.LOG_RATE_LIMIT_INTERVAL", 0):
+            utils.configure_logging(force=True)
+            logger = utils.get_logger("bench")
+            results["get_logger (queue)"] = timeit.timeit(lambda: utils.get_logger("bench"), number=events)
+            results["disabled debug, lazy (queue)"] = timeit.timeit(
+                lambda: logger.debug("Session %s", session), number=events)
+            results["enabled info, enqueue (queue)"] = timeit.timeit(
+                lambda: logger.info("Player %s clock in %s", "member1", session.game_id), number=events)
+            utils._stop_log_listener()
+    print(f"events={events}")
+    for name, elapsed in results.items():
+        print(f"{name:38}: {elapsed / events * 1e6:8.2f} us/event")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,37 @@
+"""
+Benchmark: event loop throughput (empty callbacks) with and without the loop watchdog running.
+
+Run from src/: python -m benchmarks.loop_watchdog [callbacks]
+"""
+import asyncio
+import sys
+import time
+from unittest.mock import Mock
+
+from pururu.infrastructure.watchdog.loop_watchdog import LoopWatchdog
+
+
+async def run_callbacks(callbacks: int, watchdog: LoopWatchdog | None) -> float:
+    if watchdog is not None:
+        watchdog.start()
+    start = time.perf_counter()
+    for _ in range(callbacks):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    if watchdog is not None:
+        watchdog.stop()
+    return elapsed
+
+
+def main(callbacks: int = 500000) -> None:
+    baseline = asyncio.run(run_callbacks(callbacks, None))
+    watchdog = LoopWatchdog(interval=0.5, threshold=1)
+    watchdog.logger = Mock()
+    watched = asyncio.run(run_callbacks(callbacks, watchdog))
+    print(f"callbacks={callbacks}")
+    print(f"no watchdog: {baseline / callbacks * 1e6:6.2f} us/callback")
+    print(f"watchdog   : {watched / callbacks * 1e6:6.2f} us/callback ({watched / baseline - 1:+.1%})")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
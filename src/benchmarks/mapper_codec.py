@@ -0,0 +1,42 @@
+"""
+Micro-benchmark: per-row decoding cost of the Asistencia sheet, legacy mapper vs compiled AttendanceRowCodec.
+
+Run from src/: python -m benchmarks.mapper_codec [players] [rows]
+"""
+import sys
+import timeit
+from unittest.mock import patch
+
+import pururu.infrastructure.adapters.google_sheets.mapper as mapper
+
+
+def build_mapping(players: int) -> dict[str, str]:
+    return {f"member{i}": mapper.__index_to_column(2 + i * 3) for i in range(players)}
+
+
+def build_rows(players: int, rows: int) -> list[list[str]]:
+    return [["Juegueo Oficial", "2024-01-01 20:00:00"] +
+            ["TRUE" if i % 3 else "FALSE", "FALSE" if i % 5 else "TRUE", ""] * players
+            for i in range(rows)]
+
+
+def legacy_decode(rows: list[list[str]]):
+    return [mapper.sheet_to_attendance(mapper.gs_to_attendance_sheet(game_id, row)) for game_id, row in
+            enumerate(rows, 4)]
+
+
+def main(players: int = 5, rows: int = 1000, repeat: int = 5) -> None:
+    mapping = build_mapping(players)
+    data = build_rows(players, rows)
+    codec = mapper.compile_attendance_codec(mapping)
+    with patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", mapping):
+        legacy = min(timeit.repeat(lambda: legacy_decode(data), number=1, repeat=repeat))
+    compiled = min(timeit.repeat(lambda: codec.decode_rows(4, data), number=1, repeat=repeat))
+    print(f"players={players} rows={rows}")
+    print(f"legacy mapper : {legacy / rows * 1e6:8.2f} us/row")
+    print(f"compiled codec: {compiled / rows * 1e6:8.2f} us/row")
+    print(f"speedup       : {legacy / compiled:8.2f}x")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,105 @@
+"""
+Load test: cost of the metrics instrumentation on the EventSystem emit path and on the Google Sheets adapter calls,
+with several producer threads and a scraper rendering the registry in a loop.
+
+Run from src/: python -m benchmarks.metrics_overhead [events] [threads]
+"""
+import sys
+import threading
+import time
+import timeit
+from unittest.mock import patch
+
+import pururu.metrics as metrics
+from pururu.application.events.entities import EventType, PururuEvent
+from pururu.application.events.event_system import EventSystem
+from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter
+
+
+class FakeSpreadsheet:
+    ROWS = {'values': [['TRUE'] * 17 for _ in range(10)]}
+
+    def values_get(self, notation):
+        return self.ROWS
+
+    def values_update(self, range, params, body):
+        return None
+
+
+def legacy_emit(event_system: EventSystem, event: PururuEvent) -> None:
+    now = time.time()
+    if event.event_type in event_system.events:
+        event_system.events[event.event_type].notify_listeners(event)
+        event_system.last_emitted = now
+
+
+def run_threads(target, events: int, threads: int) -> float:
+    pool = [threading.Thread(target=target, args=(events // threads,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def build_adapter() -> GoogleSheetsAdapter:
+    adapter = GoogleSheetsAdapter.__new__(GoogleSheetsAdapter)
+    adapter.spreadsheet = FakeSpreadsheet()
+    return adapter
+
+
+def main(events: int = 200000, threads: int = 4) -> None:
+    event_system = EventSystem()
+    for event_type in EventType:
+        event_system.create_event(event_type)
+        event_system.register_listener(event_type, lambda event: None)
+    event = PururuEvent(EventType.MEMBER_JOINED_CHANNEL, "bench")
+    adapter = build_adapter()
+    values_get = adapter._GoogleSheetsAdapter__values_get
+
+    def instrumented(count):
+        for _ in range(count):
+            event_system.emit_event(event)
+
+    def legacy(count):
+        for _ in range(count):
+            legacy_emit(event_system, event)
+
+    stop = threading.Event()
+    scrapes = []
+
+    def scraper():
+        while not stop.is_set():
+            start = time.perf_counter()
+            metrics.REGISTRY.render()
+            scrapes.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    with patch("pururu.config.EVENT_CONCURRENCY_TIME", -1):
+        legacy_elapsed = run_threads(legacy, events, threads)
+        scraper_thread = threading.Thread(target=scraper)
+        scraper_thread.start()
+        instrumented_elapsed = run_threads(instrumented, events, threads)
+        stop.set()
+        scraper_thread.join()
+
+    calls = events // 10
+    results = {
+        "emit_event, no metrics": legacy_elapsed / events,
+        "emit_event, metrics + scraper": instrumented_elapsed / events,
+        "counter.labels().inc()": timeit.timeit(
+            lambda: metrics.REGISTRY.metrics['pururu_events_emitted_total'].labels('BENCH').inc(), number=calls) / calls,
+        "sheets values_get, direct": timeit.timeit(
+            lambda: adapter.spreadsheet.values_get('Asistencia!A2:Q11'), number=calls) / calls,
+        "sheets values_get, metrics": timeit.timeit(
+            lambda: values_get('bench', 'Asistencia', 'Asistencia!A2:Q11'), number=calls) / calls,
+    }
+    print(f"events={events} threads={threads} scrapes={len(scrapes)} "
+          f"render={sum(scrapes) / max(len(scrapes), 1) * 1e3:.2f} ms")
+    for name, elapsed in results.items():
+        print(f"{name:32}: {elapsed * 1e6:8.2f} us/op")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
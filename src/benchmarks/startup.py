@@ -0,0 +1,117 @@
+"""
+Time to ready of the bot startup, sequential (as it used to be) against the pipelined one of pururu.bot: the Google
+Sheets adapter is imported and authenticated in a background thread while Discord logs in and connects, and the
+command sync and the leaderboard warm up run while the gateway connects.
+
+The import costs of the Discord and Google Sheets adapters are measured in fresh interpreters; the network round
+trips (auth, login, sync, connect, warm up) are simulated with the given latencies.
+
+Run from src/: python -m benchmarks.startup --auth-latency 1.2 --login-latency 0.6 --sync-latency 0.8
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from pururu.infrastructure.adapters.deferred.deferred_database import DeferredDatabase
+from pururu.startup import StartupTimer
+
+DISCORD_MODULE = "pururu.infrastructure.adapters.discord.discord_bot"
+SHEETS_MODULE = "pururu.infrastructure.adapters.google_sheets.google_sheets_adapter"
+
+
+def import_cost(*modules: str) -> float:
+    """
+    Seconds to import the modules in a fresh interpreter, best of three
+    """
+    code = (f"import time; start = time.perf_counter(); import {', '.join(modules)}; "
+            f"print(time.perf_counter() - start)")
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+                     .stdout) for _ in range(3))
+
+
+class Latencies:
+    def __init__(self, args: argparse.Namespace, discord_import: float, sheets_import: float):
+        self.discord_import = discord_import
+        self.sheets_import = sheets_import
+        self.auth = args.auth_latency
+        self.login = args.login_latency
+        self.sync = args.sync_latency
+        self.connect = args.connect_latency
+        self.warm_up = args.warm_up_latency
+
+
+def build_database(latencies: Latencies, timer: StartupTimer):
+    with timer.phase("auth"):
+        time.sleep(latencies.sheets_import + latencies.auth)
+    database = Mock()
+    database.get_attendance_matrix.side_effect = lambda: time.sleep(latencies.warm_up)
+    return database
+
+
+async def sequential(latencies: Latencies) -> StartupTimer:
+    timer = StartupTimer(time.perf_counter())
+    with timer.phase("import"):
+        time.sleep(latencies.discord_import)
+    database = build_database(latencies, timer)
+    with timer.phase("login"):
+        await asyncio.sleep(latencies.login)
+    with timer.phase("sync"):
+        await asyncio.sleep(latencies.sync)
+    with timer.phase("connect"):
+        await asyncio.sleep(latencies.connect)
+    timer.mark("ready")
+    with timer.phase("warm_up"):
+        await asyncio.to_thread(database.get_attendance_matrix)
+    return timer
+
+
+async def pipelined(latencies: Latencies) -> StartupTimer:
+    timer = StartupTimer(time.perf_counter())
+    executor = ThreadPoolExecutor(1, thread_name_prefix="startup")
+    database = DeferredDatabase(executor.submit(build_database, latencies, timer))
+    executor.shutdown(wait=False)
+    with timer.phase("import"):
+        time.sleep(latencies.discord_import)
+    with timer.phase("login"):
+        await asyncio.sleep(latencies.login)
+
+    async def sync():
+        with timer.phase("sync"):
+            await asyncio.sleep(latencies.sync)
+
+    async def warm_up():
+        with timer.phase("warm_up"):
+            await asyncio.to_thread(database.get_attendance_matrix)
+
+    tasks = [asyncio.create_task(sync()), asyncio.create_task(warm_up())]
+    with timer.phase("connect"):
+        await asyncio.sleep(latencies.connect)
+    timer.mark("ready")
+    await asyncio.gather(*tasks)
+    return timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sequential vs pipelined startup time to ready")
+    parser.add_argument("--auth-latency", type=float, default=1.2, help="seconds to authenticate and open the sheet")
+    parser.add_argument("--login-latency", type=float, default=0.6, help="seconds of the Discord login")
+    parser.add_argument("--sync-latency", type=float, default=0.8, help="seconds of the command tree sync")
+    parser.add_argument("--connect-latency", type=float, default=0.7, help="seconds of the gateway connect")
+    parser.add_argument("--warm-up-latency", type=float, default=1.0, help="seconds to load the attendance matrix")
+    args = parser.parse_args()
+
+    discord_import, sheets_import = import_cost(DISCORD_MODULE), import_cost(SHEETS_MODULE)
+    print(f"import {DISCORD_MODULE}: {discord_import:.3f}s, {SHEETS_MODULE}: {sheets_import:.3f}s")
+    latencies = Latencies(args, discord_import, sheets_import)
+    for name, pipeline in [("sequential", sequential), ("pipelined", pipelined)]:
+        timer = asyncio.run(pipeline(latencies))
+        print(f"{name:10}: ready at {timer.elapsed('ready'):.2f}s, warm at {timer.elapsed('warm_up'):.2f}s")
+        print(f"            {timer.report()}")
+
+
+if __name__ == '__main__':
+    main()
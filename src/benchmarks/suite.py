@@ -0,0 +1,283 @@
+"""
+Benchmark suite of the domain hot paths with scaling curves and a regression gate.
+
+Every case is timed at increasing sizes (games, intervals per player or sheet rows). Timings are divided by a fixed
+pure Python calibration workload measured right before each case, so a baseline recorded on one machine can be
+checked on another one.
+
+Run from src/:
+    python -m benchmarks.suite                           # print the scaling curves
+    python -m benchmarks.suite --quick --filter session  # smaller sizes, only matching cases
+    python -m benchmarks.suite --save-baseline           # store the current timings as baseline
+    python -m benchmarks.suite --check                   # exit 1 if a case is slower than the baseline
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import benchmarks.generators as generators
+import pururu.infrastructure.adapters.google_sheets.mapper as mapper
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Clocking, StatsFilter, AttendanceEventType
+from pururu.domain.services.pururu_service import PururuService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+PLAYERS = 10
+
+
+class FakeDatabase:
+    """
+    In memory DatabaseInterface returning prebuilt data, so only the domain code is timed
+    """
+
+    def __init__(self, games: int = 0):
+        self.matrix = AttendanceMatrix.of(generators.build_attendances(games, PLAYERS))
+        self.matrix.date_index()
+        self.coins = {player: 10 for player in generators.build_players(PLAYERS)}
+
+    def get_attendance_matrix(self):
+        return self.matrix
+
+    def load_attendance_matrix(self):
+        return self.matrix
+
+    def get_player_coins(self, player):
+        return self.coins[player]
+
+    def get_all_player_coins(self):
+        return self.coins
+
+    def get_last_attendance(self):
+        return None
+
+    def upsert_attendance(self, attendance):
+        pass
+
+    def upsert_clocking(self, clocking):
+        pass
+
+
+class Case:
+    def __init__(self, name: str, unit: str, sizes: list[int], setup):
+        """
+        :param name: case name, e.g. session.get_player_time
+        :param unit: what the size counts, e.g. intervals
+        :param sizes: sizes of the scaling curve
+        :param setup: size -> callable to time
+        """
+        self.name = name
+        self.unit = unit
+        self.sizes = sizes
+        self.setup = setup
+
+
+def clock_cycle(intervals: int):
+    session = generators.build_session(1, 0)
+    times = [generators.SESSION_START + timedelta(minutes=i) for i in range(intervals * 2)]
+
+    def run():
+        session.players_clock_ins.clear()
+        session.players_clock_outs.clear()
+        for clock_in, clock_out in zip(times[::2], times[1::2]):
+            session.clock_in("member0", clock_in)
+            session.clock_out("member0", clock_out)
+
+    return run
+
+
+def get_player_time(intervals: int):
+    session = generators.build_session(1, intervals)
+    return lambda: session.get_player_time("member0")
+
+
+def adjust_start_time(intervals: int):
+    session = generators.build_session(PLAYERS, intervals)
+    start = generators.SESSION_START + (generators.session_end(session) - generators.SESSION_START) / 2
+    return lambda: generators.copy_session(session).adjust_players_clocking_start_time(start)
+
+
+def adjust_end_time(intervals: int):
+    session = generators.build_session(PLAYERS, intervals)
+    end = generators.SESSION_START + (generators.session_end(session) - generators.SESSION_START) / 2
+    return lambda: generators.copy_session(session).adjust_players_clocking_end_time(end)
+
+
+def calculate_player_stats(games: int):
+    service = PururuService(FakeDatabase(games))
+    return lambda: service.calculate_player_stats("member0")
+
+
+def calculate_player_stats_filtered(games: int):
+    service = PururuService(FakeDatabase(games))
+    stats_filter = StatsFilter(date(2021, 1, 1), date(2022, 12, 31), AttendanceEventType.OFFICIAL_GAME)
+    return lambda: service.calculate_player_stats("member0", stats_filter)
+
+
+def end_game(intervals: int):
+    service = PururuService(FakeDatabase())
+    session = generators.build_session(PLAYERS, intervals)
+    session.game_id = 10
+    end = generators.session_end(session)
+
+    def run():
+        service.current_session = generators.copy_session(session)
+        service.end_game(end)
+
+    return run
+
+
+def voice_update(channels: int):
+    service = PururuService(FakeDatabase())
+    for channel in range(channels):
+        for player in range(2):
+            service.add_player(f"member{player}", generators.SESSION_START, f"channel{channel}")
+    time = generators.SESSION_START + timedelta(minutes=1)
+
+    def run():
+        service.add_player("member2", time, "channel0")
+        service.remove_player("member2", time, "channel0")
+
+    return run
+
+
+def decode_rows(games: int):
+    codec = mapper.compile_attendance_codec(generators.build_player_mapping(PLAYERS))
+    rows = generators.build_attendance_rows(games, PLAYERS)
+    return lambda: codec.decode_rows(2, rows)
+
+
+def encode_attendances(games: int):
+    attendances = generators.build_attendances(games, PLAYERS)
+    return lambda: [mapper.attendance_to_sheet(attendance).to_row_values() for attendance in attendances]
+
+
+def encode_clockings(games: int):
+    clockings = [Clocking(game_id, list(range(PLAYERS))) for game_id in range(games)]
+    return lambda: [mapper.clocking_to_sheet(clocking).to_row_values() for clocking in clockings]
+
+
+def player_coins(players: int):
+    rows = [generators.build_players(players), [str(i) for i in range(players)]]
+    return lambda: mapper.gs_to_player_coins(rows)
+
+
+GAMES = [100, 1000, 10000]
+INTERVALS = [10, 100, 1000, 5000]
+CASES = [
+    Case("session.clock_in_out", "intervals", INTERVALS, clock_cycle),
+    Case("session.get_player_time", "intervals", INTERVALS, get_player_time),
+    Case("session.adjust_start_time", "intervals", INTERVALS, adjust_start_time),
+    Case("session.adjust_end_time", "intervals", INTERVALS, adjust_end_time),
+    Case("service.calculate_player_stats", "games", GAMES, calculate_player_stats),
+    Case("service.calculate_player_stats_filtered", "games", GAMES, calculate_player_stats_filtered),
+    Case("service.end_game", "intervals", INTERVALS, end_game),
+    Case("service.voice_update", "channels", [1, 100, 10000], voice_update),
+    Case("mapper.decode_rows", "games", GAMES, decode_rows),
+    Case("mapper.attendance_to_sheet", "games", GAMES, encode_attendances),
+    Case("mapper.clocking_to_sheet", "games", GAMES, encode_clockings),
+    Case("mapper.gs_to_player_coins", "players", [10, 100, 1000], player_coins),
+]
+
+
+def calibrate() -> float:
+    """
+    Seconds taken by a fixed pure Python workload, the unit of the normalized timings
+    """
+    return min(timeit.repeat(lambda: sum(i * i for i in range(100000)), number=1, repeat=5))
+
+
+def measure(run, min_time: float = 0.2) -> float:
+    """
+    Best per call seconds of run, calling it as many times as needed to last min_time per repeat
+    """
+    number, elapsed = 1, 0.0
+    while True:
+        elapsed = timeit.timeit(run, number=number)
+        if elapsed >= min_time / 5 or number >= 1 << 20:
+            break
+        number *= 2
+    return min(timeit.repeat(run, number=number, repeat=5)) / number
+
+
+def run_suite(cases: list[Case], quick: bool = False) -> dict[str, dict[str, float]]:
+    """
+    Runs the cases and prints their scaling curves
+    :return: dict case name -> size -> normalized time
+    """
+    results = {}
+    with patch("pururu.config.PLAYERS", generators.build_players(PLAYERS)), \
+            patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 1):
+        for case in cases:
+            sizes = case.sizes[:2] if quick else case.sizes
+            results[case.name] = {}
+            unit = calibrate()
+            print(f"\n{case.name} (calibration {unit * 1e3:.2f} ms)")
+            previous = None
+            for size in sizes:
+                elapsed = measure(case.setup(size), 0.05 if quick else 0.2)
+                results[case.name][str(size)] = elapsed / unit
+                exponent = f"{math.log(elapsed / previous[1]) / math.log(size / previous[0]):5.2f}" \
+                    if previous else "    -"
+                print(f"  {size:>6} {case.unit:10} {elapsed * 1e6:12.1f} us   scaling exponent {exponent}")
+                previous = (size, elapsed)
+    return results
+
+
+def check_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compares the normalized timings against the baseline
+    :return: list[str] the regressions, empty if none
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, elapsed in sizes.items():
+            expected = baseline.get(name, {}).get(size)
+            if expected is not None and elapsed > expected * (1 + tolerance):
+                regressions.append(f"{name} [{size}]: {elapsed / expected - 1:+.0%} slower than baseline")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pururu domain hot paths benchmark suite")
+    parser.add_argument("--filter", default="", help="only run the cases containing this text")
+    parser.add_argument("--quick", action="store_true", help="only the two smallest sizes of each case")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="fail if a case is slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown ratio, default 0.3")
+    args = parser.parse_args(argv)
+    results = run_suite([case for case in CASES if args.filter in case.name], args.quick)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nbaseline saved to {args.baseline}")
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = check_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nre-running the slower cases to rule out noise")
+            slower = {regression.split(" ")[0] for regression in regressions}
+            retry = run_suite([case for case in CASES if case.name in slower], args.quick)
+            for name, sizes in retry.items():
+                for size, elapsed in sizes.items():
+                    results[name][size] = min(results[name][size], elapsed)
+            regressions = check_baseline(results, baseline, args.tolerance)
+        print("\n" + ("\n".join(regressions) if regressions else "no regressions"))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
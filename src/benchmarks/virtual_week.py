@@ -0,0 +1,140 @@
+"""
+Simulates nights of voice traffic on a VirtualClock: the real EventSystem, EventListeners, PururuHandler and
+PururuService run with their attendance check and concurrency delays fast-forwarded, so a week of sessions takes a
+fraction of a second and is the same on every run for a given seed.
+
+Run from src/: python -m benchmarks.virtual_week --days 7 --players 10 --seed 0
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import benchmarks.generators as generators
+from benchmarks.voice_load import ErrorCounter
+import pururu.utils as utils
+from pururu.application.events.entities import EventType
+from pururu.application.events.event_system import EventSystem
+from pururu.application.events.listeners import EventListeners
+from pururu.application.services.flap_damper import FlapDamper
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.clock import VirtualClock
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, AttendanceEventType
+from pururu.domain.services.database_service import DatabaseInterface
+from pururu.domain.services.pururu_service import PururuService
+
+CHANNEL = "General"
+
+
+class MemoryDatabase(DatabaseInterface):
+    """
+    DatabaseInterface keeping the upserted attendances and clockings in memory
+    """
+
+    def __init__(self):
+        self.attendances: list[Attendance] = []
+        self.clockings = []
+        self.bot_events = 0
+
+    def upsert_attendance(self, attendance: Attendance) -> None:
+        self.attendances.append(attendance)
+
+    def get_all_attendances(self) -> list[Attendance]:
+        return self.attendances
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        return AttendanceMatrix.of(self.attendances)
+
+    def upsert_clocking(self, clocking) -> None:
+        self.clockings.append(clocking)
+
+    def insert_bot_event(self, bot_event) -> None:
+        self.bot_events += 1
+
+    def get_last_attendance(self) -> Attendance:
+        return self.attendances[-1] if self.attendances else Attendance(1, [], "", AttendanceEventType.OFFICIAL_GAME)
+
+    def get_player_coins(self, player: str) -> int:
+        return 0
+
+    def get_all_player_coins(self) -> dict[str, int]:
+        return {}
+
+
+def night_schedule(players: list[str], night: datetime, rng: random.Random) -> list:
+    """
+    Voice updates of one night: most players join around 20:00, some reconnect a few times and everyone leaves
+    around 23:00
+    :return: list of (time, player, before_channel, after_channel)
+    """
+    schedule = []
+    for player in players:
+        if rng.random() < 0.2:
+            continue
+        joined = night + timedelta(seconds=rng.randint(0, 1800))
+        left = night + timedelta(hours=3, seconds=rng.randint(-1800, 1800))
+        schedule.append((joined, player, None, CHANNEL))
+        for _ in range(rng.choice([0, 0, 1, 3])):
+            drop = joined + timedelta(seconds=rng.randint(600, 7200))
+            if drop + timedelta(seconds=120) < left:
+                schedule += [(drop, player, CHANNEL, None), (drop + timedelta(seconds=rng.randint(5, 90)), player,
+                                                             None, CHANNEL)]
+        schedule.append((left, player, CHANNEL, None))
+    return sorted(schedule, key=lambda item: item[0])
+
+
+def simulate(days: int, players: list[str], seed: int) -> tuple[VirtualClock, MemoryDatabase, dict, int]:
+    """
+    :return: the clock, the database, handled events per EventType name and voice updates sent
+    """
+    rng = random.Random(seed)
+    virtual_clock = VirtualClock(generators.SESSION_START - timedelta(hours=1))
+    database = MemoryDatabase()
+    event_system = EventSystem(virtual_clock)
+    handler = PururuHandler(PururuService(database, virtual_clock), event_system, virtual_clock)
+    EventListeners(event_system, handler)
+    damper = FlapDamper(handler, virtual_clock)
+    handled = {event_type.name: 0 for event_type in EventType}
+    for event_type in EventType:
+        event_system.register_listener(event_type, lambda event: handled.__setitem__(
+            event.event_type.name, handled[event.event_type.name] + 1))
+    sent = 0
+    for day in range(days):
+        for at, player, before, after in night_schedule(players, generators.SESSION_START + timedelta(days=day), rng):
+            virtual_clock.advance_to(at.timestamp())
+            damper.handle_voice_state_update_dc_event(player, before, after)
+            sent += 1
+        virtual_clock.run_until_idle()
+    return virtual_clock, database, handled, sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Virtual time simulation of nightly sessions")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--flap-grace", type=float, default=20, help="VOICE_FLAP_GRACE, 0 disables the damping")
+    args = parser.parse_args()
+
+    players = generators.build_players(args.players)
+    errors = ErrorCounter()
+    utils.configure_logging()
+    logging.getLogger("pururu").addHandler(errors)
+    logging.getLogger("pururu").propagate = False
+    with patch("pururu.config.PLAYERS", players), patch("pururu.config.VOICE_FLAP_GRACE", args.flap_grace):
+        start = time.perf_counter()
+        virtual_clock, database, handled, sent = simulate(args.days, players, args.seed)
+        elapsed = time.perf_counter() - start
+    print(f"days={args.days} players={args.players} seed={args.seed} flap_grace={args.flap_grace}s")
+    print(f"virtual time  : {generators.SESSION_START - timedelta(hours=1)} -> {virtual_clock.now()}")
+    print(f"wall time     : {elapsed * 1e3:.1f} ms for {sent} voice updates")
+    print("events handled: " + ", ".join(f"{name} {count}" for name, count in handled.items() if count))
+    print(f"games stored  : {[attendance.game_id for attendance in database.attendances]}, "
+          f"bot events written: {database.bot_events}, errors logged: {errors.count}")
+
+
+if __name__ == '__main__':
+    main()
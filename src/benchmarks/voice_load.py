@@ -0,0 +1,230 @@
+"""
+Load generator: drives PururuHandler.handle_voice_state_update_dc_event with synthetic voice traffic against the real
+EventSystem, EventListeners and PururuService, over a fake database with a configurable latency. One independent
+stack is built per guild so overlapping guild traffic can be simulated.
+
+Patterns:
+    burst     all the players join at once, stay for half a cycle and leave at once
+    flapping  every player keeps joining and leaving with a short random period
+    churn     random joins and leaves at a steady rate (Poisson arrivals)
+
+Run from src/: python -m benchmarks.voice_load --pattern flapping --players 12 --guilds 2 --db-latency 0.05
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from statistics import quantiles
+from unittest.mock import patch
+
+import benchmarks.generators as generators
+import pururu.utils as utils
+from pururu.application.events.entities import EventType
+from pururu.application.events.event_system import EventSystem, EVENTS_PENDING
+from pururu.application.events.listeners import EventListeners
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, AttendanceEventType
+from pururu.domain.services.database_service import DatabaseInterface
+from pururu.domain.services.pururu_service import PururuService
+
+CHANNEL = "General"
+
+
+class LatencyDatabase(DatabaseInterface):
+    """
+    DatabaseInterface sleeping `latency` seconds on every call, as the Google Sheets API would
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.last_game_id = 1
+        self.lock = threading.Lock()
+
+    def upsert_attendance(self, attendance: Attendance) -> None:
+        time.sleep(self.latency)
+
+    def get_all_attendances(self) -> list[Attendance]:
+        time.sleep(self.latency)
+        return []
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        time.sleep(self.latency)
+        return AttendanceMatrix()
+
+    def upsert_clocking(self, clocking) -> None:
+        time.sleep(self.latency)
+
+    def insert_bot_event(self, bot_event) -> None:
+        time.sleep(self.latency)
+
+    def get_last_attendance(self) -> Attendance:
+        time.sleep(self.latency)
+        with self.lock:
+            self.last_game_id += 1
+            return Attendance(self.last_game_id - 1, [], "", AttendanceEventType.OFFICIAL_GAME)
+
+    def get_player_coins(self, player: str) -> int:
+        time.sleep(self.latency)
+        return 0
+
+    def get_all_player_coins(self) -> dict[str, int]:
+        time.sleep(self.latency)
+        return {}
+
+
+class GuildStack:
+    """
+    EventSystem + EventListeners + PururuHandler + PururuService of one guild, instrumented to count the handled
+    events and the intent to game start latency
+    """
+
+    def __init__(self, db_latency: float):
+        self.event_system = EventSystem()
+        self.service = PururuService(LatencyDatabase(db_latency))
+        self.handler = PururuHandler(self.service, self.event_system)
+        self.listeners = EventListeners(self.event_system, self.handler)
+        self.handled = 0
+        self.pending_intents: list[float] = []
+        self.latencies: list[float] = []
+        self.lock = threading.Lock()
+        for event_type in EventType:
+            self.event_system.register_listener(event_type, self.__count)
+        self.event_system.register_listener(EventType.GAME_STARTED, self.__game_started)
+        emit_event_with_delay = self.event_system.emit_event_with_delay
+
+        def record_intents(event, delay_seconds, reason: str = "delay"):
+            if event.event_type == EventType.NEW_GAME_INTENT and reason == "attendance_check":
+                with self.lock:
+                    self.pending_intents.append(time.perf_counter())
+            emit_event_with_delay(event, delay_seconds, reason=reason)
+
+        self.event_system.emit_event_with_delay = record_intents
+
+    def __count(self, event) -> None:
+        with self.lock:
+            self.handled += 1
+
+    def __game_started(self, event) -> None:
+        with self.lock:
+            if self.pending_intents:
+                self.latencies.append(time.perf_counter() - self.pending_intents[0])
+            self.pending_intents.clear()
+
+
+def burst_schedule(players: list[str], duration: float, rng: random.Random, cycle: float = 2.0) -> list:
+    schedule, start = [], 0.0
+    while start < duration:
+        schedule += [(start, player, None, CHANNEL) for player in players]
+        schedule += [(start + cycle / 2, player, CHANNEL, None) for player in players]
+        start += cycle
+    return schedule
+
+
+def flapping_schedule(players: list[str], duration: float, rng: random.Random, period: float = 0.3) -> list:
+    schedule = []
+    for player in players:
+        now, online = rng.uniform(0, period), False
+        while now < duration:
+            schedule.append((now, player, CHANNEL if online else None, None if online else CHANNEL))
+            online = not online
+            now += rng.uniform(period / 2, period * 1.5)
+    return schedule
+
+
+def churn_schedule(players: list[str], duration: float, rng: random.Random, rate: float = 20.0) -> list:
+    schedule, online, now = [], set(), 0.0
+    while True:
+        now += rng.expovariate(rate)
+        if now >= duration:
+            return schedule
+        player = rng.choice(players)
+        schedule.append((now, player, CHANNEL if player in online else None, None if player in online else CHANNEL))
+        online.symmetric_difference_update({player})
+
+
+PATTERNS = {"burst": burst_schedule, "flapping": flapping_schedule, "churn": churn_schedule}
+
+
+def drive(stack: GuildStack, schedule: list, sent: list) -> None:
+    start = time.perf_counter()
+    for offset, player, before, after in sorted(schedule, key=lambda item: item[0]):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        stack.handler.handle_voice_state_update_dc_event(player, before, after)
+        sent.append(1)
+
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def percentile_line(values: list[float]) -> str:
+    if len(values) < 2:
+        return f"n={len(values)} " + (f"value={values[0] * 1e3:.1f} ms" if values else "")
+    cuts = quantiles(values, n=100, method="inclusive")
+    return (f"n={len(values)} p50={cuts[49] * 1e3:.1f} ms p95={cuts[94] * 1e3:.1f} ms "
+            f"p99={cuts[98] * 1e3:.1f} ms max={max(values) * 1e3:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Voice state update load generator")
+    parser.add_argument("--pattern", choices=PATTERNS, default="flapping")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of generated traffic")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="seconds per database call")
+    parser.add_argument("--attendance-check-delay", type=float, default=0.5)
+    parser.add_argument("--concurrency-time", type=float, default=0.02, help="EVENT_CONCURRENCY_TIME")
+    parser.add_argument("--event-delay", type=float, default=0.05, help="EVENT_DELAY_TIME")
+    parser.add_argument("--min-attendance-time", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    players = generators.build_players(args.players)
+    rng = random.Random(args.seed)
+    errors = ErrorCounter()
+    utils.configure_logging()
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger("pururu.application.events.listeners").addHandler(errors)
+    with patch("pururu.config.PLAYERS", players), \
+            patch("pururu.config.ATTENDANCE_CHECK_DELAY", args.attendance_check_delay), \
+            patch("pururu.config.EVENT_CONCURRENCY_TIME", args.concurrency_time), \
+            patch("pururu.config.EVENT_DELAY_TIME", args.event_delay), \
+            patch("pururu.config.MIN_ATTENDANCE_TIME", args.min_attendance_time):
+        stacks = [GuildStack(args.db_latency) for _ in range(args.guilds)]
+        schedules = [PATTERNS[args.pattern](players, args.duration, rng) for _ in stacks]
+        sent, peak_threads = [], threading.active_count()
+        drivers = [threading.Thread(target=drive, args=(stack, schedule, sent), name=f"driver-{idx}")
+                   for idx, (stack, schedule) in enumerate(zip(stacks, schedules))]
+        start = time.perf_counter()
+        for driver in drivers:
+            driver.start()
+        while any(driver.is_alive() for driver in drivers):
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+        driven = time.perf_counter() - start
+        while EVENTS_PENDING.labels().value > 0 and time.perf_counter() - start < driven + 60:
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+        drained = time.perf_counter() - start
+
+    handled = sum(stack.handled for stack in stacks)
+    latencies = [latency for stack in stacks for latency in stack.latencies]
+    print(f"pattern={args.pattern} players={args.players} guilds={args.guilds} db_latency={args.db_latency}s "
+          f"attendance_check_delay={args.attendance_check_delay}s")
+    print(f"voice updates : {len(sent)} in {driven:.2f}s ({len(sent) / driven:.1f}/s)")
+    print(f"events handled: {handled} in {drained:.2f}s ({handled / drained:.1f}/s), listener errors: {errors.count}")
+    print(f"intent -> game start: {percentile_line(latencies)}")
+    print(f"threads       : peak {peak_threads}, at end {threading.active_count()}")
+
+
+if __name__ == '__main__':
+    main()
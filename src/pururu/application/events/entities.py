@@ -3,22 +3,26 @@ from enum import Enum
 
 import pururu.utils as utils
 from pururu.domain.entities import BotEvent, Attendance
+from pururu.tracing import SpanContext
 
 
 class EventType(Enum):
     MEMBER_JOINED_CHANNEL = "member_joined_channel"
     MEMBER_LEFT_CHANNEL = "member_left_channel"
+    MEMBER_MOVED_CHANNEL = "member_moved_channel"
     NEW_GAME_INTENT = "new_game_intent"
     END_GAME_INTENT = "end_game_intent"
     GAME_STARTED = "game_started"
     GAME_ENDED = "game_ended"
+    GAME_DISCARDED = "game_discarded"
 
 
 class PururuEvent:
     def __init__(self, event_type: EventType, description: str):
         self.event_type = event_type
-        self.created_at = utils.get_current_time_formatted()
+        self.created_at = utils.get_current_time_formatted()  # process clock, the emitting handler sets its own
         self.description = description
+        self.trace: SpanContext | None = None
 
     def as_bot_event(self) -> BotEvent:
         return BotEvent(self.event_type.value, self.created_at, self.description)
@@ -45,28 +49,42 @@ class MemberLeftChannelEvent(PururuEvent):
         self.left_at = left_at
 
 
+class MemberMovedChannelEvent(PururuEvent):
+    def __init__(self, member: str, from_channel: str, to_channel: str, moved_at: datetime):
+        super().__init__(EventType.MEMBER_MOVED_CHANNEL,
+                         f'member {member} has moved from channel {from_channel} to {to_channel} at {moved_at}')
+        self.member = member
+        self.from_channel = from_channel
+        self.to_channel = to_channel
+        self.moved_at = moved_at
+
+
 class NewGameIntentEvent(PururuEvent):
-    def __init__(self, players: list[str], start_time: datetime):
+    def __init__(self, players: list[str], start_time: datetime, channel: str = None):
         super().__init__(EventType.NEW_GAME_INTENT,
                          f'players: {players}, start_time {start_time}')
         self.players = players
         self.start_time = start_time
+        self.channel = channel
 
 
 class EndGameIntentEvent(PururuEvent):
-    def __init__(self, game_id: int, players: list[str], end_time: datetime):
+    def __init__(self, game_id: int, players: list[str], end_time: datetime, channel: str = None):
         super().__init__(EventType.END_GAME_INTENT,
                          f'game_id: {game_id}, players: {players}, end_time {end_time}')
         self.game_id = game_id
         self.players = players
         self.end_time = end_time
+        self.channel = channel
 
 
 class GameStartedEvent(PururuEvent):
-    def __init__(self, game_id: int, players: list[str]):
+    def __init__(self, game_id: int, players: list[str], channel: str = None, start_time: datetime = None):
         super().__init__(EventType.GAME_STARTED, f'game_id: {game_id}, players: {players}')
         self.game_id = game_id
         self.players = players
+        self.channel = channel
+        self.start_time = start_time
 
 
 class GameEndedEvent(PururuEvent):
@@ -75,3 +93,13 @@ class GameEndedEvent(PururuEvent):
                                                f'attended: {[member.member for member in attendance.members if member.attendance]}, '
                                                f'absences: {[member.member for member in attendance.members if not member.attendance]}')
         self.attendance = attendance
+        self.game_id = attendance.game_id
+
+
+class GameDiscardedEvent(PururuEvent):
+    def __init__(self, game_id: int, players: list[str], end_time: datetime, channel: str = None):
+        super().__init__(EventType.GAME_DISCARDED, f'game_id: {game_id}, players: {players}, end_time {end_time}')
+        self.game_id = game_id
+        self.players = players
+        self.end_time = end_time
+        self.channel = channel
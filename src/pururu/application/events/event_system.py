@@ -1,9 +1,17 @@
-import threading
-import time
-
+import pururu.clock as clock
 import pururu.config as config
+import pururu.metrics as metrics
+import pururu.tracing as tracing
 from pururu.application.events.entities import PururuEvent, EventType
 
+EVENTS_EMITTED = metrics.REGISTRY.counter('pururu_events_emitted_total', 'Events notified to their listeners',
+                                          ('event_type',))
+EVENTS_DELAYED = metrics.REGISTRY.counter('pururu_events_delayed_total', 'Events delayed by the concurrency window',
+                                          ('event_type',))
+EVENTS_PENDING = metrics.REGISTRY.gauge('pururu_events_pending_delayed', 'Delayed events waiting for their timer')
+LISTENER_LATENCY = metrics.REGISTRY.histogram('pururu_event_listeners_seconds',
+                                              'Time spent notifying the listeners of an event', ('event_type',))
+
 
 class Event:
     def __init__(self, name: EventType):
@@ -24,9 +32,10 @@ class Event:
 
 
 class EventSystem:
-    def __init__(self):
+    def __init__(self, event_clock: clock.Clock = None):
         self.events = {}
         self.last_emitted = None
+        self.clock = event_clock or clock.get_clock()
 
     def create_event(self, event_name: EventType) -> None:
         if event_name not in self.events:
@@ -45,19 +54,28 @@ class EventSystem:
             raise ValueError(f"Event {event_name} does not exist.")
 
     def emit_event(self, event: PururuEvent) -> None:
-        now: time = time.time()
+        now: float = self.clock.time()
         if self.last_emitted and self.last_emitted > now - config.EVENT_CONCURRENCY_TIME:
-            self.emit_event_with_delay(event, config.EVENT_DELAY_TIME)
-            self.last_emitted = time.time()
+            self.emit_event_with_delay(event, config.EVENT_DELAY_TIME, reason="concurrency")
         elif event.event_type in self.events:
-            self.events[event.event_type].notify_listeners(event)
-            self.last_emitted = time.time()
+            with LISTENER_LATENCY.labels(event.event_type.name).time(), \
+                    tracing.TRACER.span(f"emit:{event.event_type.value}", event.trace,
+                                        game_id=getattr(event, 'game_id', None)):
+                self.events[event.event_type].notify_listeners(event)
+            EVENTS_EMITTED.labels(event.event_type.name).inc()
+            self.last_emitted = self.clock.time()
         else:
             raise ValueError(f"Event {event.event_type} does not exist.")
 
-    def emit_event_with_delay(self, event: PururuEvent, delay_seconds) -> None:
+    def emit_event_with_delay(self, event: PururuEvent, delay_seconds, reason: str = "delay") -> None:
+        scheduled_at = self.clock.time()
+
         def delayed_emit():
+            EVENTS_PENDING.dec()
+            event.trace = tracing.TRACER.record(f"delay:{reason}", event.trace, scheduled_at, self.clock.time(),
+                                                delay=delay_seconds) or event.trace
             self.emit_event(event)
 
-        timer = threading.Timer(delay_seconds, delayed_emit)
-        timer.start()
+        EVENTS_DELAYED.labels(event.event_type.name).inc()
+        EVENTS_PENDING.inc()
+        self.clock.call_later(delay_seconds, delayed_emit)
@@ -1,5 +1,5 @@
 from pururu.application.events.entities import MemberJoinedChannelEvent, MemberLeftChannelEvent, NewGameIntentEvent, \
-    EndGameIntentEvent, GameStartedEvent, GameEndedEvent, EventType
+    EndGameIntentEvent, GameStartedEvent, GameEndedEvent, EventType, MemberMovedChannelEvent, GameDiscardedEvent
 from pururu.application.events.event_system import EventSystem
 from pururu.application.services.pururu_handler import PururuHandler
 from pururu.utils import get_logger
@@ -17,6 +17,9 @@ class EventListeners:
         event_system.create_event(EventType.MEMBER_LEFT_CHANNEL)
         event_system.register_listener(EventType.MEMBER_LEFT_CHANNEL, self.on_member_left_channel)
 
+        event_system.create_event(EventType.MEMBER_MOVED_CHANNEL)
+        event_system.register_listener(EventType.MEMBER_MOVED_CHANNEL, self.on_member_moved_channel)
+
         event_system.create_event(EventType.END_GAME_INTENT)
         event_system.register_listener(EventType.END_GAME_INTENT, self.on_end_game_intent)
 
@@ -29,38 +32,53 @@ class EventListeners:
         event_system.create_event(EventType.GAME_STARTED)
         event_system.register_listener(EventType.GAME_STARTED, self.on_game_started)
 
+        event_system.create_event(EventType.GAME_DISCARDED)
+        event_system.register_listener(EventType.GAME_DISCARDED, self.on_game_discarded)
+
     def on_member_joined_channel(self, data: MemberJoinedChannelEvent):
         try:
             self.pururu_handler.handle_member_joined_channel_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
 
     def on_member_left_channel(self, data: MemberLeftChannelEvent):
         try:
             self.pururu_handler.handle_member_left_channel_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
+
+    def on_member_moved_channel(self, data: MemberMovedChannelEvent):
+        try:
+            self.pururu_handler.handle_member_moved_channel_event(data)
+        except Exception as e:
+            self.logger.error("Error handling event '%s': %s", data, e)
 
     def on_new_game_intent(self, data: NewGameIntentEvent):
         try:
             self.pururu_handler.handle_new_game_intent_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
 
     def on_end_game_intent(self, data: EndGameIntentEvent):
         try:
             self.pururu_handler.handle_end_game_intent_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
 
     def on_game_started(self, data: GameStartedEvent):
         try:
             self.pururu_handler.handle_game_started_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
 
     def on_game_ended(self, data: GameEndedEvent):
         try:
             self.pururu_handler.handle_game_ended_event(data)
         except Exception as e:
-            self.logger.error(f"Error handling event '{data}': {e}")
+            self.logger.error("Error handling event '%s': %s", data, e)
+
+    def on_game_discarded(self, data: GameDiscardedEvent):
+        try:
+            self.pururu_handler.handle_game_discarded_event(data)
+        except Exception as e:
+            self.logger.error("Error handling event '%s': %s", data, e)
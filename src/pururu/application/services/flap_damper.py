@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime
+
+import pururu.clock as clock
+import pururu.config as config
+import pururu.metrics as metrics
+import pururu.utils as utils
+from pururu.application.services.pururu_handler import PururuHandler
+
+VOICE_FLAPS = metrics.REGISTRY.counter('pururu_voice_flaps_total', 'Leaves held by the flap damper, by outcome',
+                                       ('outcome',))
+
+
+class HeldLeave:
+    def __init__(self, channel: str, left_at: datetime, handle):
+        self.channel = channel
+        self.left_at = left_at
+        self.handle = handle
+
+
+class FlapDamper:
+    """
+    Voice state updates entry point in front of PururuHandler: a leave is held for config.VOICE_FLAP_GRACE seconds
+    and dropped if the player rejoins meanwhile, so a connection blip keeps a single continuous interval instead of
+    a leave, a rejoin and maybe a discarded end game intent. Leaves that are not followed by a rejoin reach the
+    handler with their original time, so the clockings do not change.
+    """
+
+    def __init__(self, pururu_handler: PururuHandler, damper_clock: clock.Clock = None):
+        self.pururu_handler = pururu_handler
+        self.clock = damper_clock or clock.get_clock()
+        self.held: dict[str, HeldLeave] = {}
+        self.lock = threading.RLock()
+        self.logger = utils.get_logger(__name__)
+
+    def handle_voice_state_update_dc_event(self, member: str, before_channel: str | None,
+                                           after_channel: str | None) -> None:
+        """
+        See PururuHandler.handle_voice_state_update_dc_event
+        :param member: member name
+        :param before_channel: before_state channel name
+        :param after_channel: after_state channel name
+        :return: None
+        """
+        calls = []
+        with self.lock:
+            if config.VOICE_FLAP_GRACE <= 0:
+                calls.append((member, before_channel, after_channel))
+            else:
+                self.__damp(member, before_channel, after_channel, calls)
+        # The handler chain may reach the database (end_game), it runs without holding the damper lock
+        for call in calls:
+            self.pururu_handler.handle_voice_state_update_dc_event(*call)
+
+    def __damp(self, member: str, before_channel: str | None, after_channel: str | None, calls: list) -> None:
+        held = self.held.pop(member, None)
+        if held is not None:
+            held.handle.cancel()
+            if before_channel is None:
+                VOICE_FLAPS.labels('merged').inc()
+                self.logger.debug("Member %s rejoined within %ss, leave of %s dropped", member,
+                                  config.VOICE_FLAP_GRACE, held.left_at)
+                if after_channel != held.channel:
+                    calls.append((member, held.channel, after_channel))
+                return
+            calls.append(self.__release(member, held))
+        if after_channel is None and before_channel is not None:
+            handle = self.clock.call_later(config.VOICE_FLAP_GRACE, lambda: self.__expire(member))
+            self.held[member] = HeldLeave(before_channel, self.clock.now(), handle)
+            return
+        calls.append((member, before_channel, after_channel))
+
+    def __expire(self, member: str) -> None:
+        with self.lock:
+            held = self.held.pop(member, None)
+        if held is not None:
+            self.pururu_handler.handle_voice_state_update_dc_event(*self.__release(member, held))
+
+    @staticmethod
+    def __release(member: str, held: HeldLeave) -> tuple:
+        """
+        :return: the handler call of the held leave, with its original time
+        """
+        VOICE_FLAPS.labels('released').inc()
+        return member, held.channel, None, held.left_at
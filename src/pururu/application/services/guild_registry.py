@@ -0,0 +1,110 @@
+import pururu.clock as clock
+import pururu.config as config
+import pururu.utils as utils
+from pururu.application.events.event_system import EventSystem
+from pururu.application.events.listeners import EventListeners
+from pururu.application.services.flap_damper import FlapDamper
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.application.services.session_status import SessionStatus
+from pururu.domain.services.pururu_service import PururuService
+
+
+class GuildSettings:
+    def __init__(self, guild_id: int, players: list[str], spreadsheet_id: str, player_mapping: dict[str, str],
+                 status_channel_id: int = 0):
+        self.guild_id = guild_id
+        self.players = players
+        self.spreadsheet_id = spreadsheet_id
+        self.player_mapping = player_mapping
+        self.status_channel_id = status_channel_id  # 0 disables the game status messages
+
+    def __repr__(self):
+        return f"GuildSettings({self.guild_id}, {len(self.players)} players)"
+
+
+class GuildContext:
+    """
+    Everything a guild owns: its settings, roster and handler stack (event system, domain service with its session
+    and caches, handler, flap damper and game status messages). The Google Sheets client, the Discord connection and the process are shared.
+    """
+
+    def __init__(self, settings: GuildSettings, pururu_handler: PururuHandler, voice_handler=None,
+                 session_status: SessionStatus = None):
+        self.settings = settings
+        self.roster = frozenset(settings.players)
+        self.pururu_handler = pururu_handler
+        self.voice_handler = voice_handler or pururu_handler  # e.g. a FlapDamper in front of the handler
+        self.session_status = session_status
+
+    @property
+    def guild_id(self) -> int:
+        return self.settings.guild_id
+
+
+class GuildRegistry:
+    """
+    Guilds served by the bot process, keyed by guild id
+    """
+
+    def __init__(self):
+        self.guilds: dict[int, GuildContext] = {}
+        self.logger = utils.get_logger(__name__)
+
+    def register(self, guild: GuildContext) -> GuildContext:
+        """
+        :param guild: GuildContext, replaces the one registered with the same guild id if any
+        :return: GuildContext
+        """
+        self.logger.info("Registering guild %s", guild.settings)
+        self.guilds[guild.guild_id] = guild
+        return guild
+
+    def get(self, guild_id: int | None) -> GuildContext | None:
+        """
+        :param guild_id: guild id, None for DMs
+        :return: GuildContext or None if the guild is not served
+        """
+        return self.guilds.get(guild_id)
+
+    def ids(self) -> list[int]:
+        return list(self.guilds)
+
+    def __iter__(self):
+        return iter(list(self.guilds.values()))
+
+    def __len__(self):
+        return len(self.guilds)
+
+
+def load_guild_settings() -> list[GuildSettings]:
+    """
+    Guilds from config.GUILDS, or the single guild of config.GUILD_ID, PLAYERS, SPREADSHEET_ID,
+    GS_ATTENDANCE_PLAYER_MAPPING and STATUS_CHANNEL_ID if it is empty. Missing keys of a guild fall back to those
+    globals too.
+    :return: list[GuildSettings]
+    """
+    if not config.GUILDS:
+        return [GuildSettings(config.GUILD_ID, config.PLAYERS, config.SPREADSHEET_ID,
+                              config.GS_ATTENDANCE_PLAYER_MAPPING, config.STATUS_CHANNEL_ID)]
+    return [GuildSettings(int(guild_id), guild.get('players', config.PLAYERS),
+                          guild.get('spreadsheet_id', config.SPREADSHEET_ID),
+                          guild.get('player_mapping', config.GS_ATTENDANCE_PLAYER_MAPPING),
+                          int(guild.get('status_channel_id', config.STATUS_CHANNEL_ID)))
+            for guild_id, guild in config.GUILDS.items()]
+
+
+def build_guild_context(settings: GuildSettings, pururu_service: PururuService,
+                        guild_clock: clock.Clock = None) -> GuildContext:
+    """
+    Wires the handler stack of a guild over its domain service
+    :param settings: GuildSettings
+    :param pururu_service: the domain service of the guild, over its own database adapter
+    :param guild_clock: optional clock, see pururu.clock
+    :return: GuildContext
+    """
+    event_system = EventSystem(guild_clock)
+    pururu_handler = PururuHandler(pururu_service, event_system, guild_clock, settings.players)
+    EventListeners(event_system, pururu_handler)
+    session_status = SessionStatus(pururu_handler, event_system, settings.status_channel_id, guild_clock) \
+        if settings.status_channel_id else None
+    return GuildContext(settings, pururu_handler, FlapDamper(pururu_handler, guild_clock), session_status)
@@ -1,39 +1,63 @@
-from datetime import datetime
+from datetime import datetime, date
 
+import pururu.clock as clock
 import pururu.config as config
+import pururu.tracing as tracing
 import pururu.utils as utils
-from pururu.application.events.entities import EndGameIntentEvent, GameStartedEvent, PururuEvent, GameEndedEvent
-from pururu.application.events.entities import MemberJoinedChannelEvent, MemberLeftChannelEvent, NewGameIntentEvent
+from pururu.application.events.entities import EndGameIntentEvent, GameStartedEvent, PururuEvent, GameEndedEvent, \
+    GameDiscardedEvent
+from pururu.application.events.entities import MemberJoinedChannelEvent, MemberLeftChannelEvent, NewGameIntentEvent, \
+    MemberMovedChannelEvent
 from pururu.application.events.event_system import EventSystem
-from pururu.domain.entities import MemberStats
-from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition
+from pururu.application.services.stats_cache import StatsCache, STATS_CACHE
+from pururu.domain.entities import MemberStats, Leaderboard, StatsFilter, AttendanceEventType, LeaderboardOrder, \
+    Attendance
+from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition, \
+    InvalidStatsFilter
 from pururu.domain.services.pururu_service import PururuService
 
 
 class PururuHandler:
-    def __init__(self, domain_service: PururuService, event_system: EventSystem):
+    def __init__(self, domain_service: PururuService, event_system: EventSystem, handler_clock: clock.Clock = None,
+                 players: list[str] = None):
         self.domain_service = domain_service
         self.event_system = event_system
+        self.clock = handler_clock or clock.get_clock()
+        self.guild_players = players
+        self.stats_cache = StatsCache(config.STATS_CACHE_SIZE)
+        self.stats_checked_at = self.clock.time()
         self.logger = utils.get_logger(__name__)
 
+    @property
+    def players(self) -> list[str]:
+        """
+        Players of the guild served by this handler, config.PLAYERS unless given
+        :return: list[str]
+        """
+        return config.PLAYERS if self.guild_players is None else self.guild_players
+
     def handle_voice_state_update_dc_event(self, member: str, before_channel: str | None,
-                                           after_channel: str | None) -> None:
+                                           after_channel: str | None, changed_at: datetime = None) -> None:
         """
         Handles the Discord voice state update event
         :param member: member name
         :param before_channel: before_state channel name
         :param after_channel: after_state channel name
+        :param changed_at: time of the update, now by default
         :return: None
         """
-        self.logger.info(f"Member {member} has changed voice state from {before_channel} to {after_channel}")
-        if member not in config.PLAYERS:
-            self.logger.info(f"Member {member} is not a player")
+        self.logger.info("Member %s has changed voice state from %s to %s", member, before_channel, after_channel)
+        if member not in self.players:
+            self.logger.info("Member %s is not a player", member)
             return
         event = None
+        changed_at = changed_at or self.clock.now()
         if before_channel is None:
-            event = MemberJoinedChannelEvent(member, after_channel, datetime.now())
+            event = MemberJoinedChannelEvent(member, after_channel, changed_at)
         elif after_channel is None:
-            event = MemberLeftChannelEvent(member, before_channel, datetime.now())
+            event = MemberLeftChannelEvent(member, before_channel, changed_at)
+        elif before_channel != after_channel:
+            event = MemberMovedChannelEvent(member, before_channel, after_channel, changed_at)
         if event:
             self.__emit_event(event)
 
@@ -43,13 +67,13 @@ class PururuHandler:
         :param event: MemberJoinedChannelEvent
         :return: None
         """
-        self.logger.info(f"Member {event.member} joined channel {event.channel} at {event.joined_at}")
-        should_start_new_game: bool = self.domain_service.add_player(event.member, event.joined_at)
+        self.logger.info("Member %s joined channel %s at %s", event.member, event.channel, event.joined_at)
+        should_start_new_game: bool = self.domain_service.add_player(event.member, event.joined_at, event.channel)
         if should_start_new_game:
-            session_info = self.domain_service.get_session_info()
-            self.logger.debug(f"Emitting new game intent, {session_info.players}")
-            event = NewGameIntentEvent(session_info.players, datetime.now())
-            self.__emit_event(event, config.ATTENDANCE_CHECK_DELAY)
+            session_info = self.domain_service.get_session_info(event.channel)
+            self.logger.debug("Emitting new game intent in channel %s, %s", event.channel, session_info.players)
+            event = NewGameIntentEvent(session_info.players, self.clock.now(), event.channel)
+            self.__emit_event(event, config.ATTENDANCE_CHECK_DELAY, "attendance_check")
 
     def handle_member_left_channel_event(self, event: MemberLeftChannelEvent) -> None:
         """
@@ -57,13 +81,29 @@ class PururuHandler:
         :param event: MemberLeftChannelEvent
         :return: None
         """
-        self.logger.info(f"Member {event.member} left channel {event.channel} at {event.left_at}")
-        should_end_game: bool = self.domain_service.remove_player(event.member, event.left_at)
+        self.logger.info("Member %s left channel %s at %s", event.member, event.channel, event.left_at)
+        should_end_game: bool = self.domain_service.remove_player(event.member, event.left_at, event.channel)
         if should_end_game:
-            session_info = self.domain_service.get_session_info()
-            self.logger.debug(f"Emitting end game intent for game_id {session_info.game_id}, {session_info.players}")
-            event = EndGameIntentEvent(session_info.game_id, session_info.players, datetime.now())
-            self.__emit_event(event, config.ATTENDANCE_CHECK_DELAY)
+            session_info = self.domain_service.get_session_info(event.channel)
+            self.logger.debug("Emitting end game intent for game_id %s, %s", session_info.game_id,
+                              session_info.players)
+            event = EndGameIntentEvent(session_info.game_id, session_info.players, self.clock.now(), event.channel)
+            self.__emit_event(event, config.ATTENDANCE_CHECK_DELAY, "attendance_check")
+
+    def handle_member_moved_channel_event(self, event: MemberMovedChannelEvent) -> None:
+        """
+        Handles the MemberMovedChannelEvent; with config.CHANNEL_SESSIONS it is a leave of the from_channel session
+        followed by a join to the to_channel one, otherwise the player stays online in the same session
+        :param event: MemberMovedChannelEvent
+        :return: None
+        """
+        self.logger.info("Member %s moved from channel %s to %s at %s", event.member, event.from_channel,
+                         event.to_channel, event.moved_at)
+        if config.CHANNEL_SESSIONS:
+            self.handle_member_left_channel_event(MemberLeftChannelEvent(event.member, event.from_channel,
+                                                                         event.moved_at))
+            self.handle_member_joined_channel_event(MemberJoinedChannelEvent(event.member, event.to_channel,
+                                                                             event.moved_at))
 
     def handle_new_game_intent_event(self, event: NewGameIntentEvent) -> None:
         """
@@ -71,13 +111,14 @@ class PururuHandler:
         :param event: NewGameIntentEvent
         :return: None
         """
-        self.logger.info(f"Handling New game intent with start time at {event.start_time} for players {event.players}")
+        self.logger.info("Handling New game intent with start time at %s for players %s in channel %s",
+                         event.start_time, event.players, event.channel)
         try:
-            session = self.domain_service.start_new_game(event.start_time)
-            event = GameStartedEvent(session.game_id, session.players)
+            session = self.domain_service.start_new_game(event.start_time, event.channel)
+            event = GameStartedEvent(session.game_id, session.players, event.channel, event.start_time)
             self.__emit_event(event)
         except CannotStartNewGame as e:
-            self.logger.warn(f"Cannot start new game: {e}")
+            self.logger.warning("Cannot start new game: %s", e)
 
     def handle_end_game_intent_event(self, event: EndGameIntentEvent) -> None:
         """
@@ -85,16 +126,17 @@ class PururuHandler:
         :param event: EndGameIntentEvent
         :return: None
         """
-        self.logger.info(f"Handling End game intent for game_id {event.game_id} with end time at {event.end_time} "
-                         f"for players {event.players}")
+        self.logger.info("Handling End game intent for game_id %s with end time at %s for players %s",
+                         event.game_id, event.end_time, event.players)
         try:
-            attendance = self.domain_service.end_game(event.end_time)
+            attendance = self.domain_service.end_game(event.end_time, event.channel)
             event = GameEndedEvent(attendance)
             self.__emit_event(event)
         except CannotEndGame as e:
-            self.logger.warn(f"Cannot end game: {e}")
+            self.logger.warning("Cannot end game: %s", e)
         except GameEndedWithoutPrecondition as e:
-            self.logger.warn(f"Game ended without precondition: {e}")
+            self.logger.warning("Game ended without precondition: %s", e)
+            self.__emit_event(GameDiscardedEvent(event.game_id, event.players, event.end_time, event.channel))
 
     def handle_game_started_event(self, event: GameStartedEvent) -> None:
         """
@@ -102,7 +144,8 @@ class PururuHandler:
         :param event: GameStartedEvent
         :return: None
         """
-        self.logger.info(f"Game {event.game_id} has started with players {event.players}")
+        self.logger.info("Game %s has started in channel %s with players %s", event.game_id, event.channel,
+                         event.players)
 
     def handle_game_ended_event(self, event: GameEndedEvent) -> None:
         """
@@ -110,20 +153,149 @@ class PururuHandler:
         :param event: GameEndedEvent
         :return: None
         """
-        self.logger.info(f"Game {event.attendance.game_id} has ended with attendance {event.attendance}")
+        self.logger.info("Game %s has ended with attendance %s", event.attendance.game_id, event.attendance)
+        self.stats_cache.invalidate()
+        # Off the event flow: every member of the game checks /stats right after it, see precompute_stats
+        self.clock.call_later(0, lambda: self.precompute_stats(event.attendance))
+
+    def handle_game_discarded_event(self, event: GameDiscardedEvent) -> None:
+        """
+        Handles the GameDiscardedEvent, a game ended without enough attendance and was not stored
+        :param event: GameDiscardedEvent
+        :return: None
+        """
+        self.logger.info("Game %s has been discarded in channel %s", event.game_id, event.channel)
 
-    def retrieve_player_stats(self, player: str) -> MemberStats:
+    def precompute_stats(self, attendance: Attendance) -> None:
+        """
+        Refreshes the leaderboard, one read of the attendance matrix and of the coins of every player, and caches the
+        rendered stats of the members of the game, so the /stats burst after a game is served from memory
+        :param attendance: Attendance of the ended game
+        :return: None
+        """
+        try:
+            rendered = self.__rendered_leaderboard(self.domain_service.refresh_leaderboard())
+        except Exception as e:
+            self.logger.error("Error precomputing the stats of game %s: %s", attendance.game_id, e)
+            return
+        members = [member.member for member in attendance.members if member.member in rendered]
+        for member in members:
+            self.stats_cache.put(member, None, rendered[member])
+        self.stats_checked_at = self.clock.time()
+        STATS_CACHE.labels('precomputed').inc(len(members))
+        self.logger.debug("Stats of game %s members precomputed: %s", attendance.game_id, members)
+
+    def retrieve_player_stats(self, player: str, stats_filter: StatsFilter = None) -> MemberStats:
         """
         Retrieves the attendance stats of a player
         :param player: player name
+        :param stats_filter: optional StatsFilter, see build_stats_filter
         :return: MemberStats
         """
-        self.logger.info(f"Retrieving stats for player {player}")
-        return self.domain_service.calculate_player_stats(player)
+        self.logger.info("Retrieving stats for player %s", player)
+        return self.domain_service.calculate_player_stats(player, stats_filter)
+
+    def render_player_stats(self, player: str, stats_filter: StatsFilter = None) -> str:
+        """
+        Rendered stats of a player (MemberStats.as_message), served from the stats cache until a game ends or the
+        sheet changes, see check_sheet_changes
+        :param player: player name
+        :param stats_filter: optional StatsFilter, see build_stats_filter
+        :return: str
+        """
+        self.check_sheet_changes()
+        message = self.stats_cache.get(player, stats_filter)
+        if message is None:
+            message = self.retrieve_player_stats(player, stats_filter).as_message()
+            self.stats_cache.put(player, stats_filter, message)
+        return message
+
+    def check_sheet_changes(self) -> None:
+        """
+        Every config.STATS_CACHE_TTL seconds refreshes the leaderboard from a fresh read of the sheet, bypassing the
+        in-memory attendance matrix, and drops the cached stats that differ from it, e.g. edited in the sheet by an
+        officer, or whose player is not in the leaderboard. An edit may only change a filtered window (e.g. the date of
+        a game), so the filtered stats are always dropped
+        :return: None
+        """
+        now = self.clock.time()
+        if len(self.stats_cache) == 0:
+            self.stats_checked_at = now
+            return
+        if now - self.stats_checked_at < config.STATS_CACHE_TTL:
+            return
+        self.stats_checked_at = now
+        try:
+            rendered = self.__rendered_leaderboard(self.domain_service.refresh_leaderboard(fresh=True))
+        except Exception as e:
+            self.logger.warning("Cannot check the sheet for stats changes, dropping the stats cache: %s", e)
+            self.stats_cache.invalidate()
+            return
+        self.stats_cache.invalidate_filtered()
+        for player in self.stats_cache.invalidate_changed(rendered):
+            self.logger.debug("Stats of player %s changed in the sheet", player)
+
+    @staticmethod
+    def build_stats_filter(start_date: str = None, end_date: str = None, season: str = None,
+                           event_type: str = None) -> StatsFilter | None:
+        """
+        Builds the stats filter from the /stats options; explicit dates narrow the season range
+        :param start_date: first date (included), YYYY-MM-DD
+        :param end_date: last date (included), YYYY-MM-DD
+        :param season: season name, check config.SEASONS
+        :param event_type: AttendanceEventType name, e.g. OFFICIAL_MEETING
+        :return: StatsFilter | None; None if no option was given
+        :raises InvalidStatsFilter: if any option cannot be parsed
+        """
+        if not any([start_date, end_date, season, event_type]):
+            return None
+        start, end = None, None
+        if season:
+            if season not in config.SEASONS:
+                raise InvalidStatsFilter(f"Temporada desconocida: {season}")
+            start, end = (PururuHandler.__parse_filter_date(value) for value in config.SEASONS[season])
+        if start_date:
+            start = max(filter(None, [start, PururuHandler.__parse_filter_date(start_date)]))
+        if end_date:
+            end = min(filter(None, [end, PururuHandler.__parse_filter_date(end_date)]))
+        if start and end and start > end:
+            raise InvalidStatsFilter(f"Rango de fechas vacío: {start} - {end}")
+        if event_type and event_type not in AttendanceEventType.__members__:
+            raise InvalidStatsFilter(f"Tipo de evento desconocido: {event_type}")
+        return StatsFilter(start, end, AttendanceEventType[event_type] if event_type else None)
+
+    def retrieve_leaderboard(self) -> Leaderboard:
+        """
+        Retrieves the players ranking
+        :return: Leaderboard
+        """
+        self.logger.info("Retrieving leaderboard")
+        return self.domain_service.get_leaderboard()
+
+    def warm_up(self) -> None:
+        """
+        Preloads the leaderboard, and with it the attendance matrix, so the first commands after a restart are fast
+        :return: None
+        """
+        self.logger.info("Warming up the leaderboard")
+        self.domain_service.refresh_leaderboard()
+
+    @staticmethod
+    def __rendered_leaderboard(leaderboard: Leaderboard) -> dict[str, str]:
+        return {stats.member: stats.as_message() for stats in leaderboard.rankings[LeaderboardOrder.POINTS]}
+
+    @staticmethod
+    def __parse_filter_date(value: str) -> date:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise InvalidStatsFilter(f"Fecha inválida: {value}, usa el formato AAAA-MM-DD")
 
-    def __emit_event(self, event: PururuEvent, delay: int = None) -> None:
+    def __emit_event(self, event: PururuEvent, delay: int = None, reason: str = None) -> None:
+        event.trace = tracing.current_context()
+        event.created_at = utils.get_current_time_formatted(self.clock)  # the bot event log follows the handler clock
         if delay:
-            self.event_system.emit_event_with_delay(event, delay)
+            self.event_system.emit_event_with_delay(event, delay, reason=reason)
         else:
             self.event_system.emit_event(event)
         self.domain_service.register_bot_event(event.as_bot_event())
@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures
+import threading
+from datetime import datetime
+
+import pururu.clock as clock
+import pururu.config as config
+import pururu.utils as utils
+from pururu.application.events.entities import EventType, GameStartedEvent, GameEndedEvent, \
+    MemberJoinedChannelEvent, MemberLeftChannelEvent, MemberMovedChannelEvent, GameDiscardedEvent
+from pururu.application.events.event_system import EventSystem
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.domain.entities import Message
+from pururu.domain.session_manager import SessionManager
+
+DELIVERY_ATTEMPTS = 5  # edit intervals waited for the status message to be delivered before giving up
+
+
+class GameStatus:
+    def __init__(self, game_id: int, channel: str | None, started_at: datetime, players: list[str], message: Message):
+        self.game_id = game_id
+        self.channel = channel
+        self.started_at = started_at
+        self.players = set(players)
+        self.message = message
+        self.attended: list[str] | None = None  # set once the game ends, None if it was discarded
+        self.ended_at: datetime | None = None
+        self.last_edit = 0.0
+        self.pending_edit = None
+        self.delivery = None  # future of the send_message
+        self.delivery_attempts = 0
+
+    def as_message(self, now: datetime) -> str:
+        minutes = int(((self.ended_at or now) - self.started_at).total_seconds() // 60)
+        if self.ended_at is None:
+            players = ", ".join(sorted(self.players)) or "-"
+            return f"Partida {self.game_id} en curso{f' en {self.channel}' if self.channel else ''}\n" \
+                   f"Tiempo de juego: {minutes // 60}h {minutes % 60:02d}m\n" \
+                   f"Jugadores ({len(self.players)}): {players}"
+        if self.attended is None:
+            return f"Partida {self.game_id} descartada{f' en {self.channel}' if self.channel else ''}\n" \
+                   f"Tiempo de juego: {minutes // 60}h {minutes % 60:02d}m\n" \
+                   f"Asistencia insuficiente, no se ha registrado"
+        return f"Partida {self.game_id} terminada{f' en {self.channel}' if self.channel else ''}\n" \
+               f"Tiempo de juego: {minutes // 60}h {minutes % 60:02d}m\n" \
+               f"Asistencia ({len(self.attended)}): {', '.join(sorted(self.attended)) or '-'}"
+
+
+class PendingEdit:
+    def __init__(self, due: float, handle):
+        self.due = due
+        self.handle = handle
+
+
+class SessionStatus:
+    """
+    One Discord message per game in the status channel: posted on GameStartedEvent, edited in place with the online
+    players and the running playtime, and finalized on GameEndedEvent or GameDiscardedEvent. Joins and leaves only mark the message as
+    stale; it is edited at most once every config.STATUS_EDIT_INTERVAL seconds, and every
+    config.STATUS_REFRESH_INTERVAL seconds while nothing changes so the playtime moves.
+    """
+
+    def __init__(self, pururu_handler: PururuHandler, event_system: EventSystem, channel_id: int,
+                 status_clock: clock.Clock = None):
+        self.pururu_handler = pururu_handler
+        self.channel_id = channel_id
+        self.clock = status_clock or clock.get_clock()
+        self.games: dict[int, GameStatus] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.lock = threading.RLock()
+        self.logger = utils.get_logger(__name__)
+        for event_type, listener in [(EventType.GAME_STARTED, self.on_game_started),
+                                     (EventType.GAME_ENDED, self.on_game_ended),
+                                     (EventType.GAME_DISCARDED, self.on_game_discarded),
+                                     (EventType.MEMBER_JOINED_CHANNEL, self.on_member_joined_channel),
+                                     (EventType.MEMBER_LEFT_CHANNEL, self.on_member_left_channel),
+                                     (EventType.MEMBER_MOVED_CHANNEL, self.on_member_moved_channel)]:
+            event_system.create_event(event_type)
+            event_system.register_listener(event_type, listener)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Sets the event loop of the Discord client, the events are handled in other threads
+        :param loop: running loop of the bot
+        :return: None
+        """
+        self.loop = loop
+
+    def on_game_started(self, event: GameStartedEvent) -> None:
+        with self.lock:
+            previous = self.games.get(event.game_id)
+            if previous is not None and previous.ended_at is None:
+                self.__end(previous, None)  # the id of a discarded game is reused, its status was not finalized
+            message = Message("", self.channel_id, mergeable=False)
+            game = GameStatus(event.game_id, event.channel, event.start_time or self.clock.now(), event.players,
+                              message)
+            self.games[event.game_id] = game
+            message.content = game.as_message(self.clock.now())
+            game.last_edit = self.clock.time()
+            game.delivery = self.__submit("send_message", message)
+            self.__schedule(game, config.STATUS_REFRESH_INTERVAL)
+
+    def on_game_ended(self, event: GameEndedEvent) -> None:
+        with self.lock:
+            game = self.games.get(event.game_id)
+            if game is None or game.ended_at is not None:
+                return
+            self.__end(game, [member.member for member in event.attendance.members if member.attendance])
+
+    def on_game_discarded(self, event: GameDiscardedEvent) -> None:
+        with self.lock:
+            game = self.games.get(event.game_id)
+            if game is None or game.ended_at is not None:
+                return
+            self.__end(game, None)
+
+    def on_member_joined_channel(self, event: MemberJoinedChannelEvent) -> None:
+        with self.lock:
+            for game in self.__games_of(event.channel):
+                game.players.add(event.member)
+                self.__mark_stale(game)
+
+    def on_member_left_channel(self, event: MemberLeftChannelEvent) -> None:
+        with self.lock:
+            for game in self.__games_of(event.channel):
+                game.players.discard(event.member)
+                self.__mark_stale(game)
+
+    def on_member_moved_channel(self, event: MemberMovedChannelEvent) -> None:
+        self.on_member_left_channel(MemberLeftChannelEvent(event.member, event.from_channel, event.moved_at))
+        self.on_member_joined_channel(MemberJoinedChannelEvent(event.member, event.to_channel, event.moved_at))
+
+    def __games_of(self, channel: str | None) -> list[GameStatus]:
+        key = SessionManager.key(channel)
+        return [game for game in self.games.values()
+                if game.ended_at is None and SessionManager.key(game.channel) == key]
+
+    def __end(self, game: GameStatus, attended: list[str] | None) -> None:
+        """
+        Finalizes the status with the attendance, None if the game was discarded
+        """
+        game.ended_at = self.clock.now()
+        game.attended = attended
+        self.__mark_stale(game)
+
+    def __forget(self, game: GameStatus) -> None:
+        if self.games.get(game.game_id) is game:
+            del self.games[game.game_id]
+
+    def __mark_stale(self, game: GameStatus) -> None:
+        """
+        Edits the message as soon as the throttle allows, replacing the scheduled refresh if it comes later
+        """
+        delay = max(0.0, game.last_edit + config.STATUS_EDIT_INTERVAL - self.clock.time())
+        if game.pending_edit is not None:
+            if game.pending_edit.due <= self.clock.time() + delay:
+                return
+            game.pending_edit.handle.cancel()
+        self.__schedule(game, delay)
+
+    def __schedule(self, game: GameStatus, delay: float) -> None:
+        game.pending_edit = PendingEdit(self.clock.time() + delay,
+                                        self.clock.call_later(delay, lambda: self.__edit(game)))
+
+    def __edit(self, game: GameStatus) -> None:
+        with self.lock:
+            game.pending_edit = None
+            if game.message.message_id is None:
+                game.delivery_attempts += 1
+                if game.ended_at is None and game.delivery_attempts < DELIVERY_ATTEMPTS and not self.__failed(game):
+                    self.__schedule(game, config.STATUS_EDIT_INTERVAL)  # not delivered yet
+                else:
+                    self.logger.warning("Status of game %s was never delivered, its edits are dropped", game.game_id)
+                    self.__forget(game)
+                return
+            game.last_edit = self.clock.time()
+            edited = Message(game.as_message(self.clock.now()), self.channel_id, mergeable=False)
+            edited.message_id = game.message.message_id
+            self.__submit("edit_message", edited)
+            if game.ended_at is None:
+                self.__schedule(game, config.STATUS_REFRESH_INTERVAL)
+            else:
+                self.__forget(game)
+
+    @staticmethod
+    def __failed(game: GameStatus) -> bool:
+        """
+        :return: bool True if the status message could not be sent, e.g. Discord was not ready or the call raised
+        """
+        if game.delivery is None:
+            return True
+        return game.delivery.done() and (game.delivery.cancelled() or game.delivery.exception() is not None)
+
+    def __submit(self, method: str, message: Message) -> concurrent.futures.Future | None:
+        discord_service = self.pururu_handler.domain_service.discord_service
+        if self.loop is None or discord_service is None:
+            self.logger.warning("Discord is not ready, status message of channel %s skipped", self.channel_id)
+            return None
+        return asyncio.run_coroutine_threadsafe(getattr(discord_service, method)(message), self.loop)
@@ -0,0 +1,102 @@
+import collections
+import threading
+
+import pururu.metrics as metrics
+from pururu.domain.entities import StatsFilter
+
+STATS_CACHE = metrics.REGISTRY.counter('pururu_stats_cache_total', 'Rendered /stats responses cache lookups and drops',
+                                       ('outcome',))
+
+
+class StatsCache:
+    """
+    Rendered stats of the players, least recently used first, bounded to `size` responses. A player may have several
+    entries, one per stats filter.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: collections.OrderedDict[tuple, str] = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(player: str, stats_filter: StatsFilter = None) -> tuple:
+        if stats_filter is None:
+            return player, None
+        return player, (stats_filter.start, stats_filter.end, stats_filter.event_type)
+
+    def get(self, player: str, stats_filter: StatsFilter = None) -> str | None:
+        """
+        :param player: player name
+        :param stats_filter: optional StatsFilter
+        :return: the rendered stats or None if they are not cached
+        """
+        key = self.key(player, stats_filter)
+        with self.lock:
+            message = self.entries.get(key)
+            if message is None:
+                STATS_CACHE.labels('miss').inc()
+                return None
+            self.entries.move_to_end(key)
+        STATS_CACHE.labels('hit').inc()
+        return message
+
+    def put(self, player: str, stats_filter: StatsFilter | None, message: str) -> None:
+        """
+        :param player: player name
+        :param stats_filter: optional StatsFilter
+        :param message: the rendered stats
+        :return: None
+        """
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[self.key(player, stats_filter)] = message
+            self.entries.move_to_end(self.key(player, stats_filter))
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                STATS_CACHE.labels('evicted').inc()
+
+    def invalidate(self, player: str = None) -> None:
+        """
+        Drops the entries of the player, every entry if None
+        :param player: player name
+        :return: None
+        """
+        with self.lock:
+            keys = [key for key in self.entries if player is None or key[0] == player]
+            for key in keys:
+                del self.entries[key]
+        STATS_CACHE.labels('invalidated').inc(len(keys))
+
+    def invalidate_filtered(self) -> None:
+        """
+        Drops the entries rendered with a stats filter
+        :return: None
+        """
+        with self.lock:
+            keys = [key for key in self.entries if key[1] is not None]
+            for key in keys:
+                del self.entries[key]
+        STATS_CACHE.labels('invalidated').inc(len(keys))
+
+    def invalidate_changed(self, rendered: dict[str, str]) -> list[str]:
+        """
+        Drops the lifetime stats entries that differ from the freshly rendered ones, or whose player is not in them
+        :param rendered: player -> rendered lifetime stats
+        :return: list[str] the players whose entry was dropped
+        """
+        with self.lock:
+            keys = [key for key, message in self.entries.items()
+                    if key[1] is None and rendered.get(key[0]) != message]
+            for key in keys:
+                del self.entries[key]
+        STATS_CACHE.labels('invalidated').inc(len(keys))
+        return [key[0] for key in keys]
+
+    def players(self) -> set[str]:
+        with self.lock:
+            return {key[0] for key in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,52 +1,114 @@
-import pururu.config as config
-import pururu.utils as utils
-from application.events.listeners import EventListeners
-from pururu.application.events.event_system import EventSystem
-from pururu.application.services.pururu_handler import PururuHandler
-from pururu.domain.services.pururu_service import PururuService
-from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
-from pururu.infrastructure.adapters.discord.discord_service_adapter import DiscordServiceAdapter
-from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter
+import functools
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pururu.startup as startup
+
+# The env files are loaded when the config is imported, the startup report starts before it
+with startup.boot_phase("config"):
+    import pururu.config as config
+with startup.boot_phase("app_import"):
+    import pururu.utils as utils
+    from pururu.application.services.guild_registry import GuildRegistry, GuildSettings, build_guild_context, \
+        load_guild_settings
+    from pururu.domain.services.database_service import DatabaseInterface
+    from pururu.domain.services.pururu_service import PururuService
+    from pururu.infrastructure.adapters.deferred.deferred_database import DeferredDatabase
+    from pururu.infrastructure.adapters.tracing.traced_database import TracedDatabase
 
 
 class Application:
     def __init__(self):
-        self.db_service = None
-        self.event_system = None
-        self.event_system_listeners = None
-        self.pururu_service = None
-        self.pururu_handler = None
-        self.discord_service = None
+        self.guild_registry = GuildRegistry()
+        self.sheets_client = None
+        self.sheets_client_lock = threading.Lock()
         self.discord_bot = None
+        self.startup = startup.StartupTimer(boot_phases=startup.BOOT_PHASES)
         self.logger = utils.get_logger(__name__)
 
     def init(self):
-        # Event System
-        self.event_system = EventSystem()
-
-        # Google Sheet - Database service implementation
-        self.db_service = GoogleSheetsAdapter(config.GOOGLE_SHEETS_CREDENTIALS, config.SPREADSHEET_ID)
-
-        # Domain service
-        self.pururu_service = PururuService(self.db_service)
+        guilds_settings = load_guild_settings()
 
-        # Application service
-        self.pururu_handler = PururuHandler(self.pururu_service, self.event_system)
+        if config.DOMAIN_WORKER_ENABLED:
+            # Domain service and Google Sheet adapter of every guild living in its own domain worker process
+            from pururu.infrastructure.worker.domain_worker import DomainServiceProxy, DomainWorker, \
+                build_domain_service
+            for settings in guilds_settings:
+                pururu_service = DomainServiceProxy(DomainWorker(functools.partial(
+                    build_domain_service, settings.spreadsheet_id, settings.players, settings.player_mapping)))
+                pururu_service.start()
+                self.guild_registry.register(build_guild_context(settings, pururu_service))
+        else:
+            # Google Sheet - Database service implementations, authenticated in background while Discord logs in
+            executor = ThreadPoolExecutor(1, thread_name_prefix="startup")
+            for settings in guilds_settings:
+                db_service = DeferredDatabase(executor.submit(self.build_database, settings))
+                # Domain service, application service, flap damper and event system of the guild
+                self.guild_registry.register(
+                    build_guild_context(settings, PururuService(db_service, players=settings.players)))
+            executor.shutdown(wait=False)
 
-        # Event Listeners
-        self.event_system_listeners = EventListeners(self.event_system, self.pururu_handler)
+        # Discord.py bot integration, imported here so the Google auth thread starts first
+        with self.startup.phase("import"):
+            from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
+            from pururu.infrastructure.adapters.discord.discord_outbox import DiscordOutbox
+            from pururu.infrastructure.adapters.discord.discord_service_adapter import DiscordServiceAdapter
+            from pururu.infrastructure.adapters.discord.sharded_discord_bot import PururuShardedDiscordBot
+        # Auto sharded mode: several gateway connections routed to the same guild registry
+        bot_class = PururuShardedDiscordBot if config.DISCORD_SHARDED else PururuDiscordBot
+        self.discord_bot = bot_class(self.guild_registry, self.startup)
 
-        # Discord.py bot integration
-        self.discord_bot = PururuDiscordBot(self.pururu_handler)
-
-        # Discord Service - Adapter implementation
-        self.discord_service = DiscordServiceAdapter(self.discord_bot)
-
-        # Additional wiring
-        self.pururu_service.set_discord_service(self.discord_service)
+        # Discord Service - Adapter implementation of every guild, behind its outbox
+        for guild in self.guild_registry:
+            guild.pururu_handler.domain_service.set_discord_service(
+                DiscordOutbox(DiscordServiceAdapter(self.discord_bot, guild.guild_id)))
 
         # Run Application
         self.discord_bot.run(config.DISCORD_TOKEN)
+        if self.discord_bot.startup_failed:
+            sys.exit(1)
+
+    def build_database(self, settings: GuildSettings) -> DatabaseInterface:
+        """
+        Imports the Google Sheets adapter and opens the guild spreadsheet, it runs in the startup thread; the client
+        is authenticated once and shared by every guild
+        :param settings: GuildSettings
+        :return: DatabaseInterface
+        """
+        with self.startup.phase("auth"):
+            from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter, \
+                authorize
+            with self.sheets_client_lock:
+                if self.sheets_client is None:
+                    self.sheets_client = self.retry(functools.partial(authorize, config.GOOGLE_SHEETS_CREDENTIALS))
+            db_service = self.retry(functools.partial(GoogleSheetsAdapter, config.GOOGLE_SHEETS_CREDENTIALS,
+                                                      settings.spreadsheet_id, settings.player_mapping,
+                                                      self.sheets_client))
+        if config.TRACING_ENABLED:
+            db_service = TracedDatabase(db_service)
+        return db_service
+
+    def retry(self, build):
+        """
+        Calls build up to config.STARTUP_RETRIES times, waiting config.STARTUP_RETRY_BACKOFF seconds after the first
+        failure and doubling it after each one
+        :param build: the call, e.g. the Google authorization
+        :return: the build result
+        :raises Exception: the error of the last attempt
+        """
+        backoff = config.STARTUP_RETRY_BACKOFF
+        for attempt in range(1, config.STARTUP_RETRIES + 1):
+            try:
+                return build()
+            except Exception as e:
+                if attempt >= config.STARTUP_RETRIES:
+                    raise
+                self.logger.warning("Startup attempt %s of %s failed, retrying in %ss: %s", attempt,
+                                    config.STARTUP_RETRIES, backoff, e)
+                time.sleep(backoff)
+                backoff *= 2
 
 
 if __name__ == '__main__':
@@ -0,0 +1,130 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+
+class Clock:
+    """
+    Wall clock and scheduler: the source of 'now' for the sessions, handlers and events, and of the delayed calls of
+    the EventSystem. Components receive it on construction and default to the process clock, see get_clock.
+    """
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def call_later(self, delay: float, callback):
+        """
+        Calls callback after delay seconds in a timer thread
+        :param delay: seconds
+        :param callback: callable without arguments
+        :return: a handle with a cancel() method
+        """
+        timer = threading.Timer(delay, callback)
+        timer.start()
+        return timer
+
+
+class ScheduledCall:
+    def __init__(self, due: float, callback):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class VirtualClock(Clock):
+    """
+    Deterministic clock for simulations and tests: time only moves on advance(), which runs the due calls in order
+    on the calling thread with the clock set to their due time.
+    """
+
+    def __init__(self, start: datetime = datetime(2024, 1, 1)):
+        self.current = start.timestamp()
+        self.scheduled: list[tuple[float, int, ScheduledCall]] = []
+        self.sequence = itertools.count()
+        self.lock = threading.RLock()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.current)
+
+    def time(self) -> float:
+        return self.current
+
+    def call_later(self, delay: float, callback) -> ScheduledCall:
+        with self.lock:
+            call = ScheduledCall(self.current + max(0.0, delay), callback)
+            heapq.heappush(self.scheduled, (call.due, next(self.sequence), call))
+            return call
+
+    def advance(self, seconds: float) -> int:
+        """
+        Moves the clock forward running every call due in the meantime, including the ones scheduled by them
+        :param seconds: seconds to move forward
+        :return: int, number of calls run
+        """
+        return self.advance_to(self.current + seconds)
+
+    def advance_to(self, target: float) -> int:
+        """
+        Moves the clock to the target timestamp, see advance
+        :param target: timestamp, never before the current time
+        :return: int, number of calls run
+        """
+        calls = 0
+        while True:
+            with self.lock:
+                if not self.scheduled or self.scheduled[0][0] > target:
+                    self.current = max(self.current, target)
+                    return calls
+                due, _, call = heapq.heappop(self.scheduled)
+                self.current = max(self.current, due)
+            if not call.cancelled:
+                call.callback()
+                calls += 1
+
+    def run_until_idle(self, limit: float = 86400) -> int:
+        """
+        Runs the scheduled calls until there are none left or limit seconds have passed, the clock stops at the
+        last call run
+        :param limit: maximum seconds to move forward
+        :return: int, number of calls run
+        """
+        target, calls = self.current + limit, 0
+        while True:
+            with self.lock:
+                if not self.scheduled or self.scheduled[0][0] > target:
+                    return calls
+                due = self.scheduled[0][0]
+            calls += self.advance_to(due)
+
+    def pending(self) -> int:
+        with self.lock:
+            return sum(1 for _, _, call in self.scheduled if not call.cancelled)
+
+
+_clock = Clock()
+
+
+def get_clock() -> Clock:
+    """
+    Returns the process clock, the default of every component
+    :return: Clock
+    """
+    return _clock
+
+
+def set_clock(clock: Clock) -> None:
+    """
+    Replaces the process clock, e.g. with a VirtualClock in simulations; components built before keep their clock
+    :param clock: Clock
+    :return: None
+    """
+    global _clock
+    _clock = clock
@@ -19,6 +19,8 @@ if env in ['production', 'development']:
 # -------------- Application configs
 # ----------------------------------------
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_RATE_LIMIT_INTERVAL = int(os.getenv('LOG_RATE_LIMIT_INTERVAL', 60))  # seconds, 0 disables rate limiting
+LOG_RATE_LIMIT_BURST = int(os.getenv('LOG_RATE_LIMIT_BURST', 20))  # same records allowed per interval
 ATTENDANCE_CHECK_DELAY = int(os.getenv('ATTENDANCE_CHECK_DELAY', 120))  # defaults to 2 minutes
 MIN_ATTENDANCE_TIME = int(os.getenv('MIN_ATTENDANCE_TIME', 1800))  # defaults to 30 minutes
 PLAYERS = os.getenv('PLAYERS').split(',') if os.getenv('PLAYERS') else []
@@ -26,12 +28,68 @@ MIN_ATTENDANCE_MEMBERS = int(os.getenv('MIN_ATTENDANCE_MEMBERS', 3))
 PING_MESSAGE = os.getenv('PING_MESSAGE', '')
 EVENT_CONCURRENCY_TIME = os.getenv('EVENT_CONCURRENCY_TIME', 20) #minimum amount of time in seconds allowed between events
 EVENT_DELAY_TIME = os.getenv('EVENT_DELAY_TIME', 20) #delay time
+ATTENDANCE_CACHE_TTL = int(os.getenv('ATTENDANCE_CACHE_TTL', 300))  # defaults to 5 minutes
+STATS_CACHE_SIZE = int(os.getenv('STATS_CACHE_SIZE', 256))  # rendered /stats responses kept, 0 disables
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', 300))  # seconds between checks of the sheet for stats changes
+LEADERBOARD_PAGE_SIZE = int(os.getenv('LEADERBOARD_PAGE_SIZE', 10))
+SEASONS = json.loads(os.getenv('SEASONS')) if os.getenv('SEASONS') else {}  # {"season": ["start", "end"]}
+VOICE_FLAP_GRACE = float(os.getenv('VOICE_FLAP_GRACE', 0))  # seconds a leave waits for a rejoin, 0 disables
+CHANNEL_SESSIONS = os.getenv('CHANNEL_SESSIONS', 'false').lower() == 'true'  # one game per voice channel
+
+# ----------------------------------------
+# -------------- Domain worker configs
+# ----------------------------------------
+DOMAIN_WORKER_ENABLED = os.getenv('DOMAIN_WORKER_ENABLED', 'false').lower() == 'true'
+DOMAIN_WORKER_QUEUE_SIZE = int(os.getenv('DOMAIN_WORKER_QUEUE_SIZE', 100))
+DOMAIN_WORKER_TIMEOUT = int(os.getenv('DOMAIN_WORKER_TIMEOUT', 30))  # seconds
+DOMAIN_WORKER_HEALTH_INTERVAL = int(os.getenv('DOMAIN_WORKER_HEALTH_INTERVAL', 30))  # seconds
+
+# ----------------------------------------
+# -------------- Metrics configs
+# ----------------------------------------
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+
+# ----------------------------------------
+# -------------- Event loop watchdog configs
+# ----------------------------------------
+LOOP_WATCHDOG_ENABLED = os.getenv('LOOP_WATCHDOG_ENABLED', 'false').lower() == 'true'
+LOOP_WATCHDOG_INTERVAL = float(os.getenv('LOOP_WATCHDOG_INTERVAL', 0.5))  # seconds between heartbeats
+LOOP_WATCHDOG_THRESHOLD = float(os.getenv('LOOP_WATCHDOG_THRESHOLD', 1))  # seconds blocked before reporting
+
+# ----------------------------------------
+# -------------- Profiling configs
+# ----------------------------------------
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 60))  # longest /profile run allowed
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds between samples
+
+# ----------------------------------------
+# -------------- Tracing configs
+# ----------------------------------------
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+TRACING_EXPORT_PATH = os.getenv('TRACING_EXPORT_PATH', 'traces.jsonl')
 
 # ----------------------------------------
 # -------------- Discord configs
 # ----------------------------------------
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD_ID = int(os.getenv('GUILD_ID', 0))
+GUILDS = json.loads(os.getenv('GUILDS')) if os.getenv('GUILDS') else {}  # per guild settings, see README
+DISCORD_SHARDED = os.getenv('DISCORD_SHARDED', 'false').lower() == 'true'
+DISCORD_SHARD_COUNT = int(os.getenv('DISCORD_SHARD_COUNT')) if os.getenv('DISCORD_SHARD_COUNT') else None  # None asks Discord
+SHARD_METRICS_INTERVAL = float(os.getenv('SHARD_METRICS_INTERVAL', 15))  # seconds between shard latency samples
+DISCORD_CACHE_PROFILE = os.getenv('DISCORD_CACHE_PROFILE', 'default')  # default or lean, see README
+OUTBOX_RATE = int(os.getenv('OUTBOX_RATE', 5))  # messages per channel every OUTBOX_RATE_PERIOD seconds
+OUTBOX_RATE_PERIOD = float(os.getenv('OUTBOX_RATE_PERIOD', 5))
+OUTBOX_MERGE_WINDOW = float(os.getenv('OUTBOX_MERGE_WINDOW', 10))  # seconds a message takes appends, 0 disables
+STATUS_CHANNEL_ID = int(os.getenv('STATUS_CHANNEL_ID', 0))  # text channel of the game status messages, 0 disables
+STATUS_EDIT_INTERVAL = float(os.getenv('STATUS_EDIT_INTERVAL', 10))  # minimum seconds between edits of a status
+STATUS_REFRESH_INTERVAL = float(os.getenv('STATUS_REFRESH_INTERVAL', 60))  # playtime refresh while nothing changes
+COMMAND_SYNC_STATE_PATH = os.getenv('COMMAND_SYNC_STATE_PATH', '.command_sync.json')  # last synced fingerprints
+COMMAND_SYNC_FORCE = os.getenv('COMMAND_SYNC_FORCE', 'false').lower() == 'true'  # sync even if unchanged
+STARTUP_RETRIES = int(os.getenv('STARTUP_RETRIES', 4))  # attempts of the Google authorization before giving up
+STARTUP_RETRY_BACKOFF = float(os.getenv('STARTUP_RETRY_BACKOFF', 2))  # seconds, doubled after each failure
 
 # ----------------------------------------
 # -------------- GS Adapter configs
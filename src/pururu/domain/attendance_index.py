@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from pururu.domain.entities import AttendanceEventType, MemberStats, StatsFilter
+
+
+class EventTypeTimeline:
+    """
+    Games of a single AttendanceEventType sorted by date, with per player prefix sums of attendances, absences and
+    justified absences so any date range is reduced with two bisections and three subtractions.
+    """
+
+    def __init__(self, event_type: AttendanceEventType, dates: list[date], game_ids: list[int]):
+        self.event_type = event_type
+        self.dates = dates
+        self.game_ids = game_ids
+        self.attended: dict[str, list[int]] = {}
+        self.absent: dict[str, list[int]] = {}
+        self.justified: dict[str, list[int]] = {}
+        self.absent_positions: dict[str, list[int]] = {}
+
+    def add_player(self, player: str, attended: list[bool], absent: list[bool], justified: list[bool]) -> None:
+        """
+        Stores the prefix sums of a player
+        :param player: player name
+        :param attended: per game (in date order) attended flag
+        :param absent: per game (in date order) absent flag
+        :param justified: per game (in date order) justified absence flag
+        :return: None
+        """
+        self.attended[player] = self.__prefix_sum(attended)
+        self.absent[player] = self.__prefix_sum(absent)
+        self.justified[player] = self.__prefix_sum(justified)
+        self.absent_positions[player] = [pos for pos, is_absent in enumerate(absent) if is_absent]
+
+    def bounds(self, start: date | None, end: date | None) -> tuple[int, int]:
+        """
+        Positions [lo, hi) of the games between start and end, both included
+        :param start: first date, None for no lower bound
+        :param end: last date, None for no upper bound
+        :return: tuple[int, int]
+        """
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        return lo, max(lo, hi)
+
+    @staticmethod
+    def __prefix_sum(values: list[bool]) -> list[int]:
+        prefix = [0]
+        for value in values:
+            prefix.append(prefix[-1] + value)
+        return prefix
+
+
+class AttendanceIndex:
+    """
+    Date sorted index over an AttendanceMatrix answering filtered stats queries in O(log n), see EventTypeTimeline.
+    Games whose date cannot be parsed are indexed at date.min so they only count for queries without a start date.
+    """
+
+    def __init__(self, timelines: dict[AttendanceEventType, EventTypeTimeline]):
+        self.timelines = timelines
+
+    def member_stats(self, player: str, coins: int, stats_filter: StatsFilter) -> MemberStats:
+        """
+        Reduces the games matching the filter into the player stats
+        :param player: player name
+        :param coins: player coins
+        :param stats_filter: StatsFilter
+        :return: MemberStats
+        """
+        stats = MemberStats(player, 0, 0, 0, 0, coins)
+        absent_events = []
+        for event_type, timeline in self.timelines.items():
+            if stats_filter.event_type is not None and stats_filter.event_type != event_type:
+                continue
+            lo, hi = timeline.bounds(stats_filter.start, stats_filter.end)
+            stats.total_events += hi - lo
+            if player not in timeline.attended or lo == hi:
+                continue
+            attended = timeline.attended[player][hi] - timeline.attended[player][lo]
+            justifications = timeline.justified[player][hi] - timeline.justified[player][lo]
+            stats.absences += timeline.absent[player][hi] - timeline.absent[player][lo]
+            stats.justifications += justifications
+            stats.points += attended * event_type.points() + justifications
+            positions = timeline.absent_positions[player]
+            absent_events.extend((timeline.dates[pos], timeline.game_ids[pos])
+                                 for pos in positions[bisect_left(positions, lo):bisect_left(positions, hi)])
+        stats.absent_events = [game_id for _, game_id in sorted(absent_events)]
+        return stats
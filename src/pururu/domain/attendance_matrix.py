@@ -0,0 +1,154 @@
+import threading
+from datetime import date
+
+import pururu.utils as utils
+from pururu.domain.attendance_index import AttendanceIndex, EventTypeTimeline
+from pururu.domain.entities import Attendance, AttendanceEventType, MemberStats
+
+
+class AttendanceMatrix:
+    """
+    Columnar view of the attendance history (games x players). Each player column is stored as int bitmaps where
+    bit i refers to the i-th game: registered (the player has a row entry), attended and justified. Each
+    AttendanceEventType keeps a bitmap of its games so points are weighted with popcounts instead of per-game loops.
+    """
+
+    def __init__(self):
+        self.game_ids: list[int] = []
+        self.dates: list[str] = []
+        self.game_index: dict[int, int] = {}
+        self.player_index: dict[str, int] = {}
+        self.registered: list[int] = []
+        self.attended: list[int] = []
+        self.justified: list[int] = []
+        self.event_type_masks: dict[AttendanceEventType, int] = {event_type: 0 for event_type in AttendanceEventType}
+        self.index: AttendanceIndex | None = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def of(attendances: list[Attendance]) -> 'AttendanceMatrix':
+        """
+        Builds the matrix from a list of attendances
+        :param attendances: list[Attendance], e.g. the Asistencia sheet rows
+        :return: AttendanceMatrix
+        """
+        matrix = AttendanceMatrix()
+        for attendance in attendances:
+            matrix.upsert(attendance)
+        return matrix
+
+    def upsert(self, attendance: Attendance) -> None:
+        """
+        Inserts a new game in the matrix or overwrites it if the game_id is already present
+        :param attendance: Attendance
+        :return: None
+        """
+        with self.lock:
+            self.index = None
+            idx = self.game_index.get(attendance.game_id)
+            if idx is None:
+                idx = len(self.game_ids)
+                self.game_index[attendance.game_id] = idx
+                self.game_ids.append(attendance.game_id)
+                self.dates.append(attendance.date)
+            else:
+                self.dates[idx] = attendance.date
+                self.__clear_game(idx)
+            bit = 1 << idx
+            self.event_type_masks[attendance.event_type] |= bit
+            for member in attendance.members:
+                col = self.__get_player_column(member.member)
+                self.registered[col] |= bit
+                if member.attendance:
+                    self.attended[col] |= bit
+                if member.justified:
+                    self.justified[col] |= bit
+
+    def member_stats(self, player: str, coins: int) -> MemberStats:
+        """
+        Reduces the player column into its stats
+        :param player: player name
+        :param coins: player coins
+        :return: MemberStats
+        """
+        with self.lock:
+            stats = MemberStats(player, len(self.game_ids), 0, 0, 0, coins)
+            col = self.player_index.get(player)
+            if col is None:
+                return stats
+            attended = self.attended[col]
+            absent = self.registered[col] & ~attended
+            justified_absent = absent & self.justified[col]
+            stats.absences = absent.bit_count()
+            stats.justifications = justified_absent.bit_count()
+            stats.points = stats.justifications + sum(event_type.points() * (attended & mask).bit_count()
+                                                      for event_type, mask in self.event_type_masks.items() if mask)
+            stats.absent_events = [self.game_ids[idx] for idx in self.__set_bits(absent)]
+            return stats
+
+    def all_members_stats(self, coins: dict[str, int]) -> dict[str, MemberStats]:
+        """
+        Reduces every player column into its stats
+        :param coins: player -> coins; missing players default to 0
+        :return: dict[str, MemberStats] player -> stats
+        """
+        return {player: self.member_stats(player, coins.get(player, 0)) for player in list(self.player_index)}
+
+    def date_index(self) -> AttendanceIndex:
+        """
+        Returns the date sorted index of the matrix, it is built on first use and dropped on every upsert
+        :return: AttendanceIndex
+        """
+        with self.lock:
+            if self.index is None:
+                self.index = self.__build_index()
+            return self.index
+
+    def __build_index(self) -> AttendanceIndex:
+        game_dates = [utils.parse_date(game_date) or date.min for game_date in self.dates]
+        timelines = {}
+        for event_type, mask in self.event_type_masks.items():
+            positions = sorted(self.__set_bits(mask), key=lambda idx: game_dates[idx])
+            if not positions:
+                continue
+            timeline = EventTypeTimeline(event_type, [game_dates[idx] for idx in positions],
+                                         [self.game_ids[idx] for idx in positions])
+            for player, col in self.player_index.items():
+                attended = self.attended[col]
+                absent = self.registered[col] & ~attended
+                attended_flags = self.__to_flags(attended)
+                absent_flags = self.__to_flags(absent)
+                justified_flags = self.__to_flags(absent & self.justified[col])
+                timeline.add_player(player,
+                                    [attended_flags[idx] for idx in positions],
+                                    [absent_flags[idx] for idx in positions],
+                                    [justified_flags[idx] for idx in positions])
+            timelines[event_type] = timeline
+        return AttendanceIndex(timelines)
+
+    def __get_player_column(self, player: str) -> int:
+        col = self.player_index.get(player)
+        if col is None:
+            col = len(self.registered)
+            self.player_index[player] = col
+            self.registered.append(0)
+            self.attended.append(0)
+            self.justified.append(0)
+        return col
+
+    def __clear_game(self, idx: int) -> None:
+        mask = ~(1 << idx)
+        for event_type in self.event_type_masks:
+            self.event_type_masks[event_type] &= mask
+        for col in range(len(self.registered)):
+            self.registered[col] &= mask
+            self.attended[col] &= mask
+            self.justified[col] &= mask
+
+    def __to_flags(self, mask: int) -> list[bool]:
+        bits = bin(mask)[:1:-1]
+        return [char == '1' for char in bits] + [False] * (len(self.game_ids) - len(bits))
+
+    @staticmethod
+    def __set_bits(mask: int) -> list[int]:
+        return [idx for idx, char in enumerate(bin(mask)[:1:-1]) if char == '1']
@@ -1,16 +1,18 @@
 from datetime import datetime
 
+import pururu.clock as clock
 import pururu.config as config
 import pururu.utils as utils
 
 
 class CurrentSession:
-    def __init__(self):
+    def __init__(self, session_clock: clock.Clock = None):
+        self.clock = session_clock or clock.get_clock()
         self.online_players = set()
         self.players_clock_ins = {}
         self.players_clock_outs = {}
         self.game_id = None
-        self.logger = self.logger = utils.get_logger(__name__)
+        self.logger = utils.get_logger(__name__)
 
     def clock_in(self, player: str, time: datetime = None) -> None:
         """
@@ -20,7 +22,7 @@ class CurrentSession:
         :return: None
         """
         if time is None:
-            time = datetime.now()
+            time = self.clock.now()
         self.online_players.add(player)
         if player not in self.players_clock_ins:
             self.players_clock_ins[player] = []
@@ -36,13 +38,13 @@ class CurrentSession:
         :return: None
         """
         if time is None:
-            time = datetime.now()
+            time = self.clock.now()
         if player not in self.online_players:
-            self.logger.error(f"Player {player} not found in online_players")
+            self.logger.error("Player %s not found in online_players", player)
             return
         self.online_players.remove(player)
         if player not in self.players_clock_outs:
-            self.logger.error(f"Player {player} not found in clock_outs")
+            self.logger.error("Player %s not found in clock_outs", player)
             return
         self.players_clock_outs[player].append(utils.format_time(time))
 
@@ -60,7 +62,7 @@ class CurrentSession:
         for i in range(len(clock_ins)):
             clock_in = utils.parse_time(clock_ins[i])
             clock_out = datetime.strptime(clock_outs[i], utils.FORMATTED_TIME_STR) if i < len(
-                clock_outs) else datetime.now()
+                clock_outs) else self.clock.now()
             total_time += (clock_out - clock_in).total_seconds()
         return int(total_time)
 
@@ -94,7 +96,7 @@ class CurrentSession:
         Resets the current game to initial state
         :return: None
         """
-        self.__init__()
+        self.__init__(self.clock)
 
     def adjust_players_clocking_start_time(self, start_time: datetime) -> None:
         """
@@ -112,8 +114,8 @@ class CurrentSession:
                     clock_out = player_clock_outs[i]
                     clock_out_time = datetime.strptime(clock_out, utils.FORMATTED_TIME_STR)
                     if clock_out_time <= start_time:
-                        self.logger.debug(f"Discarding clock_in {clock_in} and clock_out {clock_out} for "
-                                          f"player {player} because it is before start_time {start_time}")
+                        self.logger.debug("Discarding clock_in %s and clock_out %s for player %s because it is "
+                                          "before start_time %s", clock_in, clock_out, player, start_time)
                         continue
                     else:
                         adjusted_clock_outs.append(clock_out)
@@ -140,8 +142,8 @@ class CurrentSession:
                     utils.FORMATTED_TIME_STR)
                 clock_in_time = datetime.strptime(clock_in, utils.FORMATTED_TIME_STR)
                 if clock_in_time >= end_time:
-                    self.logger.debug(f"Discarding clock_in {clock_in} and clock_out {clock_out} for "
-                                      f"player {player} because it is after end_time {end_time}")
+                    self.logger.debug("Discarding clock_in %s and clock_out %s for player %s because it is "
+                                      "after end_time %s", clock_in, clock_out, player, end_time)
                     continue
                 else:
                     adjusted_clock_ins.append(clock_in)
@@ -1,3 +1,4 @@
+from datetime import date
 from enum import Enum
 
 
@@ -74,11 +75,101 @@ class MemberStats:
                f"KeroCoins: {self.coins}"
 
 
+class StatsFilter:
+    def __init__(self, start: date | None = None, end: date | None = None,
+                 event_type: AttendanceEventType | None = None):
+        self.start = start
+        self.end = end
+        self.event_type = event_type
+
+    def as_message(self) -> str:
+        filters = []
+        if self.start:
+            filters.append(f"desde {self.start.isoformat()}")
+        if self.end:
+            filters.append(f"hasta {self.end.isoformat()}")
+        if self.event_type:
+            filters.append(f"solo {self.event_type.value}")
+        return f"({', '.join(filters)})" if filters else ""
+
+
+class LeaderboardOrder(Enum):
+    POINTS = "points"
+    ABSENCES = "absences"
+    COINS = "coins"
+
+    def title(self) -> str:
+        if self == LeaderboardOrder.ABSENCES:
+            return "Faltas"
+        if self == LeaderboardOrder.COINS:
+            return "KeroCoins"
+        return "Puntos"
+
+    def value_of(self, stats: MemberStats) -> int:
+        if self == LeaderboardOrder.ABSENCES:
+            return stats.absences
+        if self == LeaderboardOrder.COINS:
+            return stats.coins
+        return stats.points
+
+    def sort_key(self, stats: MemberStats) -> tuple:
+        if self == LeaderboardOrder.ABSENCES:
+            return stats.absences, -stats.points, stats.member
+        if self == LeaderboardOrder.COINS:
+            return -stats.coins, -stats.points, stats.member
+        return -stats.points, stats.absences, stats.member
+
+
+class Leaderboard:
+    def __init__(self, members_stats: list[MemberStats], page_size: int):
+        self.page_size = max(page_size, 1)
+        self.rankings = {order: sorted(members_stats, key=order.sort_key) for order in LeaderboardOrder}
+
+    def total_pages(self) -> int:
+        return max((len(self.rankings[LeaderboardOrder.POINTS]) + self.page_size - 1) // self.page_size, 1)
+
+    def page(self, order: LeaderboardOrder, page: int) -> list[MemberStats]:
+        start = (min(max(page, 1), self.total_pages()) - 1) * self.page_size
+        return self.rankings[order][start:start + self.page_size]
+
+    def as_message(self, order: LeaderboardOrder, page: int) -> str:
+        page = min(max(page, 1), self.total_pages())
+        first_position = (page - 1) * self.page_size + 1
+        lines = [f"Clasificación por {order.title()} (página {page}/{self.total_pages()})"]
+        for position, stats in enumerate(self.page(order, page), first_position):
+            lines.append(f"{position}. {stats.member}: {order.value_of(stats)}")
+        return "\n".join(lines)
+
+
 class Message:
-    def __init__(self, content: str, channel_id: int):
+    def __init__(self, content: str, channel_id: int, mergeable: bool = True):
         self.message_id = None
         self.content = content
         self.channel_id = channel_id
+        self.mergeable = mergeable  # False for messages edited later, e.g. a game status
+
+
+class VoiceChannel:
+    """
+    Voice channel identified by its Discord id, so a renamed channel is still the same channel and channels with the
+    same name are not; it reads as its name in messages and logs
+    """
+
+    def __init__(self, channel_id: int, name: str):
+        self.channel_id = channel_id
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, VoiceChannel) and self.channel_id == other.channel_id
+
+    def __hash__(self):
+        return hash(self.channel_id)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"VoiceChannel({self.channel_id}, {self.name})"
 
 
 class SessionInfo:
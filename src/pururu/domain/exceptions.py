@@ -19,3 +19,8 @@ class CannotEndGame(PururuException):
 class GameEndedWithoutPrecondition(PururuException):
     """Raised when a game ends before the minimum playtime or has less than the minimum players."""
     pass
+
+
+class InvalidStatsFilter(PururuException):
+    """Raised when the stats filter options cannot be parsed."""
+    pass
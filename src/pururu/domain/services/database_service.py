@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 
+from pururu.domain.attendance_matrix import AttendanceMatrix
 from pururu.domain.entities import Attendance, BotEvent, Clocking
 
 
@@ -12,6 +13,17 @@ class DatabaseInterface(ABC):
     def get_all_attendances(self) -> list[Attendance]:
         pass
 
+    @abstractmethod
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        pass
+
+    def load_attendance_matrix(self) -> AttendanceMatrix:
+        """
+        Reads the attendance matrix from the database, bypassing any in-memory copy of get_attendance_matrix
+        :return: AttendanceMatrix
+        """
+        return AttendanceMatrix.of(self.get_all_attendances())
+
     @abstractmethod
     def upsert_clocking(self, clocking: Clocking) -> None:
         pass
@@ -27,3 +39,7 @@ class DatabaseInterface(ABC):
     @abstractmethod
     def get_player_coins(self, player: str) -> int:
         pass
+
+    @abstractmethod
+    def get_all_player_coins(self) -> dict[str, int]:
+        pass
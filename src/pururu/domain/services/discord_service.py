@@ -6,4 +6,8 @@ from pururu.domain.entities import Message
 class DiscordInterface(ABC):
     @abstractmethod
     async def send_message(self, message: Message) -> Message:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def edit_message(self, message: Message) -> Message:
+        pass
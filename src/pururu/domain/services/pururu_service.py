@@ -1,21 +1,51 @@
+import threading
 from datetime import datetime
 
+import pururu.clock as clock
 import pururu.config as config
 import pururu.utils as utils
 from pururu.domain.current_session import CurrentSession
+from pururu.domain.session_manager import SessionManager
 from pururu.domain.entities import BotEvent, Attendance, MemberAttendance, Clocking, AttendanceEventType, MemberStats
-from pururu.domain.entities import SessionInfo
+from pururu.domain.entities import SessionInfo, Leaderboard, StatsFilter, VoiceChannel
 from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition
 from pururu.domain.services.database_service import DatabaseInterface
 from pururu.domain.services.discord_service import DiscordInterface
 
 
 class PururuService:
-    def __init__(self, database_service: DatabaseInterface):
+    def __init__(self, database_service: DatabaseInterface, service_clock: clock.Clock = None,
+                 players: list[str] = None):
         self.logger = utils.get_logger(__name__)
-        self.current_session = CurrentSession()
+        self.clock = service_clock or clock.get_clock()
+        self.guild_players = players
+        self.sessions = SessionManager(self.clock)
+        self.game_id_lock = threading.Lock()  # a new game id is read and reserved at once, whatever the channel
+        self.released_game_ids: set[int] = set()  # reserved by games that ended without being stored
         self.database_service = database_service
         self.discord_service = None
+        self.leaderboard: Leaderboard | None = None
+
+    @property
+    def players(self) -> list[str]:
+        """
+        Players of the guild served by this service, config.PLAYERS unless given
+        :return: list[str]
+        """
+        return config.PLAYERS if self.guild_players is None else self.guild_players
+
+    @property
+    def current_session(self) -> CurrentSession:
+        """
+        Session of the default channel (None), the only one if config.CHANNEL_SESSIONS is disabled; reading it does
+        not open it
+        :return: CurrentSession
+        """
+        return self.sessions.get(None)
+
+    @current_session.setter
+    def current_session(self, session: CurrentSession) -> None:
+        self.sessions.put(None, session)
 
     def set_discord_service(self, discord_service: DiscordInterface) -> None:
         """
@@ -31,124 +61,177 @@ class PururuService:
         :param event: BotEvent
         :return: None
         """
-        self.logger.debug(f"Registering bot event: {event}")
+        self.logger.debug("Registering bot event: %s", event)
         self.database_service.insert_bot_event(event)
 
-    def get_session_info(self) -> SessionInfo:
+    def get_session_info(self, channel: VoiceChannel | str = None) -> SessionInfo:
         """
-        Retrieves the list of players in the current game
-        :return: list[str]
+        Retrieves the game id and the list of players of the channel session
+        :param channel: voice channel, the default session if None
+        :return: SessionInfo
         """
-        return SessionInfo(self.current_session.game_id, self.current_session.get_players())
+        session = self.sessions.get(channel)
+        return SessionInfo(session.game_id, session.get_players())
 
-    def add_player(self, player: str, time: datetime) -> bool:
+    def add_player(self, player: str, time: datetime, channel: VoiceChannel | str = None) -> bool:
         """
-        Adds a new player to the current game and returns a check to see if the conditions are met to start a new game
+        Adds a new player to the channel session and returns a check to see if the conditions are met to start a new
+        game
         :param player: player name
         :param time: time of clock in
+        :param channel: voice channel, the default session if None
         :return: bool True if a new game should be started; False otherwise
         """
-        self.logger.debug(f"Player {player} clock in {time}")
-        self.current_session.clock_in(player, time)
+        self.logger.debug("Player %s clock in %s at %s", player, channel, time)
+        session = self.sessions.open(channel)
+        session.clock_in(player, time)
 
-        return self.current_session.should_start_new_game()
+        return session.should_start_new_game()
 
-    def remove_player(self, player: str, time: datetime) -> bool:
+    def remove_player(self, player: str, time: datetime, channel: VoiceChannel | str = None) -> bool:
         """
-        Removes a player from the current game and returns a check to see if the conditions are met to end the game
+        Removes a player from the channel session and returns a check to see if the conditions are met to end the game
         :param player: player string
         :param time: time of clock out
+        :param channel: voice channel, the default session if None
         :return: bool True if the game should end; False otherwise
         """
-        self.logger.debug(f"Player {player} clock out {time}")
-        self.current_session.clock_out(player, time)
+        self.logger.debug("Player %s clock out %s at %s", player, channel, time)
+        session = self.sessions.get(channel)
+        session.clock_out(player, time)
+        should_end_game = session.should_end_game()
+        self.sessions.release(channel)
+        return should_end_game
 
-        return self.current_session.should_end_game()
-
-    def calculate_player_stats(self, player: str) -> MemberStats:
+    def calculate_player_stats(self, player: str, stats_filter: StatsFilter = None) -> MemberStats:
         """
-        Calculates the stats of a player based on the attendance list
+        Calculates the stats of a player based on the attendance matrix, see calculate_players_stats
         :param player: player name
+        :param stats_filter: optional date range / event type filter; lifetime stats if None
         :return: MemberStats
         """
-        attendance_list = self.database_service.get_all_attendances()
-        coins = self.database_service.get_player_coins(player)
-        member_stats = MemberStats(player, len(attendance_list), 0, 0, 0, coins)
-        for attendance in attendance_list:
-            member_attendance = next((m for m in attendance.members if m.member == player), None)
-            if member_attendance:
-                if member_attendance.attendance:
-                    member_stats.points += attendance.event_type.points()
-                else:
-                    member_stats.absences += 1
-                    member_stats.absent_events.append(attendance.game_id)
-                    if member_attendance.justified:
-                        member_stats.justifications += 1
-                        member_stats.points += 1
-        return member_stats
-
-    def start_new_game(self, start_time: datetime) -> SessionInfo | None:
-        """
-        Locally creates a new game (attendance) and stores it in the current_session attribute
+        return self.calculate_players_stats([player], stats_filter)[player]
+
+    def calculate_players_stats(self, players: list[str], stats_filter: StatsFilter = None,
+                                fresh: bool = False) -> dict[str, MemberStats]:
+        """
+        Calculates the stats of several players with one read of the attendance matrix and of the coins; /stats and
+        the leaderboard both go through it, so a player gets the same stats from either
+        :param players: player names
+        :param stats_filter: optional date range / event type filter; lifetime stats if None
+        :param fresh: reads the attendance matrix from the database instead of its in-memory copy
+        :return: dict[str, MemberStats]; player -> stats
+        """
+        if fresh:
+            attendance_matrix = self.database_service.load_attendance_matrix()
+        else:
+            attendance_matrix = self.database_service.get_attendance_matrix()
+        coins = self.database_service.get_all_player_coins()
+        if stats_filter is None:
+            return {player: attendance_matrix.member_stats(player, coins.get(player, 0)) for player in players}
+        date_index = attendance_matrix.date_index()
+        return {player: date_index.member_stats(player, coins.get(player, 0), stats_filter) for player in players}
+
+    def get_leaderboard(self) -> Leaderboard:
+        """
+        Retrieves the cached leaderboard, it is only calculated if there is none yet
+        :return: Leaderboard
+        """
+        if self.leaderboard is None:
+            return self.refresh_leaderboard()
+        return self.leaderboard
+
+    def refresh_leaderboard(self, fresh: bool = False) -> Leaderboard:
+        """
+        Calculates the ranking of every player (see players) and caches it
+        :param fresh: reads the attendance matrix from the database instead of its in-memory copy
+        :return: Leaderboard
+        """
+        members_stats = list(self.calculate_players_stats(self.players, fresh=fresh).values())
+        self.leaderboard = Leaderboard(members_stats, config.LEADERBOARD_PAGE_SIZE)
+        return self.leaderboard
+
+    def start_new_game(self, start_time: datetime, channel: VoiceChannel | str = None) -> SessionInfo | None:
+        """
+        Locally creates a new game (attendance) in the channel session
         :param start_time: start time of the game
+        :param channel: voice channel, the default session if None
         :return: SessionInfo: game_id and players of the new game
         :raises CannotStartNewGame: if the conditions to start a new game are not met
         """
-        if not self.current_session.should_start_new_game():
+        session = self.sessions.get(channel)
+        if not session.should_start_new_game():
             raise CannotStartNewGame(
-                f"Start game condition not met, current players: {self.current_session.get_players()}, game_id: {self.current_session.game_id}")
-        game_id = self.__get_new_game_id()
-        self.logger.debug(f"Starting new game, {game_id}")
-        self.current_session.adjust_players_clocking_start_time(start_time)
-        self.current_session.game_id = game_id
-        return SessionInfo(self.current_session.game_id, self.current_session.get_players())
+                f"Start game condition not met, current players: {session.get_players()}, game_id: {session.game_id}")
+        with self.game_id_lock:
+            game_id = self.__get_new_game_id()
+            self.logger.debug("Starting new game %s in channel %s", game_id, channel)
+            session.adjust_players_clocking_start_time(start_time)
+            session.game_id = game_id
+        return SessionInfo(game_id, session.get_players())
 
-    def end_game(self, end_time: datetime) -> Attendance | None:
+    def end_game(self, end_time: datetime, channel: VoiceChannel | str = None) -> Attendance | None:
         """
-        Ends the current game and stores the attendance and clocking in the database
+        Ends the game of the channel session and stores the attendance and clocking in the database
         :param end_time: end time of the game
+        :param channel: voice channel, the default session if None
         :return: Attendance: attendance of the session
         :raises CannotEndGame: if the conditions to end the game are not met
         :raises GameEndedWithoutPrecondition: if the attendance is not enough to end the game
         """
-        if not self.current_session.should_end_game():
-            raise CannotEndGame(f"End game condition not met, current players: {self.current_session.get_players()}, "
-                                f"current game info {self.current_session}")
+        session = self.sessions.get(channel)
+        if not session.should_end_game():
+            raise CannotEndGame(f"End game condition not met, current players: {session.get_players()}, "
+                                f"current game info {session}")
         members = []
         playtime = []
-        self.current_session.adjust_players_clocking_end_time(end_time)
+        session.adjust_players_clocking_end_time(end_time)
         player_attendance_count = 0
-        for player in config.PLAYERS:
-            player_attended = self.__has_player_attended(player)
+        for player in self.players:
+            player_attended = self.__has_player_attended(session, player)
             if player_attended:
                 player_attendance_count += 1
-            playtime.append(self.current_session.get_player_time(player))
+            playtime.append(session.get_player_time(player))
             members.append(MemberAttendance(player, player_attended, player_attended, ""))
 
-        clocking = Clocking(self.current_session.game_id, playtime)
-        attendance = Attendance(self.current_session.game_id, members, utils.get_current_time_formatted(),
+        clocking = Clocking(session.game_id, playtime)
+        attendance = Attendance(session.game_id, members, utils.get_current_time_formatted(self.clock),
                                 AttendanceEventType.OFFICIAL_GAME)
-        self.current_session.reset()
+        with self.game_id_lock:
+            session.reset()
+            self.sessions.release(channel)
         if player_attendance_count < config.MIN_ATTENDANCE_MEMBERS:
+            with self.game_id_lock:
+                self.released_game_ids.add(attendance.game_id)
             raise GameEndedWithoutPrecondition(
                 f"Attendance not enough, attendance count: {player_attendance_count}; min required: {config.MIN_ATTENDANCE_MEMBERS}")
         self.database_service.upsert_attendance(attendance)
         self.database_service.upsert_clocking(clocking)
         return attendance
 
-    def __has_player_attended(self, player) -> bool:
+    @staticmethod
+    def __has_player_attended(session: CurrentSession, player: str) -> bool:
         """
         Checks if a player meets the conditions to be considered as attended
+        :param session: the session of the game
         :param player: player name
         :return: bool
         """
-        playtime = self.current_session.get_player_time(player)
+        playtime = session.get_player_time(player)
         return playtime >= config.MIN_ATTENDANCE_TIME
 
     def __get_new_game_id(self) -> int:
         """
-        Calculates the new game id
+        Calculates the new game id, after the last stored one and the ones of the games still running. The lowest id
+        released by a game that was not stored is reused first, so the attendance sheet has no empty rows in between.
+        Must be called holding game_id_lock
         :return: int
         """
         last_attendance = self.database_service.get_last_attendance()
-        return int(last_attendance.game_id) + 1
+        running = self.sessions.game_ids()
+        self.released_game_ids.difference_update(running)
+        if self.released_game_ids:
+            game_id = min(self.released_game_ids)
+            self.released_game_ids.discard(game_id)
+            return game_id
+        return max([int(last_attendance.game_id), *running]) + 1
@@ -0,0 +1,80 @@
+import pururu.clock as clock
+import pururu.config as config
+import pururu.utils as utils
+from pururu.domain.current_session import CurrentSession
+from pururu.domain.entities import VoiceChannel
+
+
+class SessionManager:
+    """
+    Concurrent CurrentSessions keyed by voice channel id, so squads playing in different channels are different games.
+    Every lookup is a dict access, whatever the number of active channels; sessions are opened on the first clock in
+    and released once idle. With config.CHANNEL_SESSIONS disabled every channel shares one session.
+    """
+
+    def __init__(self, session_clock: clock.Clock = None):
+        self.clock = session_clock or clock.get_clock()
+        self.sessions: dict[int | str | None, CurrentSession] = {}
+        self.logger = utils.get_logger(__name__)
+
+    @staticmethod
+    def key(channel: VoiceChannel | str | None) -> int | str | None:
+        """
+        :param channel: VoiceChannel, a bare name when there is no Discord id (e.g. the load generators), None for the
+        default session
+        :return: the sessions key of the channel, its id
+        """
+        if not config.CHANNEL_SESSIONS:
+            return None
+        return channel.channel_id if isinstance(channel, VoiceChannel) else channel
+
+    def get(self, channel: VoiceChannel | str | None) -> CurrentSession:
+        """
+        Session of the channel, an empty one that is not registered if there is none
+        :param channel: voice channel
+        :return: CurrentSession
+        """
+        session = self.sessions.get(self.key(channel))
+        return session if session is not None else CurrentSession(self.clock)
+
+    def open(self, channel: VoiceChannel | str | None) -> CurrentSession:
+        """
+        Session of the channel, created and registered if there is none
+        :param channel: voice channel
+        :return: CurrentSession
+        """
+        key = self.key(channel)
+        session = self.sessions.get(key)
+        if session is None:
+            session = self.sessions[key] = CurrentSession(self.clock)
+        return session
+
+    def put(self, channel: VoiceChannel | str | None, session: CurrentSession) -> None:
+        """
+        Replaces the session of the channel
+        :param channel: voice channel
+        :param session: CurrentSession
+        :return: None
+        """
+        self.sessions[self.key(channel)] = session
+
+    def release(self, channel: VoiceChannel | str | None) -> None:
+        """
+        Drops the session of the channel if nobody is online and no game is running
+        :param channel: voice channel
+        :return: None
+        """
+        key = self.key(channel)
+        session = self.sessions.get(key)
+        if session is not None and session.game_id is None and not session.online_players:
+            self.logger.debug("Releasing idle session of channel %s", channel)
+            del self.sessions[key]
+
+    def game_ids(self) -> list[int]:
+        """
+        :return: the game ids of the running games
+        """
+        return [session.game_id for session in self.sessions.values() if session.game_id is not None]
+
+    def __len__(self):
+        return len(self.sessions)
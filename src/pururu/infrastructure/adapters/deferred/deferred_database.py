@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import pururu.utils as utils
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, BotEvent, Clocking
+from pururu.domain.services.database_service import DatabaseInterface
+
+
+class DeferredDatabase(DatabaseInterface):
+    """
+    DatabaseInterface whose implementation is still being built, e.g. authenticating to Google in a background
+    thread while Discord logs in; every call waits for it to be ready and raises its construction error if it failed,
+    except the bot event logs, which are buffered and written in order once it is ready
+    """
+
+    def __init__(self, database_future: Future):
+        self.database_future = database_future
+        self.buffered_events: list[BotEvent] = []
+        self.flushed = False
+        self.lock = threading.Lock()
+        self.logger = utils.get_logger(__name__)
+        database_future.add_done_callback(self.__flush)
+
+    def is_ready(self) -> bool:
+        return self.database_future.done()
+
+    def wait(self) -> DatabaseInterface:
+        """
+        Blocks until the database is built
+        :return: DatabaseInterface
+        """
+        return self.database_future.result()
+
+    async def ready(self) -> DatabaseInterface:
+        """
+        Waits for the database without blocking the event loop
+        :return: DatabaseInterface
+        :raises Exception: its construction error
+        """
+        return await asyncio.wrap_future(self.database_future)
+
+    def upsert_attendance(self, attendance: Attendance) -> None:
+        self.wait().upsert_attendance(attendance)
+
+    def get_all_attendances(self) -> list[Attendance]:
+        return self.wait().get_all_attendances()
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        return self.wait().get_attendance_matrix()
+
+    def load_attendance_matrix(self) -> AttendanceMatrix:
+        return self.wait().load_attendance_matrix()
+
+    def upsert_clocking(self, clocking: Clocking) -> None:
+        self.wait().upsert_clocking(clocking)
+
+    def insert_bot_event(self, bot_event: BotEvent) -> None:
+        with self.lock:
+            if not self.flushed:
+                self.buffered_events.append(bot_event)
+                return
+        self.wait().insert_bot_event(bot_event)
+
+    def get_last_attendance(self) -> Attendance:
+        return self.wait().get_last_attendance()
+
+    def get_player_coins(self, player: str) -> int:
+        return self.wait().get_player_coins(player)
+
+    def get_all_player_coins(self) -> dict[str, int]:
+        return self.wait().get_all_player_coins()
+
+    def __flush(self, database_future: Future) -> None:
+        """
+        Writes the buffered bot events once the database is built, the new ones wait for them to keep the order
+        """
+        with self.lock:
+            events, self.buffered_events = self.buffered_events, []
+            if database_future.exception() is not None:
+                self.logger.error("Database could not be built, %s buffered bot events dropped", len(events))
+            else:
+                for event in events:
+                    try:
+                        database_future.result().insert_bot_event(event)
+                    except Exception as e:
+                        self.logger.error("Error writing buffered bot event '%s': %s", event, e)
+            self.flushed = True
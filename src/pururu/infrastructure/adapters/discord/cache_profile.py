@@ -0,0 +1,46 @@
+import discord
+
+DEFAULT = 'default'
+LEAN = 'lean'
+
+
+class CacheProfile:
+    """
+    What the discord.py client subscribes to and keeps in memory. The bot only needs the guilds, the voice states and
+    the names of the roster members: slash commands arrive as interactions whatever the intents.
+    """
+
+    def __init__(self, name: str, intents: discord.Intents, member_cache_flags: discord.MemberCacheFlags,
+                 max_messages: int | None):
+        self.name = name
+        self.intents = intents
+        self.member_cache_flags = member_cache_flags
+        self.max_messages = max_messages  # None disables the message cache
+
+    @staticmethod
+    def of(name: str) -> 'CacheProfile':
+        """
+        :param name: DEFAULT, the discord.py defaults, or LEAN, guild and voice state intents only, no member or message
+        cache
+        :return: CacheProfile
+        """
+        if name == DEFAULT:
+            intents = discord.Intents.default()
+            return CacheProfile(DEFAULT, intents, discord.MemberCacheFlags.from_intents(intents), 1000)
+        if name == LEAN:
+            intents = discord.Intents.none()
+            intents.guilds = True
+            intents.voice_states = True
+            # Voice state updates carry the member, its name does not need the member cache
+            return CacheProfile(LEAN, intents, discord.MemberCacheFlags.none(), None)
+        raise ValueError(f"Cache profile {name} does not exist.")
+
+    def options(self) -> dict:
+        """
+        :return: the discord.Client keyword arguments of the profile
+        """
+        return {"intents": self.intents, "member_cache_flags": self.member_cache_flags,
+                "max_messages": self.max_messages, "chunk_guilds_at_startup": False}
+
+    def __repr__(self):
+        return f"CacheProfile({self.name})"
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+
+import discord
+from discord import app_commands
+
+import pururu.utils as utils
+
+
+def command_tree_fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """
+    Hash of the guild commands payload Discord would receive on sync: names, descriptions, parameters, choices,
+    permissions...
+    :param tree: CommandTree
+    :param guild: guild the commands are synced to
+    :return: str, hex digest
+    """
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+                     key=lambda command: (command.get("type", 1), command["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CommandSyncState:
+    """
+    Fingerprint of the last command tree synced to each guild, stored in a local JSON file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = utils.get_logger(__name__)
+
+    def load(self, guild_id: int) -> str | None:
+        """
+        :param guild_id: guild id
+        :return: str the last synced fingerprint, None if unknown
+        """
+        return self.__read().get(str(guild_id))
+
+    def save(self, guild_id: int, fingerprint: str) -> None:
+        """
+        :param guild_id: guild id
+        :param fingerprint: see command_tree_fingerprint
+        :return: None
+        """
+        state = self.__read()
+        state[str(guild_id)] = fingerprint
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(state, file, indent=2, sort_keys=True)
+        except OSError as e:
+            self.logger.warning("Cannot store the command sync state in %s: %s", self.path, e)
+
+    def __read(self) -> dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable command sync state %s: %s", self.path, e)
+            return {}
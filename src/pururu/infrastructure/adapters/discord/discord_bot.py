@@ -1,36 +1,201 @@
+import asyncio
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+
 import discord
+from discord import app_commands
 from discord.ext import commands
 
 import pururu.config as config
+import pururu.metrics as metrics
+import pururu.startup as startup
+import pururu.tracing as tracing
 import pururu.utils as utils
+from pururu.application.services.guild_registry import GuildRegistry, GuildContext
 from pururu.application.services.pururu_handler import PururuHandler
+from pururu.domain.entities import LeaderboardOrder, AttendanceEventType, VoiceChannel
+from pururu.domain.exceptions import InvalidStatsFilter
+from pururu.infrastructure.adapters.deferred.deferred_database import DeferredDatabase
+from pururu.infrastructure.adapters.discord.cache_profile import CacheProfile
+from pururu.infrastructure.adapters.discord.command_sync import CommandSyncState, command_tree_fingerprint
+from pururu.infrastructure.adapters.metrics.metrics_server import MetricsServer
+from pururu.infrastructure.profiling.sampling_profiler import SamplingProfiler
+from pururu.infrastructure.watchdog.loop_watchdog import LoopWatchdog
+
+COMMAND_LATENCY = metrics.REGISTRY.histogram('pururu_command_seconds', 'Slash command handling latency',
+                                             ('command',))
+VOICE_UPDATES = metrics.REGISTRY.counter('pururu_voice_updates_total',
+                                         'Voice state updates received, by pre-filter outcome', ('outcome',))
+SHARD_VOICE_UPDATES = metrics.REGISTRY.counter('pururu_shard_voice_updates_total',
+                                               'Voice state updates received, by shard', ('shard',))
+SHARD_LATENCY = metrics.REGISTRY.gauge('pururu_shard_latency_seconds', 'Gateway heartbeat latency, by shard',
+                                       ('shard',))
+UNKNOWN_GUILD_MESSAGE = "Pururu no está configurado en este servidor"
 
 
 class PururuDiscordBot(commands.Bot):
-    def __init__(self, pururu_handler: PururuHandler):
-        intents = discord.Intents.default()
-        super().__init__(command_prefix="/", intents=intents)
+    def __init__(self, guild_registry: GuildRegistry, startup_timer: startup.StartupTimer = None, **options):
+        self.cache_profile = CacheProfile.of(config.DISCORD_CACHE_PROFILE)
+        super().__init__(command_prefix="/", **self.cache_profile.options(), **options)
         self.logger = utils.get_logger(__name__)
-        self.pururu_handler = pururu_handler
+        self.guild_registry = guild_registry
+        self.metrics_server = MetricsServer(metrics.REGISTRY) if config.METRICS_ENABLED else None
+        self.loop_watchdog = LoopWatchdog() if config.LOOP_WATCHDOG_ENABLED else None
+        self.profiling = asyncio.Lock()
+        self.startup = startup_timer or startup.StartupTimer()
+        self.startup_tasks = []
+        self.shard_monitor = None
+        self.startup_failed = False
+        self.command_sync_state = CommandSyncState(config.COMMAND_SYNC_STATE_PATH)
+        # The voice path may wait on the database or the domain worker; a single thread keeps the updates in order
+        self.voice_executor = ThreadPoolExecutor(1, thread_name_prefix="pururu-voice")
 
     async def setup_hook(self) -> None:
+        self.startup.mark("login")
+        if self.loop_watchdog is not None:
+            self.loop_watchdog.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+            self.shard_monitor = asyncio.create_task(self.monitor_shards())
+        for guild in self.guild_registry:
+            if guild.session_status is not None:
+                guild.session_status.bind(asyncio.get_running_loop())
         self.setup_commands()
-        guild = discord.Object(id=config.GUILD_ID)
-        self.tree.clear_commands(guild=guild)
-        self.tree.copy_global_to(guild=guild)
-        result = await self.tree.sync(guild=guild)
-        self.logger.debug(f"Commands synced: {",".join([x.name for x in result])}")
+        # Command sync and warm up run while the gateway connects
+        self.startup_tasks = [asyncio.create_task(self.sync_commands()), asyncio.create_task(self.warm_up())]
+
+    async def sync_commands(self) -> None:
+        with self.startup.phase("sync"):
+            for guild_id in self.guild_registry.ids():
+                await self.sync_guild_commands(discord.Object(id=guild_id))
+
+    async def sync_guild_commands(self, guild: discord.Object) -> None:
+        try:
+            self.tree.clear_commands(guild=guild)
+            self.tree.copy_global_to(guild=guild)
+            fingerprint = command_tree_fingerprint(self.tree, guild)
+            if not config.COMMAND_SYNC_FORCE and fingerprint == self.command_sync_state.load(guild.id):
+                self.logger.info("Commands of guild %s unchanged (%s), sync skipped", guild.id, fingerprint[:12])
+                return
+            result = await self.tree.sync(guild=guild)
+            self.command_sync_state.save(guild.id, fingerprint)
+            self.logger.info("Commands of guild %s synced (%s): %s", guild.id, fingerprint[:12],
+                             ",".join([x.name for x in result]))
+        except Exception as e:
+            self.logger.error("Error syncing commands of guild %s: %s", guild.id, e)
+
+    async def warm_up(self) -> None:
+        with self.startup.phase("warm_up"):
+            await asyncio.gather(*[self.warm_up_guild(guild) for guild in self.guild_registry])
+
+    async def warm_up_guild(self, guild: GuildContext) -> None:
+        try:
+            await asyncio.to_thread(guild.pururu_handler.warm_up)
+        except Exception as e:
+            self.logger.error("Error warming up guild %s: %s", guild.guild_id, e)
+
+    def shard_latencies(self) -> list[tuple[int, float]]:
+        """
+        :return: (shard id, heartbeat latency in seconds) of every shard of this client
+        """
+        return [(self.shard_id or 0, self.latency)]
+
+    async def monitor_shards(self) -> None:
+        """
+        Exports the heartbeat latency of every shard each config.SHARD_METRICS_INTERVAL seconds
+        :return: None
+        """
+        while True:
+            for shard_id, latency in self.shard_latencies():
+                if math.isfinite(latency):
+                    SHARD_LATENCY.labels(str(shard_id)).set(latency)
+            await asyncio.sleep(config.SHARD_METRICS_INTERVAL)
 
     async def on_voice_state_update(self, member: discord.Member, before_state: discord.VoiceState,
                                     after_state: discord.VoiceState):
-        self.logger.debug(f'{member.name} has changed voice state from {before_state} to {after_state}')
-        self.pururu_handler.handle_voice_state_update_dc_event(member.name,
-                                                               before_state.channel.name if before_state.channel else None,
-                                                               after_state.channel.name if after_state.channel else None)
+        SHARD_VOICE_UPDATES.labels(str(member.guild.shard_id)).inc()
+        guild = self.guild_registry.get(member.guild.id)
+        # Mute, deafen, stream and video toggles also fire this event, only channel changes of players go on
+        if before_state.channel == after_state.channel:
+            VOICE_UPDATES.labels('unchanged').inc()
+            return
+        if guild is None:
+            VOICE_UPDATES.labels('unknown_guild').inc()
+            return
+        if member.name not in guild.roster:
+            VOICE_UPDATES.labels('not_player').inc()
+            return
+        VOICE_UPDATES.labels('passed').inc()
+        self.logger.debug("%s has changed voice state from %s to %s", member.name, before_state, after_state)
+        await asyncio.get_running_loop().run_in_executor(
+            self.voice_executor, self.handle_voice_update, guild, member.name,
+            self.voice_channel(before_state.channel), self.voice_channel(after_state.channel))
+
+    @staticmethod
+    def handle_voice_update(guild: GuildContext, member: str, before_channel: VoiceChannel | None,
+                            after_channel: VoiceChannel | None) -> None:
+        """
+        Passes a voice state update of a player to the guild handler, runs in the voice executor
+        :param guild: GuildContext of the update
+        :param member: member name
+        :param before_channel: before_state channel
+        :param after_channel: after_state channel
+        :return: None
+        """
+        with tracing.TRACER.span("discord:voice_state_update", member=member, guild=guild.guild_id):
+            guild.voice_handler.handle_voice_state_update_dc_event(member, before_channel, after_channel)
+
+    async def close(self) -> None:
+        if self.shard_monitor is not None:
+            self.shard_monitor.cancel()
+        if self.loop_watchdog is not None:
+            self.loop_watchdog.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await asyncio.to_thread(self.voice_executor.shutdown)
+        await super().close()
+
+    @staticmethod
+    def voice_channel(channel: discord.abc.Connectable | None) -> VoiceChannel | None:
+        """
+        :param channel: channel of a voice state
+        :return: the VoiceChannel, None if not in a channel
+        """
+        return VoiceChannel(channel.id, channel.name) if channel is not None else None
+
+    def guild_handler(self, interaction: discord.Interaction) -> PururuHandler | None:
+        """
+        :param interaction: slash command interaction
+        :return: the handler of the interaction guild, None if the guild is not served (or a DM)
+        """
+        guild = self.guild_registry.get(interaction.guild_id)
+        return guild.pururu_handler if guild is not None else None
+
+    async def wait_databases(self) -> bool:
+        """
+        Waits for the databases still being built in background (see DeferredDatabase)
+        :return: bool False if one of them failed
+        """
+        for guild in self.guild_registry:
+            database = getattr(guild.pururu_handler.domain_service, 'database_service', None)
+            if not isinstance(database, DeferredDatabase):
+                continue
+            try:
+                await database.ready()
+            except Exception as e:
+                self.logger.critical("Database of guild %s could not be built, shutting down: %s", guild.guild_id, e)
+                return False
+        return True
 
     async def on_ready(self):
-        self.logger.info(
-            f'Application Started and connected to {",".join([guild.name for guild in self.guilds])}')
+        if not await self.wait_databases():
+            self.startup_failed = True
+            await self.close()
+            return
+        self.startup.mark("ready")
+        self.logger.info("Application Started and connected to %s; startup: %s",
+                         ",".join([guild.name for guild in self.guilds]), self.startup.report())
 
     def setup_commands(self):
         @self.tree.command(
@@ -38,14 +203,84 @@ class PururuDiscordBot(commands.Bot):
             description='Sends a ping to Pururu'
         )
         async def ping_command(interaction: discord.Interaction):
-            await interaction.response.send_message(
-                f"Pong! Pururu v{config.APP_VERSION} is watching! :3{'\n' + config.PING_MESSAGE if config.PING_MESSAGE else ''}")
+            with COMMAND_LATENCY.labels('ping').time():
+                await interaction.response.send_message(
+                    f"Pong! Pururu v{config.APP_VERSION} is watching! :3{'\n' + config.PING_MESSAGE if config.PING_MESSAGE else ''}")
 
         @self.tree.command(
             name='stats',
             description='Shows your attendance stats')
-        async def stats_command(interaction: discord.Interaction):
-            await interaction.response.defer(ephemeral=True, thinking=True)
-            member_stats = self.pururu_handler.retrieve_player_stats(interaction.user.name)
-            await interaction.followup.send(f"Hola {interaction.user.mention}! Estos son tus Stats:\n" +
-                                            member_stats.as_message())
+        @app_commands.describe(start_date='First date included, YYYY-MM-DD',
+                               end_date='Last date included, YYYY-MM-DD',
+                               season='Season name', event_type='Only count this kind of event')
+        @app_commands.choices(event_type=[app_commands.Choice(name=event_type.value, value=event_type.name)
+                                          for event_type in AttendanceEventType
+                                          if event_type != AttendanceEventType.UNKNOWN])
+        async def stats_command(interaction: discord.Interaction, start_date: str = None, end_date: str = None,
+                                season: str = None, event_type: str = None):
+            with COMMAND_LATENCY.labels('stats').time():
+                await interaction.response.defer(ephemeral=True, thinking=True)
+                pururu_handler = self.guild_handler(interaction)
+                if pururu_handler is None:
+                    await interaction.followup.send(UNKNOWN_GUILD_MESSAGE)
+                    return
+                try:
+                    stats_filter = pururu_handler.build_stats_filter(start_date, end_date, season, event_type)
+                except InvalidStatsFilter as e:
+                    await interaction.followup.send(e.message)
+                    return
+                # The domain service may answer from the domain worker or the sheet, off the event loop
+                if stats_filter is None:
+                    stats_message = await asyncio.to_thread(pururu_handler.render_player_stats, interaction.user.name)
+                    header = "Estos son tus Stats:"
+                else:
+                    stats_message = await asyncio.to_thread(pururu_handler.render_player_stats,
+                                                            interaction.user.name, stats_filter)
+                    header = f"Estos son tus Stats {stats_filter.as_message()}:"
+                await interaction.followup.send(f"Hola {interaction.user.mention}! {header}\n" + stats_message)
+
+        @self.tree.command(
+            name='leaderboard',
+            description='Shows the players ranking')
+        @app_commands.describe(order='Ranking criteria', page='Page of the ranking')
+        @app_commands.choices(order=[app_commands.Choice(name=order.title(), value=order.value)
+                                     for order in LeaderboardOrder])
+        async def leaderboard_command(interaction: discord.Interaction, order: str = LeaderboardOrder.POINTS.value,
+                                      page: int = 1):
+            with COMMAND_LATENCY.labels('leaderboard').time():
+                await interaction.response.defer(thinking=True)
+                pururu_handler = self.guild_handler(interaction)
+                if pururu_handler is None:
+                    await interaction.followup.send(UNKNOWN_GUILD_MESSAGE)
+                    return
+                leaderboard = await asyncio.to_thread(pururu_handler.retrieve_leaderboard)
+                await interaction.followup.send(leaderboard.as_message(LeaderboardOrder(order), page))
+
+        @self.tree.command(
+            name='profile',
+            description='Profiles the bot for some seconds (admin only)')
+        @app_commands.default_permissions(administrator=True)
+        @app_commands.checks.has_permissions(administrator=True)
+        @app_commands.describe(seconds='Profiling duration in seconds')
+        async def profile_command(interaction: discord.Interaction,
+                                  seconds: app_commands.Range[int, 1, config.PROFILE_MAX_SECONDS] = 10):
+            if self.profiling.locked():
+                await interaction.response.send_message("Ya hay un perfilado en curso", ephemeral=True)
+                return
+            async with self.profiling:
+                await interaction.response.defer(ephemeral=True, thinking=True)
+                profiler = SamplingProfiler(config.PROFILE_SAMPLE_INTERVAL)
+                report = await asyncio.to_thread(profiler.run, seconds)
+                top_functions = report.top_functions()
+                await interaction.followup.send(
+                    f"Perfilado de {report.duration:.1f}s completado",
+                    files=[discord.File(io.BytesIO(top_functions.encode()), filename="profile_top.txt"),
+                           discord.File(io.BytesIO(report.collapsed_stacks().encode()),
+                                        filename="profile_stacks.collapsed")])
+
+        @profile_command.error
+        async def profile_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+            # Other errors are left to the tree, which logs them
+            if isinstance(error, app_commands.MissingPermissions):
+                await interaction.response.send_message("Solo los administradores pueden perfilar el bot",
+                                                        ephemeral=True)
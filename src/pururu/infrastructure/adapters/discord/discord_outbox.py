@@ -0,0 +1,158 @@
+import asyncio
+import collections
+import time
+
+import pururu.config as config
+import pururu.metrics as metrics
+import pururu.utils as utils
+from pururu.domain.entities import Message
+from pururu.domain.services.discord_service import DiscordInterface
+
+MESSAGE_LIMIT = 2000  # characters of a Discord message
+OUTBOX_MESSAGES = metrics.REGISTRY.counter('pururu_outbox_messages_total', 'Outbox messages, by delivery outcome',
+                                           ('outcome',))
+OUTBOX_PENDING = metrics.REGISTRY.gauge('pururu_outbox_pending', 'Messages waiting in the outbox')
+
+
+class RateLimiter:
+    """
+    Token bucket of `rate` calls every `period` seconds, as the Discord per channel buckets
+    """
+
+    def __init__(self, rate: int, period: float, limiter_time=time.monotonic):
+        self.rate = max(1, rate)
+        self.period = period
+        self.time = limiter_time
+        self.tokens = float(self.rate)
+        self.updated = self.time()
+
+    def reserve(self) -> float:
+        """
+        Takes a call of the bucket
+        :return: float, seconds to wait before making it
+        """
+        now = self.time()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens * self.period / self.rate
+
+
+class ChannelOutbox:
+    def __init__(self, channel_id: int):
+        self.channel_id = channel_id
+        self.pending: collections.deque[Message] = collections.deque()
+        self.bucket = RateLimiter(config.OUTBOX_RATE, config.OUTBOX_RATE_PERIOD)
+        self.last_message: Message | None = None  # last delivered message, edited to append the next ones
+        self.last_sent_at = 0.0
+        self.task: asyncio.Task | None = None
+
+
+class DiscordOutbox(DiscordInterface):
+    """
+    DiscordInterface in front of the Discord adapter: send_message and edit_message only queue the message, so the
+    domain flow never waits for Discord. Each channel is drained by its own task within config.OUTBOX_RATE calls every
+    config.OUTBOX_RATE_PERIOD seconds; the mergeable messages queued while it waits for the bucket are merged into one,
+    and appended to the last message of the channel with an edit if it was sent less than config.OUTBOX_MERGE_WINDOW
+    seconds ago. A queued edit of a message is replaced by the next edit of the same message.
+    """
+
+    def __init__(self, discord_service: DiscordInterface):
+        self.discord_service = discord_service
+        self.outboxes: dict[int, ChannelOutbox] = {}
+        self.logger = utils.get_logger(__name__)
+
+    async def send_message(self, message: Message) -> Message:
+        """
+        Queues the message, its message_id is set once delivered
+        :param message: Message
+        :return: Message
+        """
+        self.__enqueue(self.__outbox(message.channel_id), message)
+        return message
+
+    async def edit_message(self, message: Message) -> Message:
+        """
+        Queues the edit of a delivered message, a pending edit of the same message takes its content instead
+        :param message: Message with the message_id to edit
+        :return: Message, the queued edit
+        """
+        outbox = self.__outbox(message.channel_id)
+        for pending in outbox.pending:
+            if pending.message_id is not None and pending.message_id == message.message_id:
+                pending.content = message.content
+                OUTBOX_MESSAGES.labels('merged').inc()
+                return pending
+        self.__enqueue(outbox, message)
+        return message
+
+    async def flush(self) -> None:
+        """
+        Waits until every queued message is delivered
+        :return: None
+        """
+        await asyncio.gather(*[outbox.task for outbox in list(self.outboxes.values()) if outbox.task is not None])
+
+    def __outbox(self, channel_id: int) -> ChannelOutbox:
+        outbox = self.outboxes.get(channel_id)
+        if outbox is None:
+            outbox = self.outboxes[channel_id] = ChannelOutbox(channel_id)
+        return outbox
+
+    def __enqueue(self, outbox: ChannelOutbox, message: Message) -> None:
+        outbox.pending.append(message)
+        OUTBOX_PENDING.inc()
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.create_task(self.__drain(outbox))
+
+    async def __drain(self, outbox: ChannelOutbox) -> None:
+        while outbox.pending:
+            delay = outbox.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            batch = self.__take_batch(outbox)
+            try:
+                if batch[0].message_id is not None:
+                    await self.discord_service.edit_message(batch[0])
+                    OUTBOX_MESSAGES.labels('edited').inc()
+                    continue
+                delivered = await self.__deliver(outbox, "\n".join(message.content for message in batch),
+                                                 batch[0].mergeable)
+            except Exception as e:
+                # Whatever the error the task goes on, otherwise the channel would stop sending for good
+                OUTBOX_MESSAGES.labels('dropped').inc(len(batch))
+                self.logger.error("Error delivering %s messages to channel %s: %s", len(batch), outbox.channel_id, e)
+                continue
+            for message in batch:
+                message.message_id = delivered.message_id
+            OUTBOX_MESSAGES.labels('merged').inc(len(batch) - 1)
+
+    def __take_batch(self, outbox: ChannelOutbox) -> list[Message]:
+        batch = [outbox.pending.popleft()]
+        size = len(batch[0].content)
+        while self.__mergeable(batch[0]) and outbox.pending and self.__mergeable(outbox.pending[0]) \
+                and size + 1 + len(outbox.pending[0].content) <= MESSAGE_LIMIT:
+            size += 1 + len(outbox.pending[0].content)
+            batch.append(outbox.pending.popleft())
+        OUTBOX_PENDING.dec(len(batch))
+        return batch
+
+    @staticmethod
+    def __mergeable(message: Message) -> bool:
+        return message.mergeable and message.message_id is None  # edits go on their own
+
+    async def __deliver(self, outbox: ChannelOutbox, content: str, mergeable: bool) -> Message:
+        last, now = outbox.last_message, time.monotonic()
+        if (mergeable and last is not None and last.mergeable and last.message_id is not None
+                and now - outbox.last_sent_at < config.OUTBOX_MERGE_WINDOW
+                and len(last.content) + 1 + len(content) <= MESSAGE_LIMIT):
+            edited = Message(last.content + "\n" + content, outbox.channel_id)
+            edited.message_id = last.message_id
+            outbox.last_message = await self.discord_service.edit_message(edited)
+            OUTBOX_MESSAGES.labels('edited').inc()
+        else:
+            outbox.last_message = await self.discord_service.send_message(Message(content, outbox.channel_id,
+                                                                                  mergeable))
+            outbox.last_sent_at = now
+            OUTBOX_MESSAGES.labels('sent').inc()
+        return outbox.last_message
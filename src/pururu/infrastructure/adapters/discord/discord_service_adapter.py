@@ -6,19 +6,56 @@ from pururu.domain.entities import Message
 from pururu.domain.services.discord_service import DiscordInterface
 from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
 
+CHANNEL_EVENTS = ('on_guild_available', 'on_guild_join', 'on_guild_channel_create', 'on_guild_channel_delete',
+                  'on_guild_channel_update')
+
 
 class DiscordServiceAdapter(DiscordInterface):
-    def __init__(self, bot: PururuDiscordBot):
+    def __init__(self, bot: PururuDiscordBot, guild_id: int = None):
         self.bot = bot
-        self.guild: discord.Guild = next(filter(lambda guild: guild.id == config.GUILD_ID, self.bot.guilds), None)
+        self.guild_id = config.GUILD_ID if guild_id is None else guild_id
+        self.channels: dict[int, discord.abc.Messageable] = {}
         self.logger = utils.get_logger(__name__)
+        # The guild is not in the cache until the gateway connects, the index is built on its events
+        for event in CHANNEL_EVENTS:
+            self.bot.add_listener(self.on_channel_event, event)
+        guild = self.bot.get_guild(self.guild_id)
+        if guild is not None:
+            self.refresh_channels(guild)
+
+    async def on_channel_event(self, *args) -> None:
+        """
+        Listener of the guild and channel events, the last argument is the guild or the (updated) channel
+        :return: None
+        """
+        guild = args[-1] if isinstance(args[-1], discord.Guild) else args[-1].guild
+        if guild.id == self.guild_id:
+            self.refresh_channels(guild)
+
+    def refresh_channels(self, guild: discord.Guild) -> None:
+        """
+        Rebuilds the channel id index of the text channels of the guild
+        :param guild: discord.Guild
+        :return: None
+        """
+        self.channels = {channel.id: channel for channel in guild.text_channels}
+        self.logger.debug("Indexed %s text channels of guild %s", len(self.channels), guild.id)
 
     async def send_message(self, message: Message) -> Message:
-        for channel in self.guild.text_channels:
-            if channel.id == message.channel_id:
-                sent_message: discord.Message = await channel.send(message.content)
-                self.logger.debug(f"Message sent: {sent_message.content}")
-                message.message_id = sent_message.id
-            else:
-                self.logger.error(f"Channel {message.channel_id} not found for message: {message.content}")
+        channel = self.channels.get(message.channel_id)
+        if channel is None:
+            self.logger.error("Channel %s not found for message: %s", message.channel_id, message.content)
+            return message
+        sent_message: discord.Message = await channel.send(message.content)
+        self.logger.debug("Message sent: %s", sent_message.content)
+        message.message_id = sent_message.id
+        return message
+
+    async def edit_message(self, message: Message) -> Message:
+        channel = self.channels.get(message.channel_id)
+        if channel is None:
+            self.logger.error("Channel %s not found for message: %s", message.channel_id, message.content)
+            return message
+        await channel.get_partial_message(message.message_id).edit(content=message.content)
+        self.logger.debug("Message %s edited: %s", message.message_id, message.content)
         return message
@@ -0,0 +1,24 @@
+from discord.ext import commands
+
+import pururu.config as config
+import pururu.startup as startup
+from pururu.application.services.guild_registry import GuildRegistry
+from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
+
+
+class PururuShardedDiscordBot(PururuDiscordBot, commands.AutoShardedBot):
+    """
+    PururuDiscordBot over several gateway connections (shards) of the same process. Voice updates of every shard are
+    routed by guild id to the guild registry, so the event systems, domain services and Google Sheets client are
+    shared by all the shards.
+    """
+
+    def __init__(self, guild_registry: GuildRegistry, startup_timer: startup.StartupTimer = None):
+        super().__init__(guild_registry, startup_timer, shard_count=config.DISCORD_SHARD_COUNT)
+
+    def shard_latencies(self) -> list[tuple[int, float]]:
+        return self.latencies
+
+    async def on_shard_ready(self, shard_id: int):
+        self.logger.info("Shard %s ready with guilds %s", shard_id,
+                         ",".join([guild.name for guild in self.guilds if guild.shard_id == shard_id]))
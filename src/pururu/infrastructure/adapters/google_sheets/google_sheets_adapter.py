@@ -1,13 +1,38 @@
+import time
+from contextlib import contextmanager
+
 import gspread
 from google.oauth2.service_account import Credentials
 
+import pururu.config as config
 import pururu.infrastructure.adapters.google_sheets.mapper as mapper
+import pururu.metrics as metrics
 import pururu.utils as utils
-from pururu.domain.entities import BotEvent, Attendance, Clocking
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import BotEvent, Attendance, Clocking, AttendanceEventType
 from pururu.domain.services.database_service import DatabaseInterface
 from pururu.infrastructure.adapters.google_sheets.entities import AttendanceSheet, BotEventSheet, ClockingSheet, \
     CoinsSheet
 
+SHEETS_CALL_LATENCY = metrics.REGISTRY.histogram('pururu_sheets_call_seconds', 'Google Sheets API call latency',
+                                                 ('method', 'sheet'))
+SHEETS_CALL_ERRORS = metrics.REGISTRY.counter('pururu_sheets_call_errors_total', 'Failed Google Sheets API calls',
+                                              ('method', 'sheet'))
+SHEETS_PAYLOAD_CELLS = metrics.REGISTRY.histogram('pururu_sheets_payload_cells',
+                                                  'Cells read from or written to Google Sheets per call',
+                                                  ('method', 'sheet'), buckets=metrics.SIZE_BUCKETS)
+
+
+def authorize(credentials_path: str) -> gspread.Client:
+    """
+    Authenticates the service account, the client can be shared by the adapters of every guild
+    :param credentials_path: service account file
+    :return: gspread.Client
+    """
+    scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive',
+              'https://www.googleapis.com/auth/drive.file']
+    return gspread.authorize(Credentials.from_service_account_file(credentials_path, scopes=scopes))
+
 
 class GoogleSheetsAdapter(DatabaseInterface):
     """
@@ -17,14 +42,20 @@ class GoogleSheetsAdapter(DatabaseInterface):
 
     DEFAULT_PARAMS = {"valueInputOption": "USER_ENTERED"}
 
-    def __init__(self, credentials_path: str, spreadsheet_id: str):
-        scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive',
-                  'https://www.googleapis.com/auth/drive.file']
-        self.credentials = Credentials.from_service_account_file(credentials_path, scopes=scopes)
-        self.client = gspread.authorize(self.credentials)
+    def __init__(self, credentials_path: str | None, spreadsheet_id: str, player_mapping: dict[str, str] = None,
+                 client: gspread.Client = None):
+        """
+        :param credentials_path: service account file, unused if a client is given
+        :param spreadsheet_id: the spreadsheet of the guild
+        :param player_mapping: player -> column mapping, config.GS_ATTENDANCE_PLAYER_MAPPING by default
+        :param client: an authorized client to share between adapters, see authorize
+        """
+        self.client = client or authorize(credentials_path)
         self.spreadsheet = self.client.open_by_key(spreadsheet_id)
         self.logger = utils.get_logger(__name__)
         self.cache = {}
+        self.attendance_codec = mapper.compile_attendance_codec(
+            config.GS_ATTENDANCE_PLAYER_MAPPING if player_mapping is None else player_mapping)
 
     def upsert_attendance(self, attendance: Attendance) -> None:
         """
@@ -32,12 +63,14 @@ class GoogleSheetsAdapter(DatabaseInterface):
         :param attendance: Attendance; the attendance to be upserted
         :return: None
         """
-        self.logger.debug(f"Upsertting attendance with id: {attendance.game_id}")
+        self.logger.debug("Upsertting attendance with id: %s", attendance.game_id)
         sheet = mapper.attendance_to_sheet(attendance)
-        self.spreadsheet.values_update(
-            range=self.__build_data_notation(AttendanceSheet.SHEET, AttendanceSheet.DATA_COL_INIT, sheet.game_id,
-                                             AttendanceSheet.DATA_COL_END, sheet.game_id),
-            params=self.DEFAULT_PARAMS, body={"values": [sheet.to_row_values()]})
+        self.__values_update('upsert_attendance', AttendanceSheet.SHEET,
+                             self.__build_data_notation(AttendanceSheet.SHEET, AttendanceSheet.DATA_COL_INIT,
+                                                        sheet.game_id, self.attendance_codec.col_end, sheet.game_id),
+                             [sheet.to_row_values()])
+        if 'attendance_matrix' in self.cache:
+            self.cache['attendance_matrix'].upsert(attendance)
 
     def get_all_attendances(self) -> list[Attendance]:
         """
@@ -45,21 +78,40 @@ class GoogleSheetsAdapter(DatabaseInterface):
         :return: list[Attendance]; all attendances
         """
         self.logger.debug("Getting all attendances")
-        all_attendances = []
         last_row = self.__get_last_row(AttendanceSheet.SHEET)
-        attendance_value_range = self.spreadsheet.values_get(
+        attendance_value_range = self.__values_get(
+            'get_all_attendances', AttendanceSheet.SHEET,
             self.__build_data_notation(AttendanceSheet.SHEET, AttendanceSheet.DATA_COL_INIT,
                                        AttendanceSheet.DATA_ROW_INIT,
-                                       AttendanceSheet.DATA_COL_END, last_row))
-        for row in attendance_value_range['values']:
-            attendance = mapper.gs_to_attendance_sheet(AttendanceSheet.DATA_ROW_INIT, row)
-            all_attendances.append(mapper.sheet_to_attendance(attendance))
-        return all_attendances
+                                       self.attendance_codec.col_end, last_row))
+        return self.attendance_codec.decode_rows(AttendanceSheet.DATA_ROW_INIT, attendance_value_range['values'])
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        """
+        Get the attendance matrix; it is built from all the attendance rows and kept in memory for
+        config.ATTENDANCE_CACHE_TTL seconds, upsert_attendance keeps it up to date meanwhile
+        :return: AttendanceMatrix
+        """
+        loaded_at = self.cache.get('attendance_matrix_loaded_at')
+        if loaded_at is None or time.monotonic() - loaded_at >= config.ATTENDANCE_CACHE_TTL:
+            self.logger.debug("Building attendance matrix")
+            self.cache['attendance_matrix'] = AttendanceMatrix.of(self.get_all_attendances())
+            self.cache['attendance_matrix_loaded_at'] = time.monotonic()
+        return self.cache['attendance_matrix']
+
+    def load_attendance_matrix(self) -> AttendanceMatrix:
+        """
+        Rebuilds the attendance matrix from the sheet, e.g. to see the edits made by hand, and keeps it in memory
+        :return: AttendanceMatrix
+        """
+        self.cache.pop('attendance_matrix_loaded_at', None)
+        return self.get_attendance_matrix()
 
     def get_player_coins(self, player):
-        self.logger.debug(f"Getting kerocoins of player: {player}")
+        self.logger.debug("Getting kerocoins of player: %s", player)
 
-        attendance_value_range = self.spreadsheet.values_get(
+        attendance_value_range = self.__values_get(
+            'get_player_coins', CoinsSheet.SHEET,
             self.__build_data_notation(CoinsSheet.SHEET, CoinsSheet.DATA_COL_INIT,
                                        CoinsSheet.DATA_ROW_INIT,
                                        CoinsSheet.DATA_COL_END, CoinsSheet.DATA_ROW_END))
@@ -69,24 +121,38 @@ class GoogleSheetsAdapter(DatabaseInterface):
 
         return cell
 
+    def get_all_player_coins(self) -> dict[str, int]:
+        """
+        Get the kerocoins of every player with a single read
+        :return: dict[str, int]; player -> coins
+        """
+        self.logger.debug("Getting kerocoins of all players")
+        coins_value_range = self.__values_get(
+            'get_all_player_coins', CoinsSheet.SHEET,
+            self.__build_data_notation(CoinsSheet.SHEET, CoinsSheet.DATA_COL_INIT,
+                                       CoinsSheet.DATA_ROW_INIT,
+                                       CoinsSheet.DATA_COL_END, CoinsSheet.DATA_ROW_END))
+        return mapper.gs_to_player_coins(coins_value_range.get('values', []))
+
     def upsert_clocking(self, clocking: Clocking) -> None:
         """
         Upsert a clocking row into the Google sheet
         :param clocking: The clocking to be upserted
         :return: None
         """
-        self.logger.debug(f"Upsertting clocking for game_id: {clocking.game_id}")
-        game_id_rows = self.spreadsheet.values_get(
+        self.logger.debug("Upsertting clocking for game_id: %s", clocking.game_id)
+        game_id_rows = self.__values_get(
+            'upsert_clocking', ClockingSheet.SHEET,
             self.__build_data_notation(sheet=ClockingSheet.SHEET, col_start=ClockingSheet.DATA_COL_INIT,
                                        row_start=ClockingSheet.DATA_ROW_INIT, col_end=ClockingSheet.DATA_COL_INIT))
         game_ids = [int(row[0]) for row in game_id_rows['values']]
         row_idx = ClockingSheet.DATA_ROW_INIT
         row_idx = row_idx + (game_ids.index(clocking.game_id) if clocking.game_id in game_ids else len(game_ids))
         sheet = mapper.clocking_to_sheet(clocking)
-        self.spreadsheet.values_update(
-            range=self.__build_data_notation(ClockingSheet.SHEET, ClockingSheet.DATA_COL_INIT, row_idx,
-                                             ClockingSheet.DATA_COL_END, row_idx),
-            params=self.DEFAULT_PARAMS, body={"values": [sheet.to_row_values()]})
+        self.__values_update('upsert_clocking', ClockingSheet.SHEET,
+                             self.__build_data_notation(ClockingSheet.SHEET, ClockingSheet.DATA_COL_INIT, row_idx,
+                                                        ClockingSheet.DATA_COL_END, row_idx),
+                             [sheet.to_row_values()])
 
     def insert_bot_event(self, bot_event: BotEvent) -> None:
         """
@@ -96,9 +162,9 @@ class GoogleSheetsAdapter(DatabaseInterface):
         """
         sheet = mapper.bot_event_to_sheet(bot_event)
         row_idx = self.__get_last_row(BotEventSheet.SHEET) + 1
-        self.spreadsheet.values_update(
-            range=self.__build_data_notation(BotEventSheet.SHEET, BotEventSheet.DATA_COL_INIT, row_idx),
-            params=self.DEFAULT_PARAMS, body={"values": [sheet.to_row_values()]})
+        self.__values_update('insert_bot_event', BotEventSheet.SHEET,
+                             self.__build_data_notation(BotEventSheet.SHEET, BotEventSheet.DATA_COL_INIT, row_idx),
+                             [sheet.to_row_values()])
 
     def get_last_attendance(self) -> Attendance:
         """
@@ -107,14 +173,16 @@ class GoogleSheetsAdapter(DatabaseInterface):
         """
         self.logger.debug("Getting last attendance")
         attendance_idx = self.__get_last_row(AttendanceSheet.SHEET)
-        attendance_value_range = self.spreadsheet.values_get(
+        attendance_value_range = self.__values_get(
+            'get_last_attendance', AttendanceSheet.SHEET,
             self.__build_data_notation(AttendanceSheet.SHEET, AttendanceSheet.DATA_COL_INIT, attendance_idx,
-                                       AttendanceSheet.DATA_COL_END, attendance_idx))
-        self.logger.debug(f"find last attendance result: {attendance_value_range}")
-        attendance_row = attendance_value_range['values'][0]
-        attendance = mapper.gs_to_attendance_sheet(game_id=attendance_idx, row=attendance_row)
-        self.logger.debug(f"Attendance sheet: {attendance}")
-        return mapper.sheet_to_attendance(attendance)
+                                       self.attendance_codec.col_end, attendance_idx))
+        self.logger.debug("find last attendance result: %s", attendance_value_range)
+        attendance = self.attendance_codec.decode(attendance_idx, attendance_value_range.get('values', [[]])[0])
+        if attendance is None:
+            # A short last row still holds its game id, the next game goes after it
+            return Attendance(attendance_idx, [], '', AttendanceEventType.UNKNOWN)
+        return attendance
 
     def __get_last_row(self, sheet: str, col: str = "A") -> int:
         """
@@ -127,11 +195,49 @@ class GoogleSheetsAdapter(DatabaseInterface):
         if f'{sheet}_last_row' in self.cache:
             current_max = self.cache[f'{sheet}_last_row']
 
-        rows = self.spreadsheet.values_get(self.__build_data_notation(sheet, col, current_max, col))
+        rows = self.__values_get('get_last_row', sheet, self.__build_data_notation(sheet, col, current_max, col))
         actual_max = current_max + len(rows['values']) - 1
         self.cache[f'{sheet}_last_row'] = actual_max
         return actual_max
 
+    def __values_get(self, method: str, sheet: str, notation: str) -> dict:
+        """
+        values_get call recording its latency, errors and number of cells read
+        :param method: adapter method name, used as metric label
+        :param sheet: the sheet name, used as metric label
+        :param notation: A1 notation of the range to read
+        :return: the value range
+        """
+        with self.__observe_call(method, sheet):
+            value_range = self.spreadsheet.values_get(notation)
+        SHEETS_PAYLOAD_CELLS.labels(method, sheet).observe(sum(len(row) for row in value_range.get('values', [])))
+        return value_range
+
+    def __values_update(self, method: str, sheet: str, notation: str, values: list[list]) -> None:
+        """
+        values_update call recording its latency, errors and number of cells written
+        :param method: adapter method name, used as metric label
+        :param sheet: the sheet name, used as metric label
+        :param notation: A1 notation of the range to write
+        :param values: rows to write
+        :return: None
+        """
+        with self.__observe_call(method, sheet):
+            self.spreadsheet.values_update(range=notation, params=self.DEFAULT_PARAMS, body={"values": values})
+        SHEETS_PAYLOAD_CELLS.labels(method, sheet).observe(sum(len(row) for row in values))
+
+    @staticmethod
+    @contextmanager
+    def __observe_call(method: str, sheet: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            SHEETS_CALL_ERRORS.labels(method, sheet).inc()
+            raise
+        finally:
+            SHEETS_CALL_LATENCY.labels(method, sheet).observe(time.perf_counter() - start)
+
     @staticmethod
     def __build_data_notation(sheet: str, col_start: str, row_start: int = None, col_end: str = None,
                               row_end: int = None) -> str:
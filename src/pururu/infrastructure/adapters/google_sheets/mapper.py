@@ -33,6 +33,57 @@ def sheet_to_attendance(sheet: AttendanceSheet) -> Attendance:
     return Attendance(sheet.game_id, members, sheet.date, AttendanceEventType.of(sheet.description))
 
 
+class AttendanceRowCodec:
+    """
+    Decodes Asistencia rows straight into domain Attendances using an index plan compiled once from the
+    player -> column mapping, see compile_attendance_codec
+    """
+
+    def __init__(self, plan: tuple[tuple[str, int], ...], col_end: str):
+        self.plan = plan
+        self.col_end = col_end
+        self.min_row_len = max([idx + 2 for _, idx in plan] + [2])  # description, date and every player flags
+        self.event_types = {event_type.value: event_type for event_type in AttendanceEventType}
+
+    def decode(self, game_id: int, row: list) -> Attendance | None:
+        """
+        Decodes an Asistencia row
+        :param game_id: the game id of the row (its row index in the sheet)
+        :param row: the raw row values, as returned by the Google Sheets API
+        :return: Attendance, None if the row is empty or short (a game id that was never written)
+        """
+        row_len = len(row)
+        if row_len < self.min_row_len:
+            return None
+        members = [MemberAttendance(player, row[idx] != 'TRUE', row[idx + 1] != 'TRUE',
+                                    row[idx + 2] if idx + 2 < row_len else '')
+                   for player, idx in self.plan]
+        return Attendance(game_id, members, row[1], self.event_types.get(row[0], AttendanceEventType.UNKNOWN))
+
+    def decode_rows(self, first_game_id: int, rows: list[list]) -> list[Attendance]:
+        """
+        Decodes consecutive Asistencia rows, the first one belonging to first_game_id
+        :param first_game_id: the game id of the first row
+        :param rows: the raw rows values
+        :return: list[Attendance]; empty or short rows are skipped
+        """
+        attendances = [self.decode(game_id, row) for game_id, row in enumerate(rows, first_game_id)]
+        return [attendance for attendance in attendances if attendance is not None]
+
+
+def compile_attendance_codec(player_mapping: dict[str, str]) -> AttendanceRowCodec:
+    """
+    Compiles the player -> column mapping (check config.GS_ATTENDANCE_PLAYER_MAPPING) into an AttendanceRowCodec,
+    the codec col_end covers the motive column of the rightmost player
+    :param player_mapping: the player -> column mapping, e.g. {"member1": "C", "member2": "AB"}
+    :return: AttendanceRowCodec
+    """
+    plan = tuple((player, __column_to_index(col)) for player, col in player_mapping.items())
+    last_idx = max([idx + 2 for _, idx in plan], default=0)
+    col_end = __index_to_column(max(last_idx, __column_to_index(AttendanceSheet.DATA_COL_END)))
+    return AttendanceRowCodec(plan, col_end)
+
+
 def gs_to_attendance_sheet(game_id: int, row: list) -> AttendanceSheet:
     absence = []
     unjustified = []
@@ -49,6 +100,24 @@ def gs_to_attendance_sheet(game_id: int, row: list) -> AttendanceSheet:
     return AttendanceSheet(game_id, absence, unjustified, motives, row[1], row[0])
 
 
+def gs_to_player_coins(rows: list[list]) -> dict[str, int]:
+    """
+    Maps the Economia rows (player names row and coins row) into a player -> coins dict
+    :param rows: the raw rows values
+    :return: dict[str, int]; non numeric cells count as 0 coins
+    """
+    players = rows[0] if rows else []
+    coins = rows[1] if len(rows) > 1 else []
+    return {player: __parse_coins(coins[idx] if idx < len(coins) else '') for idx, player in enumerate(players)}
+
+
+def __parse_coins(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
 def __parse_str_to_bool(value: str) -> bool:
     return False if value == 'TRUE' else True
 
@@ -60,17 +129,25 @@ def __parse_bool_to_str(value: bool) -> str:
 
 
 def __column_to_index(col: str) -> int:
-    return ord(col.upper()) - 65
+    idx = 0
+    for char in col.upper():
+        idx = idx * 26 + ord(char) - 64
+    return idx - 1
 
 
 def __index_to_column(idx: int) -> str:
-    return chr(idx + 65)
+    col = ''
+    idx += 1
+    while idx > 0:
+        idx, remainder = divmod(idx - 1, 26)
+        col = chr(remainder + 65) + col
+    return col
 
 
 def __map_attendance_event_type(description: str) -> AttendanceEventType:
     event_type = AttendanceEventType.of(description)
     if event_type == AttendanceEventType.UNKNOWN:
-        __get_logger().warn(f"Unknown event type: {description}")
+        __get_logger().warning("Unknown event type: %s", description)
     return event_type
 
 
@@ -0,0 +1,38 @@
+from aiohttp import web
+
+import pururu.config as config
+import pururu.utils as utils
+from pururu.metrics import MetricsRegistry
+
+
+class MetricsServer:
+    """
+    Serves the metrics registry in the Prometheus text format on GET /metrics. It runs on the bot event loop using
+    aiohttp, which is already a discord.py dependency.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, registry: MetricsRegistry, host: str = None, port: int = None):
+        self.registry = registry
+        self.host = host or config.METRICS_HOST
+        self.port = config.METRICS_PORT if port is None else port
+        self.runner = None
+        self.logger = utils.get_logger(__name__)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.logger.info("Metrics served on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode(), headers={"Content-Type": self.CONTENT_TYPE})
@@ -0,0 +1,49 @@
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, BotEvent, Clocking
+from pururu.domain.services.database_service import DatabaseInterface
+from pururu.tracing import TRACER
+
+
+class TracedDatabase(DatabaseInterface):
+    """
+    DatabaseInterface decorator recording every call as a 'db:<method>' span of the current trace
+    """
+
+    def __init__(self, database_service: DatabaseInterface):
+        self.database_service = database_service
+
+    def upsert_attendance(self, attendance: Attendance) -> None:
+        with TRACER.span("db:upsert_attendance", game_id=attendance.game_id):
+            self.database_service.upsert_attendance(attendance)
+
+    def get_all_attendances(self) -> list[Attendance]:
+        with TRACER.span("db:get_all_attendances"):
+            return self.database_service.get_all_attendances()
+
+    def get_attendance_matrix(self) -> AttendanceMatrix:
+        with TRACER.span("db:get_attendance_matrix"):
+            return self.database_service.get_attendance_matrix()
+
+    def load_attendance_matrix(self) -> AttendanceMatrix:
+        with TRACER.span("db:load_attendance_matrix"):
+            return self.database_service.load_attendance_matrix()
+
+    def upsert_clocking(self, clocking: Clocking) -> None:
+        with TRACER.span("db:upsert_clocking", game_id=clocking.game_id):
+            self.database_service.upsert_clocking(clocking)
+
+    def insert_bot_event(self, bot_event: BotEvent) -> None:
+        with TRACER.span("db:insert_bot_event"):
+            self.database_service.insert_bot_event(bot_event)
+
+    def get_last_attendance(self) -> Attendance:
+        with TRACER.span("db:get_last_attendance"):
+            return self.database_service.get_last_attendance()
+
+    def get_player_coins(self, player: str) -> int:
+        with TRACER.span("db:get_player_coins"):
+            return self.database_service.get_player_coins(player)
+
+    def get_all_player_coins(self) -> dict[str, int]:
+        with TRACER.span("db:get_all_player_coins"):
+            return self.database_service.get_all_player_coins()
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfileReport:
+    """
+    Aggregated samples of a SamplingProfiler run: collapsed stacks (flame graph input, one 'frame;frame;... count'
+    line per distinct stack with the thread name as root) plus self and total sample counts per function.
+    """
+
+    def __init__(self, duration: float, samples: int):
+        self.duration = duration
+        self.samples = samples
+        self.stacks: Counter[str] = Counter()
+        self.self_counts: Counter[str] = Counter()
+        self.total_counts: Counter[str] = Counter()
+
+    def add_stack(self, thread_name: str, frames: list[str]) -> None:
+        """
+        Adds a sampled stack
+        :param thread_name: name of the sampled thread
+        :param frames: frame labels from the outermost to the innermost
+        :return: None
+        """
+        self.stacks[';'.join([thread_name] + frames)] += 1
+        if frames:
+            self.self_counts[frames[-1]] += 1
+        for frame in set(frames):
+            self.total_counts[frame] += 1
+
+    def top_functions(self, limit: int = 20) -> str:
+        """
+        Functions with the most samples on top of the stack
+        :param limit: number of functions
+        :return: str, a table with the self and total percentage of samples of each function
+        """
+        total = max(sum(self.self_counts.values()), 1)
+        lines = [f"{self.samples} samples in {self.duration:.1f}s", f"{'self':>7} {'total':>7}  function"]
+        for function, count in self.self_counts.most_common(limit):
+            lines.append(f"{count / total:7.1%} {self.total_counts[function] / total:7.1%}  {function}")
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread (event loop, timers, workers) with sys._current_frames at a fixed interval.
+    The target code is not instrumented, so it can be run on a live bot.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def run(self, duration: float) -> ProfileReport:
+        """
+        Samples all the threads but the calling one for duration seconds, blocking the calling thread
+        :param duration: seconds to sample
+        :return: ProfileReport
+        """
+        own_thread = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + duration
+        samples = 0
+        report = ProfileReport(duration, 0)
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread:
+                    report.add_stack(names.get(thread_id, str(thread_id)), self.__frame_labels(frame))
+            samples += 1
+            time.sleep(self.interval)
+        report.duration = time.perf_counter() - start
+        report.samples = samples
+        return report
+
+    def __frame_labels(self, frame) -> list[str]:
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            labels.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.reverse()
+        return labels
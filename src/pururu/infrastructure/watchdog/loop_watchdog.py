@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+import pururu
+import pururu.config as config
+import pururu.metrics as metrics
+import pururu.utils as utils
+
+LOOP_LAG = metrics.REGISTRY.histogram('pururu_loop_lag_seconds', 'Event loop heartbeat lag')
+LOOP_STALLS = metrics.REGISTRY.counter('pururu_loop_stalls_total', 'Event loop stalls longer than the threshold',
+                                       ('culprit',))
+
+PACKAGE_DIR = os.path.dirname(pururu.__file__)
+HANDLER_DIR = os.path.join(PACKAGE_DIR, 'application', 'services')
+ADAPTERS_DIR = os.path.join(PACKAGE_DIR, 'infrastructure', 'adapters')
+DISCORD_DIR = os.path.join(ADAPTERS_DIR, 'discord')
+
+
+def find_culprit(frame) -> str:
+    """
+    Names the Pururu calls responsible for a stack, e.g. 'PururuHandler.retrieve_player_stats ->
+    GoogleSheetsAdapter.get_attendance_matrix'
+    :param frame: innermost frame of the blocked thread
+    :return: str, the outermost handler call and the innermost adapter call found in the stack
+    """
+    handler_call, adapter_call, innermost = None, None, None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and not filename.startswith(os.path.dirname(__file__)):
+            innermost = innermost or frame.f_code.co_qualname
+            if filename.startswith(HANDLER_DIR):
+                handler_call = frame.f_code.co_qualname
+            elif filename.startswith(ADAPTERS_DIR) and not filename.startswith(DISCORD_DIR) and adapter_call is None:
+                adapter_call = frame.f_code.co_qualname
+        frame = frame.f_back
+    calls = [call for call in (handler_call, adapter_call) if call]
+    return ' -> '.join(calls) or innermost or 'unknown'
+
+
+class LoopWatchdog:
+    """
+    Measures the event loop lag with a heartbeat coroutine. A monitor thread checks the heartbeat and, when the loop
+    has not beaten for longer than the threshold, captures the stack of the loop thread and reports the Pururu call
+    blocking it. Each stall is reported once.
+    """
+
+    def __init__(self, interval: float = None, threshold: float = None):
+        self.interval = interval or config.LOOP_WATCHDOG_INTERVAL
+        self.threshold = threshold or config.LOOP_WATCHDOG_THRESHOLD
+        self.loop_thread_id = None
+        self.last_beat = time.monotonic()
+        self.stall_reported = False
+        self.heartbeat = None
+        self.monitor = None
+        self.stopped = threading.Event()
+        self.logger = utils.get_logger(__name__)
+
+    def start(self) -> None:
+        """
+        Starts watching the running event loop, must be called from a coroutine
+        :return: None
+        """
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.heartbeat = asyncio.get_running_loop().create_task(self.__beat())
+        self.monitor = threading.Thread(target=self.__monitor, name="pururu-loop-watchdog", daemon=True)
+        self.monitor.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+
+    def check(self) -> str | None:
+        """
+        Reports a stall if the loop has not beaten for longer than the threshold
+        :return: the culprit of a newly detected stall or None
+        """
+        blocked_for = time.monotonic() - self.last_beat - self.interval
+        if blocked_for < self.threshold or self.stall_reported:
+            return None
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return None
+        self.stall_reported = True
+        culprit = find_culprit(frame)
+        LOOP_STALLS.labels(culprit).inc()
+        self.logger.warning("Event loop blocked for %.2fs by %s:\n%s", blocked_for, culprit,
+                            ''.join(traceback.format_stack(frame)))
+        return culprit
+
+    async def __beat(self) -> None:
+        while not self.stopped.is_set():
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            LOOP_LAG.observe(lag)
+            if self.stall_reported:
+                self.logger.warning("Event loop recovered after %.2fs", lag)
+                self.stall_reported = False
+            self.last_beat = time.monotonic()
+
+    def __monitor(self) -> None:
+        while not self.stopped.wait(self.interval / 2):
+            self.check()
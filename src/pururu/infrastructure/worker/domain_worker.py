@@ -0,0 +1,317 @@
+import inspect
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import pururu.config as config
+import pururu.utils as utils
+from pururu.domain.exceptions import PururuException
+from pururu.domain.services.discord_service import DiscordInterface
+from pururu.domain.services.pururu_service import PururuService
+from pururu.domain.session_manager import SessionManager
+
+PING = "__ping__"
+STOP = None
+
+
+class DomainWorkerError(PururuException):
+    """Raised in the gateway process when the domain worker failed with a non Pururu exception."""
+    pass
+
+
+class DomainWorkerOverloaded(PururuException):
+    """Raised when the domain worker request queue stays full for longer than the timeout."""
+    pass
+
+
+class DomainWorkerUnavailable(PururuException):
+    """Raised when the domain worker does not answer in time or has died."""
+    pass
+
+
+def build_domain_service(spreadsheet_id: str = None, players: list[str] = None,
+                         player_mapping: dict[str, str] = None) -> PururuService:
+    """
+    Default service factory of the worker process: PururuService over the Google Sheets adapter; bind the arguments
+    with functools.partial to serve a guild other than the config one
+    :param spreadsheet_id: spreadsheet of the guild, config.SPREADSHEET_ID by default
+    :param players: players of the guild, config.PLAYERS by default
+    :param player_mapping: player -> column mapping, config.GS_ATTENDANCE_PLAYER_MAPPING by default
+    :return: PururuService
+    """
+    from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter
+    return PururuService(GoogleSheetsAdapter(config.GOOGLE_SHEETS_CREDENTIALS, spreadsheet_id or config.SPREADSHEET_ID,
+                                             player_mapping), players=players)
+
+
+def serve(service, requests, responses) -> None:
+    """
+    Worker loop: executes (request_id, method, args, kwargs) requests against the service until STOP is received.
+    Requests without request_id are fire and forget, their result is discarded.
+    :param service: PururuService
+    :param requests: requests queue
+    :param responses: responses queue, receives (request_id, ok, result)
+    :return: None
+    """
+    logger = utils.get_logger(__name__)
+    while True:
+        request = requests.get()
+        if request is STOP:
+            return
+        request_id, method, args, kwargs = request
+        try:
+            result = True if method == PING else getattr(service, method)(*args, **kwargs)
+            ok = True
+        except PururuException as e:
+            result, ok = e, False
+        except Exception as e:
+            result, ok = DomainWorkerError(f"{type(e).__name__}: {e}"), False
+        if request_id is not None:
+            responses.put((request_id, ok, result))
+        elif not ok:
+            logger.error("Error on fire and forget call '%s': %s", method, result)
+
+
+def run_domain_worker(service_factory, requests, responses) -> None:
+    """
+    Entry point of the worker process
+    :param service_factory: picklable callable returning the PururuService to serve
+    :param requests: requests queue
+    :param responses: responses queue
+    :return: None
+    """
+    serve(service_factory(), requests, responses)
+
+
+class DomainWorker:
+    """
+    Owns the worker process and its IPC queues, the requests queue is bounded to apply backpressure
+    """
+
+    def __init__(self, service_factory=build_domain_service, context=None):
+        self.service_factory = service_factory
+        self.context = context or multiprocessing.get_context('spawn')
+        self.requests = self.context.Queue(maxsize=config.DOMAIN_WORKER_QUEUE_SIZE)
+        self.responses = self.context.Queue()
+        self.process = None
+
+    def start(self) -> None:
+        self.process = self.context.Process(target=run_domain_worker, name="pururu-domain-worker", daemon=True,
+                                            args=(self.service_factory, self.requests, self.responses))
+        self.process.start()
+
+    def stop(self) -> None:
+        if self.is_alive():
+            self.requests.put(STOP)
+            self.process.join(config.DOMAIN_WORKER_TIMEOUT)
+        if self.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def close(self) -> None:
+        """
+        Closes the IPC queues, once the process and the threads reading them are done
+        :return: None
+        """
+        for ipc_queue in (self.requests, self.responses):
+            ipc_queue.close()
+            ipc_queue.join_thread()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def queue_size(self) -> int:
+        try:
+            return self.requests.qsize()
+        except NotImplementedError:
+            return -1
+
+
+class WorkerHealth:
+    def __init__(self, alive: bool, latency: float | None, queue_size: int):
+        self.alive = alive
+        self.latency = latency
+        self.queue_size = queue_size
+
+    def __str__(self):
+        return f"alive: {self.alive}, latency: {self.latency}, queue_size: {self.queue_size}"
+
+
+class SessionMirror:
+    """
+    What the gateway knows of a worker session from the calls it forwarded; the worker state is lost if it dies
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.players: set[str] = set()
+        self.game_id: int | None = None
+
+    def __str__(self):
+        return f"{self.channel or 'default'} (game {self.game_id}, players {sorted(self.players)})"
+
+
+class DomainServiceProxy:
+    """
+    Stands in for PururuService in the gateway process: every public PururuService method is forwarded to the
+    domain worker, which owns the real service and its adapters. The DiscordInterface stays in the gateway process.
+    """
+
+    FIRE_AND_FORGET = {"register_bot_event"}
+    SESSION_METHODS = {method: inspect.signature(getattr(PururuService, method))
+                       for method in ["add_player", "remove_player", "start_new_game", "end_game"]}
+
+    def __init__(self, worker: DomainWorker):
+        self.worker = worker
+        self.discord_service = None
+        self.pending: dict[int, Future] = {}
+        self.sessions: dict = {}  # session key -> SessionMirror
+        self.pending_lock = threading.Lock()
+        self.ids = itertools.count()
+        self.dispatcher = None
+        self.monitor = None
+        self.stopped = threading.Event()
+        self.logger = utils.get_logger(__name__)
+
+    def start(self) -> None:
+        """
+        Starts the worker process, the responses dispatcher and the health monitor
+        :return: None
+        """
+        self.worker.start()
+        self.dispatcher = threading.Thread(target=self.__dispatch_responses, name="pururu-worker-dispatcher",
+                                           daemon=True)
+        self.dispatcher.start()
+        self.monitor = threading.Thread(target=self.__monitor_health, name="pururu-worker-monitor", daemon=True)
+        self.monitor.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.worker.stop()
+        self.worker.responses.put(STOP)
+        self.__fail_pending("Domain worker stopped")
+        for thread in (self.dispatcher, self.monitor):
+            if thread is not None:
+                thread.join(config.DOMAIN_WORKER_TIMEOUT)
+        self.worker.close()
+
+    def set_discord_service(self, discord_service: DiscordInterface) -> None:
+        self.discord_service = discord_service
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Calls a PururuService method in the worker and waits for its result
+        :param method: PururuService method name
+        :return: the method result
+        :raises DomainWorkerOverloaded: if the request queue is full
+        :raises DomainWorkerUnavailable: if the worker does not answer in time
+        """
+        request_id = next(self.ids)
+        future = Future()
+        with self.pending_lock:
+            self.pending[request_id] = future
+        try:
+            self.worker.requests.put((request_id, method, args, kwargs), timeout=config.DOMAIN_WORKER_TIMEOUT)
+            ok, result = future.result(timeout=config.DOMAIN_WORKER_TIMEOUT)
+        except queue.Full:
+            raise DomainWorkerOverloaded(f"Domain worker queue is full, cannot call '{method}'")
+        except FutureTimeoutError:
+            raise DomainWorkerUnavailable(f"Domain worker did not answer '{method}' in time")
+        finally:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+        if method in self.SESSION_METHODS:
+            self.__track(method, args, kwargs, ok, result)
+        if not ok:
+            raise result
+        return result
+
+    def post(self, method: str, *args, **kwargs) -> None:
+        """
+        Sends a PururuService call to the worker without waiting for its result; dropped if the queue is full
+        :param method: PururuService method name
+        :return: None
+        """
+        try:
+            self.worker.requests.put_nowait((None, method, args, kwargs))
+        except queue.Full:
+            self.logger.warning("Domain worker queue is full, dropping '%s' call", method)
+
+    def health_check(self) -> WorkerHealth:
+        """
+        Pings the worker and reports its health
+        :return: WorkerHealth
+        """
+        latency = None
+        if self.worker.is_alive():
+            start = time.perf_counter()
+            try:
+                self.call(PING)
+                latency = time.perf_counter() - start
+            except PururuException as e:
+                self.logger.warning("Domain worker health check failed: %s", e)
+        return WorkerHealth(self.worker.is_alive(), latency, self.worker.queue_size())
+
+    def __getattr__(self, name: str):
+        if name.startswith('_') or not callable(getattr(PururuService, name, None)):
+            raise AttributeError(name)
+        if name in self.FIRE_AND_FORGET:
+            return lambda *args, **kwargs: self.post(name, *args, **kwargs)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def __track(self, method: str, args: tuple, kwargs: dict, ok: bool, result) -> None:
+        """
+        Mirrors the sessions of the worker from the answered session calls
+        """
+        arguments = self.SESSION_METHODS[method].bind(None, *args, **kwargs).arguments
+        channel = arguments.get('channel')
+        key = SessionManager.key(channel)
+        with self.pending_lock:
+            session = self.sessions.get(key) or SessionMirror(channel)
+            if method == "add_player" and ok:
+                session.players.add(arguments['player'])
+            elif method == "remove_player" and ok:
+                session.players.discard(arguments['player'])
+            elif method == "start_new_game" and ok:
+                session.game_id = result.game_id
+            elif method == "end_game" and (ok or not isinstance(result, DomainWorkerError)):
+                session.players.clear()  # ended, stored or not, the session is reset
+                session.game_id = None
+            if session.players or session.game_id is not None:
+                self.sessions[key] = session
+            else:
+                self.sessions.pop(key, None)
+
+    def __dispatch_responses(self) -> None:
+        while True:
+            response = self.worker.responses.get()
+            if response is STOP:
+                return
+            request_id, ok, result = response
+            with self.pending_lock:
+                future = self.pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_result((ok, result))
+
+    def __monitor_health(self) -> None:
+        while not self.stopped.wait(config.DOMAIN_WORKER_HEALTH_INTERVAL):
+            if self.worker.is_alive():
+                self.logger.debug("Domain worker health: %s", self.health_check())
+                continue
+            with self.pending_lock:
+                lost = [str(session) for session in self.sessions.values()]
+                self.sessions.clear()
+            self.logger.error("Domain worker is down, restarting it with empty sessions; lost sessions: %s",
+                              ", ".join(lost) or "none")
+            self.__fail_pending("Domain worker died")
+            self.worker.start()
+
+    def __fail_pending(self, reason: str) -> None:
+        with self.pending_lock:
+            futures = list(self.pending.values())
+        for future in futures:
+            if not future.done():
+                future.set_result((False, DomainWorkerUnavailable(reason)))
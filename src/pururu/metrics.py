@@ -0,0 +1,215 @@
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+class CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        return [f"{name}{labels} {_format_value(self.value)}"]
+
+
+class GaugeChild(CounterChild):
+    def dec(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self.lock:
+            self.value = value
+
+
+class HistogramChild:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+    def time(self) -> 'Timer':
+        """
+        Context manager observing the elapsed seconds of its block
+        :return: Timer
+        """
+        return Timer(self)
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        separator = labels[:-1] + ',' if labels else '{'
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{separator}le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Timer:
+    def __init__(self, histogram: HistogramChild):
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metric:
+    """
+    A metric family: one child per combination of label values, created on first use and cached so the hot path
+    is a dict lookup plus a locked update.
+    """
+
+    TYPE = None
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        Returns the child of the given label values, in label_names order
+        :param values: label values
+        :return: the child metric
+        """
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {values}")
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.TYPE}"]
+        for values, child in sorted(self.children.copy().items()):
+            lines.extend(child.samples(self.name, self.__format_labels(values)))
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def __format_labels(self, values: tuple) -> str:
+        if not values:
+            return ''
+        pairs = ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(self.label_names, values))
+        return f'{{{pairs}}}'
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _new_child(self):
+        return CounterChild()
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _new_child(self):
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> Timer:
+        return self.labels().time()
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    """
+    Holds the metric families of the process and renders them in the Prometheus text exposition format
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, description: str, label_names: tuple = ()) -> Counter:
+        return self.__register(Counter, name, description, label_names)
+
+    def gauge(self, name: str, description: str, label_names: tuple = ()) -> Gauge:
+        return self.__register(Gauge, name, description, label_names)
+
+    def histogram(self, name: str, description: str, label_names: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.__register(Histogram, name, description, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format (version 0.0.4)
+        :return: str
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def __register(self, metric_class, name: str, description: str, label_names: tuple, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, description, label_names, **kwargs)
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered as a different metric")
+            return metric
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
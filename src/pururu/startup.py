@@ -0,0 +1,91 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pururu.metrics as metrics
+
+STARTED_AT = time.perf_counter()
+
+STARTUP_PHASE = metrics.REGISTRY.gauge('pururu_startup_phase_seconds', 'Duration of each startup phase', ('phase',))
+BOOT_PHASES: dict[str, tuple[float, float]] = {}  # phases run before any StartupTimer exists, e.g. module imports
+
+
+@contextmanager
+def boot_phase(name: str):
+    """
+    Records the duration of its block in BOOT_PHASES, for the module level work of the entry point
+    :param name: phase name, e.g. config
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        BOOT_PHASES[name] = (start, time.perf_counter())
+
+
+class StartupTimer:
+    """
+    Startup timing report: start and end of every phase (import, auth, login, sync, warm_up...) relative to the
+    process start, plus the instant points such as ready. Phases may overlap, they run in different threads and tasks.
+    """
+
+    def __init__(self, started_at: float = STARTED_AT, boot_phases: dict[str, tuple[float, float]] = None):
+        self.started_at = started_at
+        self.phases: dict[str, tuple[float, float]] = {}
+        self.lock = threading.Lock()
+        for name, (start, end) in (boot_phases or {}).items():
+            self.record(name, start, end)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Records the duration of its block as the phase name
+        :param name: phase name, e.g. auth
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """
+        Records a phase, a repeated phase (e.g. auth of every guild) spans from its first start to its last end
+        :param name: phase name
+        :param start: time.perf_counter() at the phase start
+        :param end: time.perf_counter() at the phase end
+        :return: None
+        """
+        with self.lock:
+            start, end = start - self.started_at, end - self.started_at
+            if name in self.phases:
+                start, end = min(start, self.phases[name][0]), max(end, self.phases[name][1])
+            self.phases[name] = (start, end)
+        STARTUP_PHASE.labels(name).set(end - start)
+
+    def mark(self, name: str) -> None:
+        """
+        Records an instant, e.g. ready; only the first mark of a name is kept
+        :param name: point name
+        :return: None
+        """
+        now = time.perf_counter()
+        if name not in self.phases:
+            self.record(name, now, now)
+
+    def elapsed(self, name: str) -> float | None:
+        """
+        Seconds from the process start to the end of the phase, None if it did not happen yet
+        """
+        with self.lock:
+            return self.phases[name][1] if name in self.phases else None
+
+    def report(self) -> str:
+        """
+        Phases in start order, e.g. 'import 0.00-0.41s, auth 0.41-1.62s, ready at 2.05s'
+        :return: str
+        """
+        with self.lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1])
+        return ", ".join(f"{name} at {start:.2f}s" if start == end else f"{name} {start:.2f}-{end:.2f}s"
+                         for name, (start, end) in phases)
@@ -0,0 +1,109 @@
+"""
+Critical path breakdown of the traces exported by pururu.tracing, one report per game.
+
+Usage (from src/): python -m pururu.trace_report traces.jsonl [game_id]
+"""
+import argparse
+import json
+from collections import defaultdict
+
+
+def load_traces(path: str) -> dict[str, list[dict]]:
+    """
+    Reads a JSONL span export grouping the spans by trace
+    :param path: export file, see config.TRACING_EXPORT_PATH
+    :return: dict[str, list[dict]] trace_id -> spans
+    """
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def trace_game_id(spans: list[dict]) -> int | None:
+    game_ids = [span["attributes"].get("game_id") for span in spans]
+    return next((game_id for game_id in game_ids if game_id is not None), None)
+
+
+def critical_path(spans: list[dict]) -> list[tuple[dict, float]]:
+    """
+    Walks the trace from its root keeping, inside each span, the chain of children that finishes last. Delay spans
+    may outlive their parent, so a span extends until its last descendant ends.
+    :param spans: spans of a single trace
+    :return: list[tuple[dict, float]] critical path spans in start order with their self time in seconds
+    """
+    children = defaultdict(list)
+    span_ids = {span["span_id"] for span in spans}
+    roots = []
+    for span in spans:
+        if span["parent_id"] in span_ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    if not roots:
+        return []
+    extents = {}
+    for span in spans:
+        __extend(span, children, extents)
+    path = []
+    __walk(min(roots, key=lambda span: span["start"]), children, extents, path)
+    return sorted(path, key=lambda item: (item[0]["start"], -extents[item[0]["span_id"]]))
+
+
+def __extend(span: dict, children: dict, extents: dict) -> float:
+    """
+    End of the span extended by its descendants, delay spans may outlive their parent
+    """
+    if span["span_id"] not in extents:
+        extents[span["span_id"]] = max([span["end"]] + [__extend(child, children, extents)
+                                                        for child in children[span["span_id"]]])
+    return extents[span["span_id"]]
+
+
+def __walk(span: dict, children: dict, extents: dict, path: list) -> None:
+    """
+    Adds the span and, from the last to the first, the sequential children it waited for to path
+    """
+    end = extents[span["span_id"]]
+    cursor, covered = end, 0.0
+    for child in sorted(children[span["span_id"]], key=lambda child: extents[child["span_id"]], reverse=True):
+        if extents[child["span_id"]] <= cursor and child["start"] >= span["start"]:
+            __walk(child, children, extents, path)
+            covered += extents[child["span_id"]] - child["start"]
+            cursor = child["start"]
+    path.append((span, max(0.0, end - span["start"] - covered)))
+
+
+def format_report(trace_id: str, spans: list[dict]) -> str:
+    path = critical_path(spans)
+    if not path:
+        return f"trace {trace_id}: no spans"
+    total = sum(self_time for _, self_time in path)
+    by_kind = defaultdict(float)
+    lines = [f"game {trace_game_id(spans)} - trace {trace_id} ({path[0][0]['name']}): {total:.3f}s"]
+    for span, self_time in path:
+        by_kind[span["name"].split(":")[0]] += self_time
+        error = f" [{span['attributes']['error']}]" if span["attributes"].get("error") else ""
+        lines.append(f"  {span['name']:40} {self_time * 1e3:12.1f} ms{error}")
+    lines.append("  " + ", ".join(f"{kind} {elapsed:.3f}s ({elapsed / total:.0%})" if total else f"{kind} 0s"
+                                  for kind, elapsed in sorted(by_kind.items(), key=lambda item: -item[1])))
+    return "\n".join(lines)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Critical path breakdown per game of a Pururu trace export")
+    parser.add_argument("path", help="JSONL export, see TRACING_EXPORT_PATH")
+    parser.add_argument("game_id", nargs="?", type=int, help="only report this game")
+    args = parser.parse_args(argv)
+    traces = load_traces(args.path)
+    reports = [(spans, trace_id) for trace_id, spans in traces.items() if trace_game_id(spans) is not None
+               and (args.game_id is None or trace_game_id(spans) == args.game_id)]
+    for spans, trace_id in sorted(reports, key=lambda item: min(span["start"] for span in item[0])):
+        print(format_report(trace_id, spans))
+
+
+if __name__ == '__main__':
+    main()
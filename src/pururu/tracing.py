@@ -0,0 +1,135 @@
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pururu.config as config
+
+
+class SpanContext:
+    """
+    Identifies a span so children can be attached to it, e.g. from another thread or after a delay
+    """
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def __eq__(self, other):
+        return isinstance(other, SpanContext) and (self.trace_id, self.span_id) == (other.trace_id, other.span_id)
+
+    def __repr__(self):
+        return f"SpanContext({self.trace_id}, {self.span_id})"
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict, start: float = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time() if start is None else start
+        self.end = None
+
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": self.start, "end": self.end, "attributes": self.attributes}
+
+
+class JsonlSpanExporter:
+    """
+    Appends every finished span as a JSON line, the file can be read by trace_report or tailed by a collector
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+_current_span: ContextVar[Span | None] = ContextVar("pururu_current_span", default=None)
+
+
+def current_context() -> SpanContext | None:
+    """
+    Returns the context of the span active in the current thread or task
+    :return: SpanContext or None if there is no active span or tracing is disabled
+    """
+    span = _current_span.get()
+    return span.context() if span is not None else None
+
+
+class Tracer:
+    """
+    Creates spans and hands them to the exporter. Spans opened with span() become the current span of the thread or
+    task, so nested calls are attached to them; across threads the SpanContext has to be passed explicitly.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, parent: SpanContext = None, **attributes):
+        """
+        Context manager measuring its block as a span
+        :param name: span name, '<kind>:<operation>', e.g. 'db:get_last_attendance'
+        :param parent: parent span context, defaults to the current span
+        :param attributes: span attributes, e.g. game_id
+        :return: the Span, or None when tracing is disabled
+        """
+        if not config.TRACING_ENABLED:
+            yield None
+            return
+        span = self.__new_span(name, parent or current_context(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end = time.time()
+            self.__export(span)
+
+    def record(self, name: str, parent: SpanContext | None, start: float, end: float,
+               **attributes) -> SpanContext | None:
+        """
+        Records an already finished span, e.g. the time an event waited for its timer
+        :param name: span name
+        :param parent: parent span context
+        :param start: start timestamp, time.time()
+        :param end: end timestamp, time.time()
+        :param attributes: span attributes
+        :return: the SpanContext of the recorded span or None when tracing is disabled
+        """
+        if not config.TRACING_ENABLED:
+            return None
+        span = self.__new_span(name, parent, attributes, start)
+        span.end = end
+        self.__export(span)
+        return span.context()
+
+    @staticmethod
+    def __new_span(name: str, parent: SpanContext | None, attributes: dict, start: float = None) -> Span:
+        if isinstance(parent, SpanContext):
+            return Span(name, parent.trace_id, parent.span_id, attributes, start)
+        return Span(name, secrets.token_hex(16), None, attributes, start)
+
+    def __export(self, span: Span) -> None:
+        if self.exporter is None:
+            self.exporter = JsonlSpanExporter(config.TRACING_EXPORT_PATH)
+        self.exporter.export(span)
+
+
+TRACER = Tracer()
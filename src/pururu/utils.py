@@ -1,31 +1,134 @@
+import atexit
 import logging
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, date
+from logging.handlers import QueueHandler, QueueListener
 
+import pururu.clock as clock
 import pururu.config as config
 
 FORMATTED_TIME_STR = '%Y-%m-%d %H:%M:%S'
+DATE_FORMATS = [FORMATTED_TIME_STR, '%Y-%m-%d', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y']
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_log_listener: QueueListener | None = None
+_log_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records with the same logger, level and message template every `interval` seconds;
+    the next record let through reports how many were suppressed
+    """
+
+    def __init__(self, interval: float, burst: int):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows: dict[tuple, list] = {}  # key -> [window start, records in window, suppressed]
+        self.swept_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0 or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            if now - self.swept_at >= self.interval:
+                self.__sweep(now)
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+    def __sweep(self, now: float) -> None:
+        """
+        Drops the expired windows, so messages logged once do not pile up; a window with suppressed records is kept
+        one more interval to report them if the message comes back
+        """
+        self.swept_at = now
+        self.windows = {key: window for key, window in self.windows.items()
+                        if now - window[0] < (2 if window[2] else 1) * self.interval}
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that only merges the record args on the caller side, so mutable args are snapshotted, and leaves
+    the formatting (timestamp, layout, exception text) to the QueueListener thread
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(force: bool = False) -> None:
+    """
+    Configures the root logger once: records are enqueued by a QueueHandler and formatted and written by a
+    QueueListener thread, so the callers never block on I/O
+    :param force: reconfigure even if logging was already configured
+    :return: None
+    """
+    global _log_listener
+    with _log_lock:
+        if _log_listener is not None and not force:
+            return
+        if _log_listener is None:
+            atexit.register(_stop_log_listener)
+        else:
+            _log_listener.stop()
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=FORMATTED_TIME_STR))
+        log_queue = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT_INTERVAL, config.LOG_RATE_LIMIT_BURST))
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(config.LOG_LEVEL)
+        _log_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _log_listener.start()
+
+
+def _stop_log_listener() -> None:
+    global _log_listener
+    with _log_lock:
+        if _log_listener is not None:
+            _log_listener.stop()
+            _log_listener = None
 
 
 def get_logger(name: str):
     """
-    Creates a custom logger instance
+    Creates a custom logger instance, logging is configured on first use (see configure_logging)
     :param name: __name__ of the module
     :return: Logger
     """
-    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                        datefmt=FORMATTED_TIME_STR,
-                        level=config.LOG_LEVEL,
-                        force=True)
-    logger = logging.getLogger(name)
-    return logger
+    configure_logging()
+    return logging.getLogger(name)
 
 
-def get_current_time_formatted():
+def get_current_time_formatted(time_clock: clock.Clock = None):
     """
     Returns the current time in a formatted string, e.g. 2021-09-01 12:00:00
+    :param time_clock: Clock to read, the process clock by default
     :return: str
     """
-    return datetime.now().strftime(FORMATTED_TIME_STR)
+    return (time_clock or clock.get_clock()).now().strftime(FORMATTED_TIME_STR)
 
 
 def format_time(time: datetime):
@@ -44,3 +147,17 @@ def parse_time(time: str):
     :return: datetime
     """
     return datetime.strptime(time, FORMATTED_TIME_STR)
+
+
+def parse_date(value: str) -> date | None:
+    """
+    Parses the date of a string written in any of the DATE_FORMATS, e.g. 2021-09-01 12:00:00 or 01/09/2021
+    :param value: str
+    :return: date or None if the string does not match any format
+    """
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    return None
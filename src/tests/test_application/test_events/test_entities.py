@@ -5,7 +5,7 @@ import pytest
 from hamcrest import assert_that, equal_to
 
 from pururu.application.events.entities import MemberJoinedChannelEvent, MemberLeftChannelEvent, NewGameIntentEvent, \
-    EndGameIntentEvent, GameStartedEvent, GameEndedEvent, EventType
+    EndGameIntentEvent, GameStartedEvent, GameEndedEvent, EventType, MemberMovedChannelEvent, GameDiscardedEvent
 from pururu.domain.entities import Attendance
 from tests.test_domain.test_entities import attendance
 
@@ -28,6 +28,16 @@ def member_left_channel_event():
     )
 
 
+@pytest.fixture
+def member_moved_channel_event():
+    return MemberMovedChannelEvent(
+        member="member1",
+        from_channel="channel",
+        to_channel="other channel",
+        moved_at=datetime(2023, 8, 10, 10, 30),
+    )
+
+
 @pytest.fixture
 def new_game_intent_event():
     return NewGameIntentEvent(
@@ -87,6 +97,21 @@ def test_member_left_channel_event_as_bot_event(utils_mock):
     assert_that(actual.description, equal_to("member member1 has left channel channel at 2023-08-10 11:00:00"))
 
 
+@patch("pururu.utils.get_current_time_formatted", return_value="2023-08-10")
+def test_member_moved_channel_event_as_bot_event(utils_mock):
+    # Given
+    member_moved_channel_event = MemberMovedChannelEvent(member="member1", from_channel="channel",
+                                                         to_channel="other channel",
+                                                         moved_at=datetime(2023, 8, 10, 10, 30))
+    # When
+    actual = member_moved_channel_event.as_bot_event()
+    # Then
+    assert_that(actual.event_type, equal_to(EventType.MEMBER_MOVED_CHANNEL.value))
+    assert_that(actual.date, equal_to("2023-08-10"))
+    assert_that(actual.description,
+                equal_to("member member1 has moved from channel channel to other channel at 2023-08-10 10:30:00"))
+
+
 @patch("pururu.utils.get_current_time_formatted", return_value="2023-08-10")
 def test_new_game_intent_event_as_bot_event(utils_mock):
     # Given
@@ -133,3 +158,15 @@ def test_game_ended_event_as_bot_event(utils_mock, attendance: Attendance):
     assert_that(actual.event_type, equal_to(EventType.GAME_ENDED.value))
     assert_that(actual.date, equal_to("2023-08-10"))
     assert_that(actual.description, equal_to("game_id: 1, attended: ['member1'], absences: ['member2', 'member3']"))
+
+
+@patch("pururu.utils.get_current_time_formatted", return_value="2023-08-10")
+def test_game_discarded_event_as_bot_event(utils_mock):
+    # Given
+    game_discarded_event = GameDiscardedEvent(game_id=1, players=["member1"], end_time=datetime(2023, 8, 10, 11))
+    # When
+    actual = game_discarded_event.as_bot_event()
+    # Then
+    assert_that(actual.event_type, equal_to(EventType.GAME_DISCARDED.value))
+    assert_that(actual.date, equal_to("2023-08-10"))
+    assert_that(actual.description, equal_to("game_id: 1, players: ['member1'], end_time 2023-08-10 11:00:00"))
@@ -1,9 +1,14 @@
+import time
 from unittest.mock import Mock, patch, MagicMock
 
 from hamcrest import assert_that, is_in, raises, calling, equal_to
 
-from pururu.application.events.entities import EventType
-from pururu.application.events.event_system import Event, EventSystem
+import pururu.tracing as tracing
+from pururu.application.events.entities import EventType, GameStartedEvent
+from pururu.application.events.event_system import Event, EventSystem, EVENTS_EMITTED, EVENTS_DELAYED, \
+    LISTENER_LATENCY
+from pururu.tracing import SpanContext
+from tests.test_tracing import MemoryExporter
 
 
 def listener_example(*args):
@@ -103,3 +108,46 @@ def test_emit_event_with_delay_ok():
         event_system.events[EventType.MEMBER_JOINED_CHANNEL] = Event(EventType.MEMBER_JOINED_CHANNEL)
         event_system.emit_event_with_delay(pururu_event, 0)
         mock_emit_event.assert_called_once_with(pururu_event)
+
+
+@patch('time.time', MagicMock(return_value=100))
+@patch('threading.Timer')
+def test_emit_event_metrics(timer_mock):
+    # Given
+    event_system = EventSystem()
+    event_system.events[EventType.MEMBER_JOINED_CHANNEL] = Event(EventType.MEMBER_JOINED_CHANNEL)
+    emitted = EVENTS_EMITTED.labels(EventType.MEMBER_JOINED_CHANNEL.name)
+    delayed = EVENTS_DELAYED.labels(EventType.MEMBER_JOINED_CHANNEL.name)
+    latency = LISTENER_LATENCY.labels(EventType.MEMBER_JOINED_CHANNEL.name)
+    emitted_before, delayed_before, observed_before = emitted.value, delayed.value, sum(latency.counts)
+    pururu_event = Mock(event_type=EventType.MEMBER_JOINED_CHANNEL)
+    # When
+    event_system.emit_event(pururu_event)
+    event_system.emit_event(pururu_event)
+    # Then
+    assert_that(emitted.value - emitted_before, equal_to(1))
+    assert_that(delayed.value - delayed_before, equal_to(1))
+    assert_that(sum(latency.counts) - observed_before, equal_to(1))
+
+
+@patch('pururu.config.TRACING_ENABLED', True)
+def test_emit_event_with_delay_traced():
+    # Given
+    event_system = EventSystem()
+    event_system.events[EventType.GAME_STARTED] = Event(EventType.GAME_STARTED)
+    pururu_event = GameStartedEvent(1, ["member1"])
+    pururu_event.trace = SpanContext("trace", "parent")
+    exporter = MemoryExporter()
+    # When
+    with patch.object(tracing.TRACER, 'exporter', exporter):
+        event_system.emit_event_with_delay(pururu_event, 0, reason="attendance_check")
+        deadline = time.monotonic() + 1
+        while len(exporter.spans) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    # Then
+    delay_span, emit_span = exporter.spans
+    assert_that(delay_span.name, equal_to("delay:attendance_check"))
+    assert_that(delay_span.parent_id, equal_to("parent"))
+    assert_that(emit_span.name, equal_to("emit:game_started"))
+    assert_that(emit_span.parent_id, equal_to(delay_span.span_id))
+    assert_that(emit_span.attributes, equal_to({"game_id": 1}))
@@ -5,11 +5,11 @@ import pytest
 
 from pururu.application.events.entities import EventType
 from pururu.application.events.entities import MemberJoinedChannelEvent, MemberLeftChannelEvent, NewGameIntentEvent, \
-    EndGameIntentEvent, GameStartedEvent, GameEndedEvent
+    EndGameIntentEvent, GameStartedEvent, GameEndedEvent, MemberMovedChannelEvent, GameDiscardedEvent
 from pururu.application.events.listeners import EventListeners
 from pururu.domain.entities import Attendance
 from tests.test_application.test_events.test_entities import member_joined_channel_event, member_left_channel_event, \
-    new_game_intent_event, end_game_intent_event, game_started_event, game_ended_event
+    member_moved_channel_event, new_game_intent_event, end_game_intent_event, game_started_event, game_ended_event
 from tests.test_domain.test_entities import attendance
 
 
@@ -66,6 +66,25 @@ def test_on_member_left_channel_ko(member_left_channel_event: MemberLeftChannelE
     listener.pururu_handler.handle_member_left_channel_event.assert_called_once_with(member_left_channel_event)
 
 
+def test_on_member_moved_channel_ok(member_moved_channel_event: MemberMovedChannelEvent):
+    # Given
+    listener = set_up()
+    # When
+    listener.on_member_moved_channel(member_moved_channel_event)
+    # Then
+    listener.pururu_handler.handle_member_moved_channel_event.assert_called_once_with(member_moved_channel_event)
+
+
+def test_on_member_moved_channel_ko(member_moved_channel_event: MemberMovedChannelEvent):
+    # Given
+    listener = set_up()
+    listener.pururu_handler.handle_member_moved_channel_event.side_effect = Exception("test exception")
+    # When
+    listener.on_member_moved_channel(member_moved_channel_event)
+    # Then
+    listener.pururu_handler.handle_member_moved_channel_event.assert_called_once_with(member_moved_channel_event)
+
+
 def test_on_new_game_intent_ok(new_game_intent_event: NewGameIntentEvent):
     # Given
     listener = set_up()
@@ -140,3 +159,14 @@ def test_on_game_ended_ko(attendance: Attendance, game_ended_event: GameEndedEve
     listener.on_game_ended(game_ended_event)
     # Then
     listener.pururu_handler.handle_game_ended_event.assert_called_once_with(game_ended_event)
+
+
+def test_on_game_discarded_ko():
+    # Given
+    listener = set_up()
+    game_discarded_event = GameDiscardedEvent(1, ["member1"], None)
+    listener.pururu_handler.handle_game_discarded_event.side_effect = Exception("test exception")
+    # When
+    listener.on_game_discarded(game_discarded_event)
+    # Then
+    listener.pururu_handler.handle_game_discarded_event.assert_called_once_with(game_discarded_event)
@@ -0,0 +1,140 @@
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch, call
+
+from hamcrest import assert_that, equal_to
+
+from pururu.application.events.event_system import EventSystem
+from pururu.application.events.listeners import EventListeners
+from pururu.application.services.flap_damper import FlapDamper, VOICE_FLAPS
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.clock import VirtualClock
+from pururu.domain.services.pururu_service import PururuService
+
+START = datetime(2023, 8, 10, 20)
+
+
+def set_up() -> tuple[FlapDamper, VirtualClock]:
+    virtual_clock = VirtualClock(START)
+    return FlapDamper(Mock(), virtual_clock), virtual_clock
+
+
+def play(schedule: list, damped: bool) -> PururuService:
+    """
+    Sends the (seconds, member, before, after) voice updates through a real stack, behind a FlapDamper if damped
+    """
+    virtual_clock = VirtualClock(START)
+    event_system = EventSystem(virtual_clock)
+    service = PururuService(Mock(), virtual_clock)
+    handler = PururuHandler(service, event_system, virtual_clock)
+    EventListeners(event_system, handler)
+    entry = FlapDamper(handler, virtual_clock) if damped else handler
+    for seconds, member, before, after in schedule:
+        virtual_clock.advance_to((START + timedelta(seconds=seconds)).timestamp())
+        entry.handle_voice_state_update_dc_event(member, before, after)
+    virtual_clock.advance(3600)
+    return service
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 20)
+def test_rejoin_within_grace_merged():
+    # Given
+    damper, virtual_clock = set_up()
+    merged = VOICE_FLAPS.labels('merged')
+    merged_before = merged.value
+    # When
+    damper.handle_voice_state_update_dc_event("member1", None, "General")
+    virtual_clock.advance(600)
+    damper.handle_voice_state_update_dc_event("member1", "General", None)
+    virtual_clock.advance(5)
+    damper.handle_voice_state_update_dc_event("member1", None, "General")
+    virtual_clock.advance(60)
+    # Then
+    damper.pururu_handler.handle_voice_state_update_dc_event.assert_called_once_with("member1", None, "General")
+    assert_that(merged.value - merged_before, equal_to(1))
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 20)
+def test_leave_released_with_its_time():
+    # Given
+    damper, virtual_clock = set_up()
+    # When
+    damper.handle_voice_state_update_dc_event("member1", "General", None)
+    virtual_clock.advance(19)
+    released_early = damper.pururu_handler.handle_voice_state_update_dc_event.called
+    virtual_clock.advance(1)
+    # Then
+    assert_that(released_early, equal_to(False))
+    damper.pururu_handler.handle_voice_state_update_dc_event.assert_called_once_with("member1", "General", None,
+                                                                                     START)
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 20)
+def test_rejoin_to_other_channel_is_a_move():
+    # Given
+    damper, virtual_clock = set_up()
+    # When
+    damper.handle_voice_state_update_dc_event("member1", "General", None)
+    virtual_clock.advance(5)
+    damper.handle_voice_state_update_dc_event("member1", None, "Partida")
+    virtual_clock.advance(60)
+    # Then
+    damper.pururu_handler.handle_voice_state_update_dc_event.assert_called_once_with("member1", "General", "Partida")
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 0)
+def test_disabled():
+    # Given
+    damper, virtual_clock = set_up()
+    # When
+    damper.handle_voice_state_update_dc_event("member1", "General", None)
+    damper.handle_voice_state_update_dc_event("member1", None, "General")
+    # Then
+    damper.pururu_handler.handle_voice_state_update_dc_event.assert_has_calls(
+        [call("member1", "General", None), call("member1", None, "General")])
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 20)
+@patch("pururu.config.PLAYERS", ["member1", "member2"])
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 3)
+def test_fewer_intervals_counting_the_blips():
+    # Given
+    schedule = [(0, "member2", None, "General"), (0, "member1", None, "General"), (600, "member1", "General", None), (603, "member1", None, "General"),
+                (1200, "member1", "General", None), (1210, "member1", None, "General"),
+                (1800, "member1", "General", None), (2400, "member1", None, "General")]
+    # When
+    undamped, damped = play(schedule, False), play(schedule, True)
+    # Then
+    undamped_session, damped_session = undamped.sessions.get("General"), damped.sessions.get("General")
+    assert_that(len(undamped_session.players_clock_ins["member1"]), equal_to(4))
+    assert_that(len(damped_session.players_clock_ins["member1"]), equal_to(2))
+    assert_that(damped_session.players_clock_outs["member1"],
+                equal_to(undamped_session.players_clock_outs["member1"][2:]))
+    assert_that(damped_session.get_player_time("member1"),
+                equal_to(undamped_session.get_player_time("member1") + 3 + 10))
+
+
+@patch("pururu.config.VOICE_FLAP_GRACE", 20)
+def test_released_leave_handled_without_the_lock():
+    # Given
+    damper, virtual_clock = set_up()
+    lock_free = []
+
+    def try_lock():
+        acquired = damper.lock.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            damper.lock.release()
+
+    def handle(*args):
+        # Another thread, e.g. a voice update of another member, must not wait for the handler
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    damper.pururu_handler.handle_voice_state_update_dc_event.side_effect = handle
+    damper.handle_voice_state_update_dc_event("member1", "General", None)
+    # When
+    virtual_clock.advance(20)
+    # Then
+    assert_that(lock_free, equal_to([True]))
@@ -0,0 +1,80 @@
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, equal_to, none, instance_of
+
+from pururu.application.services.flap_damper import FlapDamper
+from pururu.application.services.guild_registry import GuildRegistry, GuildSettings, GuildContext, \
+    build_guild_context, load_guild_settings
+from pururu.clock import VirtualClock
+from pururu.domain.services.pururu_service import PururuService
+
+START = datetime(2023, 8, 10, 20)
+
+
+@patch("pururu.config.GUILDS", {})
+@patch("pururu.config.GUILD_ID", 1)
+@patch("pururu.config.PLAYERS", ["member1"])
+@patch("pururu.config.SPREADSHEET_ID", "spreadsheet_id")
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C"})
+def test_load_guild_settings_single_guild():
+    # When
+    actual = load_guild_settings()
+    # Then
+    assert_that(len(actual), equal_to(1))
+    assert_that(actual[0].guild_id, equal_to(1))
+    assert_that(actual[0].players, equal_to(["member1"]))
+    assert_that(actual[0].spreadsheet_id, equal_to("spreadsheet_id"))
+    assert_that(actual[0].player_mapping, equal_to({"member1": "C"}))
+
+
+@patch("pururu.config.GUILDS", {"1": {"players": ["member1"], "spreadsheet_id": "sheet1"},
+                                "2": {"players": ["member2"], "spreadsheet_id": "sheet2",
+                                      "player_mapping": {"member2": "C"}, "status_channel_id": 42}})
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C"})
+@patch("pururu.config.STATUS_CHANNEL_ID", 0)
+def test_load_guild_settings_guilds():
+    # When
+    actual = load_guild_settings()
+    # Then
+    assert_that([settings.guild_id for settings in actual], equal_to([1, 2]))
+    assert_that([settings.spreadsheet_id for settings in actual], equal_to(["sheet1", "sheet2"]))
+    assert_that([settings.player_mapping for settings in actual], equal_to([{"member1": "C"}, {"member2": "C"}]))
+    assert_that([settings.status_channel_id for settings in actual], equal_to([0, 42]))
+
+
+def test_registry_get():
+    # Given
+    registry = GuildRegistry()
+    guild = registry.register(GuildContext(GuildSettings(1, ["member1"], "sheet1", {}), Mock()))
+    # When-Then
+    assert_that(registry.get(1), equal_to(guild))
+    assert_that(registry.get(2), none())
+    assert_that(registry.get(None), none())
+    assert_that(registry.ids(), equal_to([1]))
+    assert_that(guild.roster, equal_to(frozenset(["member1"])))
+    assert_that(guild.voice_handler, equal_to(guild.pururu_handler))
+
+
+@patch("pururu.config.PLAYERS", [])
+@patch("pururu.config.VOICE_FLAP_GRACE", 0)
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 2)
+def test_guilds_sessions_isolated():
+    # Given
+    virtual_clock = VirtualClock(START)
+    registry = GuildRegistry()
+    for guild_id, players in [(1, ["member1", "member2"]), (2, ["member3", "member4"])]:
+        settings = GuildSettings(guild_id, players, f"sheet{guild_id}", {})
+        registry.register(build_guild_context(settings, PururuService(Mock(), virtual_clock, players),
+                                              virtual_clock))
+    # When
+    for member in ["member1", "member2", "member3"]:
+        for guild in registry:
+            guild.voice_handler.handle_voice_state_update_dc_event(member, None, "General")
+    virtual_clock.advance(60)
+    # Then
+    assert_that(registry.get(1).voice_handler, instance_of(FlapDamper))
+    assert_that(registry.get(1).session_status, none())
+    assert_that(sorted(registry.get(1).pururu_handler.domain_service.sessions.get("General").get_players()),
+                equal_to(["member1", "member2"]))
+    assert_that(registry.get(2).pururu_handler.domain_service.sessions.get("General").get_players(), equal_to(["member3"]))
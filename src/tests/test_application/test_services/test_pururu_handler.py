@@ -1,17 +1,25 @@
-from datetime import datetime
-from unittest.mock import patch
+from datetime import datetime, date
+from unittest.mock import patch, Mock
 
+import pytest
 from freezegun import freeze_time
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, equal_to, calling, raises, none
 
 from pururu.application.events.entities import EventType, MemberJoinedChannelEvent, MemberLeftChannelEvent, \
-    NewGameIntentEvent, GameStartedEvent, EndGameIntentEvent, GameEndedEvent
+    NewGameIntentEvent, GameStartedEvent, EndGameIntentEvent, GameEndedEvent, MemberMovedChannelEvent, GameDiscardedEvent
 from pururu.application.services.pururu_handler import PururuHandler
-from pururu.domain.entities import SessionInfo, Attendance
-from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition
+from pururu.clock import VirtualClock
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import SessionInfo, Attendance, AttendanceEventType, StatsFilter, MemberStats, \
+    Leaderboard, MemberAttendance
+from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition, \
+    InvalidStatsFilter
+from pururu.domain.services.pururu_service import PururuService
+from pururu.tracing import Tracer
 from tests.test_application.test_events.test_entities import member_joined_channel_event, member_left_channel_event, \
-    new_game_intent_event, end_game_intent_event, game_started_event, game_ended_event
+    member_moved_channel_event, new_game_intent_event, end_game_intent_event, game_started_event, game_ended_event
 from tests.test_domain.test_entities import session_info, attendance
+from tests.test_tracing import MemoryExporter
 
 
 @patch("pururu.domain.services.pururu_service.PururuService")
@@ -20,6 +28,18 @@ def set_up(event_system_mock, pururu_service_mock) -> PururuHandler:
     return PururuHandler(pururu_service_mock, event_system_mock)
 
 
+@patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
+def test_handle_voice_state_update_dc_event_guild_players():
+    # Given
+    handler = PururuHandler(Mock(), Mock(), players=["member4"])
+    # When
+    handler.handle_voice_state_update_dc_event("member1", None, "channel")
+    handler.handle_voice_state_update_dc_event("member4", None, "channel")
+    # Then
+    assert_that(handler.event_system.emit_event.call_args.args[0].member, equal_to("member4"))
+    handler.event_system.emit_event.assert_called_once()
+
+
 @patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
 def test_handle_voice_state_update_dc_event_player_joined():
     # Given
@@ -36,6 +56,17 @@ def test_handle_voice_state_update_dc_event_player_joined():
     handler.event_system.emit_event_with_delay.assert_not_called()
 
 
+@patch("pururu.config.PLAYERS", ["member1"])
+def test_bot_event_stamped_with_the_handler_clock():
+    # Given
+    handler = PururuHandler(Mock(), Mock(), VirtualClock(datetime(2024, 1, 1, 20)))
+    # When
+    handler.handle_voice_state_update_dc_event("member1", None, "channel")
+    # Then
+    bot_event = handler.domain_service.register_bot_event.call_args.args[0]
+    assert_that(bot_event.date, equal_to("2024-01-01 20:00:00"))
+
+
 @patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
 def test_handle_voice_state_update_dc_event_player_left_ok():
     # Given
@@ -57,7 +88,21 @@ def test_handle_voice_state_update_dc_event_player_changed_between_channels():
     # When
     handler.handle_voice_state_update_dc_event("member1", "before_channel", "after_channel")
     # Then
-    handler.event_system.assert_not_called()
+    event = handler.event_system.emit_event.call_args[0][0]
+    assert_that(event.event_type, equal_to(EventType.MEMBER_MOVED_CHANNEL))
+    assert_that(type(event), equal_to(MemberMovedChannelEvent))
+    assert_that(event.from_channel, equal_to("before_channel"))
+    assert_that(event.to_channel, equal_to("after_channel"))
+
+
+@patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
+def test_handle_voice_state_update_dc_event_same_channel():
+    # Given
+    handler = set_up()
+    # When
+    handler.handle_voice_state_update_dc_event("member1", "channel", "channel")
+    # Then
+    handler.event_system.emit_event.assert_not_called()
 
 
 @patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
@@ -82,11 +127,13 @@ def test_handle_member_joined_channel_event_start_new_game_true(session_info: Se
     handler.handle_member_joined_channel_event(member_joined_channel_event)
     # Then
     handler.domain_service.add_player.assert_called_once_with(member_joined_channel_event.member,
-                                                              member_joined_channel_event.joined_at)
-    handler.domain_service.get_session_info.assert_called_once()
+                                                              member_joined_channel_event.joined_at,
+                                                              member_joined_channel_event.channel)
+    handler.domain_service.get_session_info.assert_called_once_with(member_joined_channel_event.channel)
     handler.event_system.emit_event_with_delay.assert_called_once()
     event, time = handler.event_system.emit_event_with_delay.call_args[0]
     assert_that(event.event_type, equal_to(EventType.NEW_GAME_INTENT))
+    assert_that(event.channel, equal_to(member_joined_channel_event.channel))
     assert_that(event.players, equal_to(session_info.players))
     assert_that(event.start_time, equal_to(datetime(2023, 8, 10, 10)))
     assert_that(time, equal_to(100))
@@ -101,10 +148,41 @@ def test_handle_member_joined_channel_event_start_new_game_false(session_info: S
     handler.handle_member_joined_channel_event(member_joined_channel_event)
     # Then
     handler.domain_service.add_player.assert_called_once_with(member_joined_channel_event.member,
-                                                              member_joined_channel_event.joined_at)
+                                                              member_joined_channel_event.joined_at,
+                                                              member_joined_channel_event.channel)
     handler.event_system.assert_not_called()
 
 
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_handle_member_moved_channel_event(member_moved_channel_event: MemberMovedChannelEvent):
+    # Given
+    handler = set_up()
+    handler.domain_service.add_player.return_value = False
+    handler.domain_service.remove_player.return_value = False
+    # When
+    handler.handle_member_moved_channel_event(member_moved_channel_event)
+    # Then
+    handler.domain_service.remove_player.assert_called_once_with(member_moved_channel_event.member,
+                                                                 member_moved_channel_event.moved_at,
+                                                                 member_moved_channel_event.from_channel)
+    handler.domain_service.add_player.assert_called_once_with(member_moved_channel_event.member,
+                                                              member_moved_channel_event.moved_at,
+                                                              member_moved_channel_event.to_channel)
+    handler.event_system.emit_event.assert_not_called()
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", False)
+def test_handle_member_moved_channel_event_single_session(member_moved_channel_event: MemberMovedChannelEvent):
+    # Given
+    handler = set_up()
+    # When
+    handler.handle_member_moved_channel_event(member_moved_channel_event)
+    # Then
+    handler.domain_service.add_player.assert_not_called()
+    handler.domain_service.remove_player.assert_not_called()
+    handler.event_system.emit_event.assert_not_called()
+
+
 @patch("pururu.config.ATTENDANCE_CHECK_DELAY", 100)
 @freeze_time("2023-08-10 10:00:00")
 def test_handle_member_left_channel_event_end_game_true(session_info: SessionInfo,
@@ -117,11 +195,13 @@ def test_handle_member_left_channel_event_end_game_true(session_info: SessionInf
     handler.handle_member_left_channel_event(member_left_channel_event)
     # Then
     handler.domain_service.remove_player.assert_called_once_with(member_left_channel_event.member,
-                                                                 member_left_channel_event.left_at)
-    handler.domain_service.get_session_info.assert_called_once()
+                                                                 member_left_channel_event.left_at,
+                                                                 member_left_channel_event.channel)
+    handler.domain_service.get_session_info.assert_called_once_with(member_left_channel_event.channel)
     handler.event_system.emit_event_with_delay.assert_called_once()
     event, time = handler.event_system.emit_event_with_delay.call_args[0]
     assert_that(event.event_type, equal_to(EventType.END_GAME_INTENT))
+    assert_that(event.channel, equal_to(member_left_channel_event.channel))
     assert_that(event.players, equal_to(session_info.players))
     assert_that(event.end_time, equal_to(datetime(2023, 8, 10, 10)))
     assert_that(time, equal_to(100))
@@ -136,7 +216,8 @@ def test_handle_member_left_channel_event_end_game_false(session_info: SessionIn
     handler.handle_member_left_channel_event(member_left_channel_event)
     # Then
     handler.domain_service.remove_player.assert_called_once_with(member_left_channel_event.member,
-                                                                 member_left_channel_event.left_at)
+                                                                 member_left_channel_event.left_at,
+                                                                 member_left_channel_event.channel)
     handler.event_system.assert_not_called()
 
 
@@ -147,7 +228,8 @@ def test_handle_new_game_intent_event_ok(session_info: SessionInfo, new_game_int
     # When
     handler.handle_new_game_intent_event(new_game_intent_event)
     # Then
-    handler.domain_service.start_new_game.assert_called_once_with(new_game_intent_event.start_time)
+    handler.domain_service.start_new_game.assert_called_once_with(new_game_intent_event.start_time,
+                                                                  new_game_intent_event.channel)
     handler.event_system.emit_event.assert_called_once()
     event = handler.event_system.emit_event.call_args[0][0]
     assert_that(event.event_type, equal_to(EventType.GAME_STARTED))
@@ -164,7 +246,8 @@ def test_handle_new_game_intent_event_cannot_start_new_game(session_info: Sessio
     # When
     handler.handle_new_game_intent_event(new_game_intent_event)
     # Then
-    handler.domain_service.start_new_game.assert_called_once_with(new_game_intent_event.start_time)
+    handler.domain_service.start_new_game.assert_called_once_with(new_game_intent_event.start_time,
+                                                                  new_game_intent_event.channel)
     handler.event_system.assert_not_called()
 
 
@@ -175,7 +258,7 @@ def test_handle_end_game_intent_event_ok(attendance: Attendance, end_game_intent
     # When
     handler.handle_end_game_intent_event(end_game_intent_event)
     # Then
-    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time)
+    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time, end_game_intent_event.channel)
     handler.event_system.emit_event.assert_called_once()
     event = handler.event_system.emit_event.call_args[0][0]
     assert_that(event.event_type, equal_to(EventType.GAME_ENDED))
@@ -189,7 +272,7 @@ def test_handle_end_game_intent_event_cannot_end_game(end_game_intent_event: End
     # When
     handler.handle_end_game_intent_event(end_game_intent_event)
     # Then
-    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time)
+    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time, end_game_intent_event.channel)
     handler.event_system.assert_not_called()
 
 
@@ -200,8 +283,11 @@ def test_handle_end_game_intent_event_game_ended_without_precondition(end_game_i
     # When
     handler.handle_end_game_intent_event(end_game_intent_event)
     # Then
-    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time)
-    handler.event_system.assert_not_called()
+    handler.domain_service.end_game.assert_called_once_with(end_game_intent_event.end_time, end_game_intent_event.channel)
+    event = handler.event_system.emit_event.call_args[0][0]
+    assert_that(type(event), equal_to(GameDiscardedEvent))
+    assert_that(event.game_id, equal_to(end_game_intent_event.game_id))
+    assert_that(event.end_time, equal_to(end_game_intent_event.end_time))
 
 
 def test_handle_game_started_event_ok(game_started_event: GameStartedEvent):
@@ -216,14 +302,53 @@ def test_handle_game_started_event_ok(game_started_event: GameStartedEvent):
 
 def test_handle_game_ended_event_ok(game_ended_event: GameEndedEvent):
     # Given
-    handler = set_up()
+    virtual_clock = VirtualClock(datetime(2024, 1, 1))
+    handler = PururuHandler(Mock(), Mock(), virtual_clock)
     # When
     handler.handle_game_ended_event(game_ended_event)
     # Then
-    handler.domain_service.assert_not_called()
+    handler.domain_service.refresh_leaderboard.assert_not_called()
+    # When
+    virtual_clock.advance(0)
+    # Then
+    handler.domain_service.refresh_leaderboard.assert_called_once()
     handler.event_system.assert_not_called()
 
 
+def test_precompute_stats_after_game_ended():
+    # Given
+    virtual_clock = VirtualClock(datetime(2024, 1, 1))
+    handler = PururuHandler(Mock(), Mock(), virtual_clock)
+    handler.domain_service.refresh_leaderboard.return_value = Leaderboard(
+        [MemberStats("member1", 3, 0, 0, 3, 5), MemberStats("member2", 3, 1, 0, 2, 5),
+         MemberStats("member3", 3, 1, 0, 2, 5)], 10)
+    game_attendance = Attendance(2, [MemberAttendance("member1", True, False, ""),
+                                     MemberAttendance("member2", False, False, "")],
+                                 "2024-01-01", AttendanceEventType.OFFICIAL_GAME)
+    # When
+    handler.handle_game_ended_event(GameEndedEvent(game_attendance))
+    virtual_clock.advance(0)
+    member1, member2 = handler.render_player_stats("member1"), handler.render_player_stats("member2")
+    # Then
+    handler.domain_service.calculate_player_stats.assert_not_called()
+    assert_that(member1, equal_to(MemberStats("member1", 3, 0, 0, 3, 5).as_message()))
+    assert_that(member2, equal_to(MemberStats("member2", 3, 1, 0, 2, 5).as_message()))
+    assert_that(handler.stats_cache.players(), equal_to({"member1", "member2"}))
+
+
+def test_precompute_stats_error():
+    # Given
+    handler = set_up()
+    handler.logger = Mock()
+    handler.domain_service.refresh_leaderboard.side_effect = Exception("Sheets error")
+    # When
+    handler.precompute_stats(Attendance(2, [MemberAttendance("member1", True, False, "")], "2024-01-01",
+                                        AttendanceEventType.OFFICIAL_GAME))
+    # Then
+    handler.logger.error.assert_called_once()
+    assert_that(len(handler.stats_cache), equal_to(0))
+
+
 def test_retrieve_player_stats_ok():
     # Given
     handler = set_up()
@@ -231,6 +356,182 @@ def test_retrieve_player_stats_ok():
     # When
     actual = handler.retrieve_player_stats("player")
     # Then
-    handler.domain_service.calculate_player_stats.assert_called_once_with("player")
+    handler.domain_service.calculate_player_stats.assert_called_once_with("player", None)
     handler.event_system.assert_not_called()
     assert_that(actual, equal_to("stats"))
+
+
+def test_retrieve_player_stats_filtered():
+    # Given
+    handler = set_up()
+    stats_filter = StatsFilter(start=date(2024, 1, 1))
+    handler.domain_service.calculate_player_stats.return_value = "stats"
+    # When
+    actual = handler.retrieve_player_stats("player", stats_filter)
+    # Then
+    handler.domain_service.calculate_player_stats.assert_called_once_with("player", stats_filter)
+    assert_that(actual, equal_to("stats"))
+
+
+def test_render_player_stats_cached():
+    # Given
+    handler = set_up()
+    handler.domain_service.calculate_player_stats.return_value = MemberStats("player", 3, 1, 0, 2, 5)
+    stats_filter = StatsFilter(start=date(2024, 1, 1))
+    # When
+    first = handler.render_player_stats("player")
+    second = handler.render_player_stats("player")
+    handler.render_player_stats("player", stats_filter)
+    handler.render_player_stats("player", StatsFilter(start=date(2024, 1, 1)))
+    # Then
+    assert_that(first, equal_to(MemberStats("player", 3, 1, 0, 2, 5).as_message()))
+    assert_that(second, equal_to(first))
+    assert_that(handler.domain_service.calculate_player_stats.call_count, equal_to(2))
+
+
+def test_render_player_stats_invalidated_by_game_ended(game_ended_event: GameEndedEvent):
+    # Given
+    handler = set_up()
+    handler.domain_service.calculate_player_stats.return_value = MemberStats("player", 3, 1, 0, 2, 5)
+    handler.render_player_stats("player")
+    # When
+    handler.handle_game_ended_event(game_ended_event)
+    handler.render_player_stats("player")
+    # Then
+    assert_that(handler.domain_service.calculate_player_stats.call_count, equal_to(2))
+
+
+@patch("pururu.config.STATS_CACHE_TTL", 300)
+def test_render_player_stats_invalidated_by_sheet_changes():
+    # Given
+    virtual_clock = VirtualClock(datetime(2024, 1, 1))
+    handler = PururuHandler(Mock(), Mock(), virtual_clock)
+    handler.domain_service.calculate_player_stats.side_effect = \
+        lambda player, stats_filter: MemberStats(player, 3, 1, 0, 2, 5)
+    # No leaderboard was computed before the check, the cached stats are the snapshot it compares with
+    handler.domain_service.refresh_leaderboard.return_value = Leaderboard(
+        [MemberStats("player1", 3, 1, 0, 2, 5), MemberStats("player2", 3, 1, 0, 2, 8)], 10)
+    handler.render_player_stats("player1")
+    handler.render_player_stats("player2")
+    # When
+    virtual_clock.advance(299)
+    handler.render_player_stats("player1")
+    # Then
+    handler.domain_service.refresh_leaderboard.assert_not_called()
+    # When
+    virtual_clock.advance(1)
+    handler.render_player_stats("player1")
+    handler.render_player_stats("player2")
+    # Then
+    handler.domain_service.refresh_leaderboard.assert_called_once_with(fresh=True)
+    handler.domain_service.get_leaderboard.assert_not_called()
+    assert_that([call.args[0] for call in handler.domain_service.calculate_player_stats.call_args_list],
+                equal_to(["player1", "player2", "player2"]))
+
+
+@patch("pururu.config.STATS_CACHE_TTL", 300)
+def test_render_player_stats_filtered_invalidated_by_sheet_check():
+    # Given
+    virtual_clock = VirtualClock(datetime(2024, 1, 1))
+    handler = PururuHandler(Mock(), Mock(), virtual_clock)
+    stats_filter = StatsFilter(start=date(2024, 1, 1))
+    handler.domain_service.calculate_player_stats.return_value = MemberStats("player1", 3, 1, 0, 2, 5)
+    handler.domain_service.refresh_leaderboard.return_value = Leaderboard([MemberStats("player1", 3, 1, 0, 2, 5)], 10)
+    handler.render_player_stats("player1")
+    handler.render_player_stats("player1", stats_filter)
+    # When: only the date of a game changed, the lifetime stats are the same
+    virtual_clock.advance(300)
+    handler.render_player_stats("player1")
+    handler.render_player_stats("player1", stats_filter)
+    # Then
+    assert_that([call.args for call in handler.domain_service.calculate_player_stats.call_args_list],
+                equal_to([("player1", None), ("player1", stats_filter), ("player1", stats_filter)]))
+
+
+@patch("pururu.config.PLAYERS", ["member1", "member2"])
+def test_precomputed_stats_equal_cold_stats():
+    # Given
+    attendances = [Attendance(1, [MemberAttendance("member1", True, False, ""),
+                                  MemberAttendance("member2", False, False, "")],
+                              "2024-01-01", AttendanceEventType.OFFICIAL_GAME)]
+    database = Mock()
+    database.get_attendance_matrix.side_effect = lambda: AttendanceMatrix.of(attendances)
+    database.get_all_player_coins.return_value = {"member1": 0}  # a non numeric coins cell
+    database.get_player_coins.return_value = "n/a"
+    virtual_clock = VirtualClock(datetime(2024, 1, 1))
+    precomputed = PururuHandler(PururuService(database, virtual_clock), Mock(), virtual_clock)
+    cold = PururuHandler(PururuService(database, virtual_clock), Mock(), virtual_clock)
+    # When
+    precomputed.handle_game_ended_event(GameEndedEvent(attendances[0]))
+    virtual_clock.advance(0)
+    # Then
+    assert_that(precomputed.stats_cache.players(), equal_to({"member1", "member2"}))
+    for player in ["member1", "member2"]:
+        assert_that(precomputed.render_player_stats(player), equal_to(cold.render_player_stats(player)))
+
+
+def test_build_stats_filter_no_options():
+    assert_that(PururuHandler.build_stats_filter(), none())
+
+
+@patch("pururu.config.SEASONS", {"2024": ["2024-01-01", "2024-12-31"]})
+@pytest.mark.parametrize("options, start, end, event_type", [
+    ({"start_date": "2024-03-01"}, date(2024, 3, 1), None, None),
+    ({"end_date": "2024-03-01", "event_type": "OFFICIAL_MEETING"}, None, date(2024, 3, 1),
+     AttendanceEventType.OFFICIAL_MEETING),
+    ({"season": "2024"}, date(2024, 1, 1), date(2024, 12, 31), None),
+    ({"season": "2024", "start_date": "2023-06-01", "end_date": "2024-06-30"}, date(2024, 1, 1),
+     date(2024, 6, 30), None),
+])
+def test_build_stats_filter_ok(options: dict, start: date, end: date, event_type: AttendanceEventType):
+    # When
+    actual = PururuHandler.build_stats_filter(**options)
+    # Then
+    assert_that(actual.start, equal_to(start))
+    assert_that(actual.end, equal_to(end))
+    assert_that(actual.event_type, equal_to(event_type))
+
+
+@patch("pururu.config.SEASONS", {"2024": ["2024-01-01", "2024-12-31"]})
+@pytest.mark.parametrize("options", [
+    {"start_date": "01/03/2024"},
+    {"season": "1999"},
+    {"start_date": "2024-03-01", "end_date": "2024-02-01"},
+    {"event_type": "RANDOM"},
+])
+def test_build_stats_filter_invalid(options: dict):
+    assert_that(calling(PururuHandler.build_stats_filter).with_args(**options), raises(InvalidStatsFilter))
+
+
+def test_retrieve_leaderboard_ok():
+    # Given
+    handler = set_up()
+    handler.domain_service.get_leaderboard.return_value = "leaderboard"
+    # When
+    actual = handler.retrieve_leaderboard()
+    # Then
+    handler.domain_service.get_leaderboard.assert_called_once()
+    assert_that(actual, equal_to("leaderboard"))
+
+
+def test_warm_up_ok():
+    # Given
+    handler = set_up()
+    # When
+    handler.warm_up()
+    # Then
+    handler.domain_service.refresh_leaderboard.assert_called_once()
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+@patch("pururu.config.PLAYERS", ["member1"])
+def test_handle_voice_state_update_dc_event_propagates_trace():
+    # Given
+    handler = set_up()
+    tracer = Tracer(MemoryExporter())
+    # When
+    with tracer.span("discord:voice_state_update") as span:
+        handler.handle_voice_state_update_dc_event("member1", None, "channel")
+    # Then
+    event = handler.event_system.emit_event.call_args[0][0]
+    assert_that(event.trace, equal_to(span.context()))
@@ -0,0 +1,212 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock, patch
+
+import pytest
+from hamcrest import assert_that, equal_to, contains_string
+
+from pururu.application.events.entities import GameStartedEvent, GameEndedEvent, MemberJoinedChannelEvent, \
+    MemberLeftChannelEvent, GameDiscardedEvent
+from pururu.application.events.event_system import EventSystem
+from pururu.application.services.session_status import SessionStatus, DELIVERY_ATTEMPTS
+from pururu.clock import VirtualClock
+from pururu.domain.entities import Attendance, MemberAttendance, AttendanceEventType, Message
+
+START = datetime(2023, 8, 10, 20)
+CHANNEL_ID = 42
+
+
+def set_up(virtual_clock: VirtualClock) -> SessionStatus:
+    discord_service = AsyncMock()
+
+    async def send_message(message: Message) -> Message:
+        message.message_id = 1000
+        return message
+
+    discord_service.send_message.side_effect = send_message
+    pururu_handler = Mock()
+    pururu_handler.domain_service.discord_service = discord_service
+    session_status = SessionStatus(pururu_handler, EventSystem(virtual_clock), CHANNEL_ID, virtual_clock)
+    session_status.bind(asyncio.get_running_loop())
+    return session_status
+
+
+def discord_service(session_status: SessionStatus) -> AsyncMock:
+    return session_status.pururu_handler.domain_service.discord_service
+
+
+async def run_submitted() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+async def test_game_status_posted_and_edits_throttled():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    # When
+    session_status.on_game_started(GameStartedEvent(1, ["member1", "member2"], "General", START))
+    await run_submitted()
+    for member in ["member3", "member4", "member5"]:
+        session_status.on_member_joined_channel(MemberJoinedChannelEvent(member, "General", virtual_clock.now()))
+    session_status.on_member_joined_channel(MemberJoinedChannelEvent("member6", "Other", virtual_clock.now()))
+    virtual_clock.advance(9)
+    await run_submitted()
+    # Then
+    posted = discord_service(session_status).send_message.call_args.args[0]
+    assert_that(posted.mergeable, equal_to(False))
+    assert_that(posted.channel_id, equal_to(CHANNEL_ID))
+    assert_that(posted.content, contains_string("Jugadores (2): member1, member2"))
+    discord_service(session_status).edit_message.assert_not_called()
+    # When
+    virtual_clock.advance(1)
+    await run_submitted()
+    # Then
+    edited = discord_service(session_status).edit_message.call_args.args[0]
+    assert_that(discord_service(session_status).edit_message.call_count, equal_to(1))
+    assert_that(edited.message_id, equal_to(1000))
+    assert_that(edited.content, contains_string("Jugadores (5): member1, member2, member3, member4, member5"))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_playtime_refreshed():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.on_game_started(GameStartedEvent(1, ["member1", "member2"], "General", START))
+    await run_submitted()
+    # When
+    virtual_clock.advance(3600)
+    await run_submitted()
+    # Then
+    assert_that(discord_service(session_status).edit_message.call_count, equal_to(60))
+    assert_that(discord_service(session_status).edit_message.call_args.args[0].content,
+                contains_string("Tiempo de juego: 1h 00m"))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_finalized():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.on_game_started(GameStartedEvent(1, ["member1", "member2"], "General", START))
+    await run_submitted()
+    virtual_clock.advance(30)
+    attendance = Attendance(1, [MemberAttendance("member1", True, False, ""),
+                                MemberAttendance("member2", False, False, "")], "", AttendanceEventType.UNKNOWN)
+    # When
+    session_status.on_member_left_channel(MemberLeftChannelEvent("member2", "General", virtual_clock.now()))
+    session_status.on_game_ended(GameEndedEvent(attendance))
+    virtual_clock.run_until_idle()
+    await run_submitted()
+    # Then
+    assert_that(discord_service(session_status).edit_message.call_count, equal_to(1))
+    assert_that(discord_service(session_status).edit_message.call_args.args[0].content,
+                equal_to("Partida 1 terminada en General\nTiempo de juego: 0h 00m\nAsistencia (1): member1"))
+    assert_that(session_status.games, equal_to({}))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_discarded():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.on_game_started(GameStartedEvent(1, ["member1", "member2"], "General", START))
+    await run_submitted()
+    virtual_clock.advance(90)
+    await run_submitted()
+    # When
+    session_status.on_game_discarded(GameDiscardedEvent(1, ["member1", "member2"], virtual_clock.now(), "General"))
+    virtual_clock.run_until_idle()
+    await run_submitted()
+    # Then
+    assert_that(discord_service(session_status).edit_message.call_count, equal_to(2))
+    assert_that(discord_service(session_status).edit_message.call_args.args[0].content,
+                equal_to("Partida 1 descartada en General\nTiempo de juego: 0h 01m\n"
+                         "Asistencia insuficiente, no se ha registrado"))
+    assert_that(session_status.games, equal_to({}))
+    assert_that(virtual_clock.pending(), equal_to(0))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_of_a_reused_game_id():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.on_game_started(GameStartedEvent(1, ["member1"], "General", START))
+    await run_submitted()
+    virtual_clock.advance(30)
+    # When
+    session_status.on_game_started(GameStartedEvent(1, ["member2"], "General", virtual_clock.now()))
+    await run_submitted()
+    virtual_clock.advance(10)
+    await run_submitted()
+    # Then
+    edits = [edit.args[0].content for edit in discord_service(session_status).edit_message.call_args_list]
+    assert_that(edits, equal_to(["Partida 1 descartada en General\nTiempo de juego: 0h 00m\n"
+                                 "Asistencia insuficiente, no se ha registrado"]))
+    assert_that(session_status.games[1].players, equal_to({"member2"}))
+    assert_that(virtual_clock.pending(), equal_to(1))
+
+
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+def test_game_status_skipped_before_discord_is_ready():
+    # Given
+    virtual_clock = VirtualClock(START)
+    pururu_handler = Mock()
+    session_status = SessionStatus(pururu_handler, EventSystem(virtual_clock), CHANNEL_ID, virtual_clock)
+    session_status.logger = Mock()
+    # When
+    session_status.on_game_started(GameStartedEvent(1, ["member1"], "General", START))
+    # Then
+    session_status.logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_undelivered_given_up():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.logger = Mock()
+    discord_service(session_status).send_message.side_effect = None  # queued but never delivered
+    session_status.on_game_started(GameStartedEvent(1, ["member1"], "General", START))
+    await run_submitted()
+    # When
+    virtual_clock.advance(60 + 10 * DELIVERY_ATTEMPTS)
+    # Then
+    assert_that(session_status.games, equal_to({}))
+    assert_that(virtual_clock.pending(), equal_to(0))
+    discord_service(session_status).edit_message.assert_not_called()
+    session_status.logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.STATUS_EDIT_INTERVAL", 10)
+@patch("pururu.config.STATUS_REFRESH_INTERVAL", 60)
+async def test_game_status_failed_delivery_given_up():
+    # Given
+    virtual_clock = VirtualClock(START)
+    session_status = set_up(virtual_clock)
+    session_status.logger = Mock()
+    discord_service(session_status).send_message.side_effect = ValueError("missing permissions")
+    session_status.on_game_started(GameStartedEvent(1, ["member1"], "General", START))
+    await run_submitted()
+    # When
+    virtual_clock.advance(60)
+    # Then
+    assert_that(session_status.games, equal_to({}))
+    assert_that(virtual_clock.pending(), equal_to(0))
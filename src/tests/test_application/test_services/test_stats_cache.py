@@ -0,0 +1,74 @@
+from datetime import date
+
+from hamcrest import assert_that, equal_to, none
+
+from pururu.application.services.stats_cache import StatsCache, STATS_CACHE
+from pururu.domain.entities import StatsFilter
+
+
+def test_get_put():
+    # Given
+    stats_cache = StatsCache(2)
+    hit, miss = STATS_CACHE.labels('hit'), STATS_CACHE.labels('miss')
+    hit_before, miss_before = hit.value, miss.value
+    # When
+    stats_cache.put("player1", None, "stats")
+    # Then
+    assert_that(stats_cache.get("player1"), equal_to("stats"))
+    assert_that(stats_cache.get("player1", StatsFilter(start=date(2024, 1, 1))), none())
+    assert_that(hit.value - hit_before, equal_to(1))
+    assert_that(miss.value - miss_before, equal_to(1))
+
+
+def test_least_recently_used_evicted():
+    # Given
+    stats_cache = StatsCache(2)
+    stats_cache.put("player1", None, "stats1")
+    stats_cache.put("player2", None, "stats2")
+    stats_cache.get("player1")
+    # When
+    stats_cache.put("player3", None, "stats3")
+    # Then
+    assert_that(stats_cache.get("player2"), none())
+    assert_that(stats_cache.players(), equal_to({"player1", "player3"}))
+
+
+def test_invalidate():
+    # Given
+    stats_cache = StatsCache(10)
+    stats_cache.put("player1", None, "stats1")
+    stats_cache.put("player1", StatsFilter(start=date(2024, 1, 1)), "filtered")
+    stats_cache.put("player2", None, "stats2")
+    # When
+    stats_cache.invalidate("player1")
+    # Then
+    assert_that(stats_cache.players(), equal_to({"player2"}))
+    # When
+    stats_cache.invalidate()
+    # Then
+    assert_that(len(stats_cache), equal_to(0))
+
+
+def test_invalidate_changed():
+    # Given
+    stats_cache = StatsCache(10)
+    stats_cache.put("player1", None, "stats1")
+    stats_cache.put("player2", None, "stats2")
+    stats_cache.put("player3", None, "stats3")
+    stats_cache.put("player3", StatsFilter(start=date(2024, 1, 1)), "filtered")
+    # When
+    actual = stats_cache.invalidate_changed({"player1": "stats1", "player2": "edited"})
+    # Then
+    assert_that(actual, equal_to(["player2", "player3"]))
+    assert_that(stats_cache.get("player1"), equal_to("stats1"))
+    assert_that(stats_cache.get("player3", StatsFilter(start=date(2024, 1, 1))), equal_to("filtered"))
+    assert_that(len(stats_cache), equal_to(2))
+
+
+def test_disabled():
+    # Given
+    stats_cache = StatsCache(0)
+    # When
+    stats_cache.put("player1", None, "stats1")
+    # Then
+    assert_that(stats_cache.get("player1"), none())
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, equal_to, none, not_none
+
+import pururu.clock as clock
+from pururu.application.events.entities import EventType, GameStartedEvent
+from pururu.application.events.event_system import EventSystem
+from pururu.application.events.listeners import EventListeners
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.clock import VirtualClock
+from pururu.domain.entities import Attendance, AttendanceEventType
+from pururu.domain.services.pururu_service import PururuService
+
+START = datetime(2023, 8, 10, 20)
+
+
+def set_up() -> tuple[VirtualClock, PururuHandler, Mock]:
+    virtual_clock = VirtualClock(START)
+    database = Mock()
+    database.get_last_attendance.return_value = Attendance(1, [], "", AttendanceEventType.OFFICIAL_GAME)
+    event_system = EventSystem(virtual_clock)
+    service = PururuService(database, virtual_clock)
+    handler = PururuHandler(service, event_system, virtual_clock)
+    EventListeners(event_system, handler)
+    return virtual_clock, handler, database
+
+
+def test_virtual_clock_now():
+    # Given
+    virtual_clock = VirtualClock(START)
+    # When
+    virtual_clock.advance(90)
+    # Then
+    assert_that(virtual_clock.now(), equal_to(START + timedelta(seconds=90)))
+    assert_that(virtual_clock.time(), equal_to(START.timestamp() + 90))
+
+
+def test_virtual_clock_runs_due_calls_in_order():
+    # Given
+    virtual_clock = VirtualClock(START)
+    calls = []
+    virtual_clock.call_later(20, lambda: calls.append(("second", virtual_clock.now())))
+    virtual_clock.call_later(10, lambda: calls.append(("first", virtual_clock.now())))
+    virtual_clock.call_later(60, lambda: calls.append(("late", virtual_clock.now())))
+    # When
+    actual = virtual_clock.advance(30)
+    # Then
+    assert_that(actual, equal_to(2))
+    assert_that(calls, equal_to([("first", START + timedelta(seconds=10)),
+                                 ("second", START + timedelta(seconds=20))]))
+    assert_that(virtual_clock.now(), equal_to(START + timedelta(seconds=30)))
+    assert_that(virtual_clock.pending(), equal_to(1))
+
+
+def test_virtual_clock_runs_calls_scheduled_by_calls():
+    # Given
+    virtual_clock = VirtualClock(START)
+    calls = []
+    virtual_clock.call_later(10, lambda: virtual_clock.call_later(5, lambda: calls.append(virtual_clock.now())))
+    # When
+    virtual_clock.run_until_idle()
+    # Then
+    assert_that(calls, equal_to([START + timedelta(seconds=15)]))
+    assert_that(virtual_clock.pending(), equal_to(0))
+    assert_that(virtual_clock.now(), equal_to(START + timedelta(seconds=15)))
+
+
+def test_virtual_clock_cancel():
+    # Given
+    virtual_clock = VirtualClock(START)
+    calls = []
+    handle = virtual_clock.call_later(10, lambda: calls.append(1))
+    # When
+    handle.cancel()
+    actual = virtual_clock.advance(60)
+    # Then
+    assert_that(actual, equal_to(0))
+    assert_that(calls, equal_to([]))
+
+
+def test_set_clock():
+    # Given
+    virtual_clock = VirtualClock(START)
+    previous = clock.get_clock()
+    # When
+    clock.set_clock(virtual_clock)
+    try:
+        actual = EventSystem().clock
+    finally:
+        clock.set_clock(previous)
+    # Then
+    assert_that(actual, equal_to(virtual_clock))
+
+
+@patch("pururu.config.PLAYERS", ["member1", "member2", "member3"])
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 3)
+@patch("pururu.config.MIN_ATTENDANCE_TIME", 1800)
+@patch("pururu.config.ATTENDANCE_CHECK_DELAY", 120)
+@patch("pururu.config.EVENT_CONCURRENCY_TIME", 20)
+@patch("pururu.config.EVENT_DELAY_TIME", 20)
+def test_virtual_game_session():
+    # Given
+    virtual_clock, handler, database = set_up()
+    # When
+    for member in ["member1", "member2", "member3"]:
+        handler.handle_voice_state_update_dc_event(member, None, "General")
+    virtual_clock.advance(300)
+    started = handler.domain_service.sessions.get("General").game_id
+    virtual_clock.advance(3 * 3600)
+    for member in ["member1", "member2", "member3"]:
+        handler.handle_voice_state_update_dc_event(member, "General", None)
+    virtual_clock.run_until_idle()
+    # Then
+    assert_that(started, equal_to(2))
+    assert_that(len(handler.domain_service.sessions), equal_to(0))
+    attendance = database.upsert_attendance.call_args.args[0]
+    assert_that(attendance.game_id, equal_to(2))
+    assert_that([member.attendance for member in attendance.members], equal_to([True, True, True]))
+    clocking = database.upsert_clocking.call_args.args[0]
+    assert_that(clocking, not_none())
+    assert_that(all(playtime >= 3 * 3600 for playtime in clocking.playtimes), equal_to(True))
+
+
+@patch("pururu.config.EVENT_CONCURRENCY_TIME", 20)
+@patch("pururu.config.EVENT_DELAY_TIME", 20)
+def test_virtual_concurrent_events_drain():
+    # Given
+    virtual_clock = VirtualClock(START)
+    event_system = EventSystem(virtual_clock)
+    event_system.create_event(EventType.GAME_STARTED)
+    listener = Mock()
+    event_system.register_listener(EventType.GAME_STARTED, listener)
+    events = [GameStartedEvent(game_id, ["member1"]) for game_id in range(3)]
+    # When
+    for event in events:
+        event_system.emit_event(event)
+    actual = virtual_clock.advance(60)
+    # Then
+    assert_that(actual, equal_to(3))
+    assert_that([call.args[0] for call in listener.call_args_list], equal_to(events))
+    assert_that(virtual_clock.pending(), equal_to(0))
+
+
+@patch("pururu.config.PLAYERS", ["member1", "member2", "member3", "member4"])
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 2)
+@patch("pururu.config.MIN_ATTENDANCE_TIME", 1800)
+@patch("pururu.config.ATTENDANCE_CHECK_DELAY", 120)
+@patch("pururu.config.EVENT_CONCURRENCY_TIME", 20)
+@patch("pururu.config.EVENT_DELAY_TIME", 20)
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_virtual_concurrent_channel_sessions():
+    # Given
+    virtual_clock, handler, database = set_up()
+    squads = {"General": ["member1", "member2"], "Squad 2": ["member3", "member4"]}
+    # When
+    for channel, members in squads.items():
+        for member in members:
+            handler.handle_voice_state_update_dc_event(member, None, channel)
+    virtual_clock.advance(300)
+    started = {channel: handler.domain_service.get_session_info(channel).game_id for channel in squads}
+    virtual_clock.advance(2 * 3600)
+    for channel, members in squads.items():
+        for member in members:
+            handler.handle_voice_state_update_dc_event(member, channel, None)
+    virtual_clock.run_until_idle()
+    # Then
+    assert_that(sorted(started.values()), equal_to([2, 3]))
+    attendances = [upsert.args[0] for upsert in database.upsert_attendance.call_args_list]
+    assert_that(sorted(attendance.game_id for attendance in attendances), equal_to([2, 3]))
+    for attendance in attendances:
+        channel = next(channel for channel, game_id in started.items() if game_id == attendance.game_id)
+        assert_that([member.member for member in attendance.members if member.attendance], equal_to(squads[channel]))
@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+from hamcrest import assert_that, equal_to
+
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, MemberAttendance, AttendanceEventType, StatsFilter
+
+
+def build_matrix() -> AttendanceMatrix:
+    return AttendanceMatrix.of([
+        Attendance(game_id=4, members=[MemberAttendance("member1", False, True, "personal")],
+                   date="2024-01-10 20:00:00", event_type=AttendanceEventType.OFFICIAL_GAME),
+        Attendance(game_id=5, members=[MemberAttendance("member1", True, True, "")],
+                   date="2024-02-10 20:00:00", event_type=AttendanceEventType.OFFICIAL_MEETING),
+        Attendance(game_id=6, members=[MemberAttendance("member1", False, False, "")],
+                   date="2024-03-10 20:00:00", event_type=AttendanceEventType.OFFICIAL_GAME),
+        # sheet order is not date order
+        Attendance(game_id=7, members=[MemberAttendance("member1", True, True, "")],
+                   date="2023-12-10", event_type=AttendanceEventType.OFFICIAL_GAME),
+        Attendance(game_id=8, members=[MemberAttendance("member1", False, False, "")],
+                   date="not a date", event_type=AttendanceEventType.OFFICIAL_GAME),
+    ])
+
+
+@pytest.mark.parametrize("stats_filter, total_events, absences, justifications, points, absent_events", [
+    (StatsFilter(), 5, 3, 1, 6, [8, 4, 6]),
+    (StatsFilter(start=date(2024, 1, 1)), 3, 2, 1, 4, [4, 6]),
+    (StatsFilter(start=date(2024, 1, 10), end=date(2024, 2, 10)), 2, 1, 1, 4, [4]),
+    (StatsFilter(end=date(2023, 12, 31)), 2, 1, 0, 2, [8]),
+    (StatsFilter(event_type=AttendanceEventType.OFFICIAL_MEETING), 1, 0, 0, 3, []),
+    (StatsFilter(start=date(2024, 1, 1), event_type=AttendanceEventType.OFFICIAL_GAME), 2, 2, 1, 1, [4, 6]),
+    (StatsFilter(start=date(2025, 1, 1)), 0, 0, 0, 0, []),
+])
+def test_member_stats_filtered(stats_filter: StatsFilter, total_events: int, absences: int, justifications: int,
+                               points: int, absent_events: list[int]):
+    # Given
+    index = build_matrix().date_index()
+    # When
+    actual = index.member_stats("member1", 3, stats_filter)
+    # Then
+    assert_that(actual.total_events, equal_to(total_events))
+    assert_that(actual.absences, equal_to(absences))
+    assert_that(actual.justifications, equal_to(justifications))
+    assert_that(actual.points, equal_to(points))
+    assert_that(actual.absent_events, equal_to(absent_events))
+    assert_that(actual.coins, equal_to(3))
+
+
+def test_member_stats_unfiltered_matches_matrix():
+    # Given
+    matrix = build_matrix()
+    # When
+    actual = matrix.date_index().member_stats("member1", 0, StatsFilter())
+    expected = matrix.member_stats("member1", 0)
+    # Then
+    assert_that(actual.total_events, equal_to(expected.total_events))
+    assert_that(actual.absences, equal_to(expected.absences))
+    assert_that(actual.justifications, equal_to(expected.justifications))
+    assert_that(actual.points, equal_to(expected.points))
+    assert_that(sorted(actual.absent_events), equal_to(sorted(expected.absent_events)))
+
+
+def test_date_index_dropped_on_upsert():
+    # Given
+    matrix = build_matrix()
+    index = matrix.date_index()
+    # When
+    matrix.upsert(Attendance(game_id=9, members=[MemberAttendance("member1", True, True, "")],
+                             date="2024-04-10", event_type=AttendanceEventType.OFFICIAL_GAME))
+    # Then
+    assert_that(matrix.date_index() is index, equal_to(False))
+    assert_that(matrix.date_index().member_stats("member1", 0, StatsFilter(start=date(2024, 4, 1))).points,
+                equal_to(2))
+
+
+def test_member_stats_unknown_player():
+    # Given
+    index = build_matrix().date_index()
+    # When
+    actual = index.member_stats("member15", 0, StatsFilter(start=date(2024, 1, 1)))
+    # Then
+    assert_that(actual.total_events, equal_to(3))
+    assert_that(actual.absences, equal_to(0))
+    assert_that(actual.absent_events, equal_to([]))
@@ -0,0 +1,73 @@
+from hamcrest import assert_that, equal_to
+
+from pururu.domain.attendance_matrix import AttendanceMatrix
+from pururu.domain.entities import Attendance, MemberAttendance, AttendanceEventType
+
+
+def build_attendances() -> list[Attendance]:
+    return [
+        Attendance(game_id=4, members=[MemberAttendance("member1", True, True, ""),
+                                       MemberAttendance("member2", False, True, "personal")],
+                   date="2023-08-10", event_type=AttendanceEventType.OFFICIAL_GAME),
+        Attendance(game_id=5, members=[MemberAttendance("member1", False, False, ""),
+                                       MemberAttendance("member2", True, True, "")],
+                   date="2023-08-11", event_type=AttendanceEventType.OFFICIAL_MEETING),
+        Attendance(game_id=6, members=[MemberAttendance("member1", True, True, ""),
+                                       MemberAttendance("member2", False, False, "")],
+                   date="2023-08-12", event_type=AttendanceEventType.UNKNOWN),
+    ]
+
+
+def test_member_stats_ok():
+    # Given
+    matrix = AttendanceMatrix.of(build_attendances())
+    # When
+    actual = matrix.member_stats("member2", 7)
+    # Then
+    assert_that(actual.total_events, equal_to(3))
+    assert_that(actual.absences, equal_to(2))
+    assert_that(actual.justifications, equal_to(1))
+    assert_that(actual.points, equal_to(4))
+    assert_that(actual.absent_events, equal_to([4, 6]))
+    assert_that(actual.coins, equal_to(7))
+
+
+def test_member_stats_unknown_player():
+    # Given
+    matrix = AttendanceMatrix.of(build_attendances())
+    # When
+    actual = matrix.member_stats("member15", 0)
+    # Then
+    assert_that(actual.total_events, equal_to(3))
+    assert_that(actual.absences, equal_to(0))
+    assert_that(actual.points, equal_to(0))
+    assert_that(actual.absent_events, equal_to([]))
+
+
+def test_upsert_overwrites_existing_game():
+    # Given
+    matrix = AttendanceMatrix.of(build_attendances())
+    # When
+    matrix.upsert(Attendance(game_id=5, members=[MemberAttendance("member1", True, True, "")],
+                             date="2023-08-11", event_type=AttendanceEventType.OFFICIAL_GAME))
+    # Then
+    member1 = matrix.member_stats("member1", 0)
+    member2 = matrix.member_stats("member2", 0)
+    assert_that(member1.total_events, equal_to(3))
+    assert_that(member1.absences, equal_to(0))
+    assert_that(member1.points, equal_to(4))
+    assert_that(member2.absences, equal_to(2))
+    assert_that(member2.points, equal_to(1))
+
+
+def test_all_members_stats_ok():
+    # Given
+    matrix = AttendanceMatrix.of(build_attendances())
+    # When
+    actual = matrix.all_members_stats({"member1": 3})
+    # Then
+    assert_that(list(actual.keys()), equal_to(["member1", "member2"]))
+    assert_that(actual["member1"].points, equal_to(2))
+    assert_that(actual["member1"].absent_events, equal_to([5]))
+    assert_that(actual["member1"].coins, equal_to(3))
+    assert_that(actual["member2"].coins, equal_to(0))
@@ -1,8 +1,10 @@
+from datetime import date
+
 import pytest
 from hamcrest import assert_that, equal_to
 
 from pururu.domain.entities import BotEvent, Attendance, MemberAttendance, Clocking, AttendanceEventType, MemberStats, \
-    Message, SessionInfo
+    Message, SessionInfo, Leaderboard, LeaderboardOrder, StatsFilter
 
 
 @pytest.fixture
@@ -122,3 +124,49 @@ def test_member_stats_as_message(member_stats: MemberStats):
 def test_attendance_event_type_of_test_cases(event: str, expected: AttendanceEventType):
     actual = AttendanceEventType.of(event)
     assert_that(actual, equal_to(expected))
+
+
+@pytest.fixture
+def leaderboard():
+    return Leaderboard([MemberStats("member1", 10, 1, 0, 12, 5),
+                        MemberStats("member2", 10, 0, 0, 20, 1),
+                        MemberStats("member3", 10, 4, 2, 8, 30)], page_size=2)
+
+
+@pytest.mark.parametrize("order, expected", [
+    (LeaderboardOrder.POINTS, ["member2", "member1", "member3"]),
+    (LeaderboardOrder.ABSENCES, ["member2", "member1", "member3"]),
+    (LeaderboardOrder.COINS, ["member3", "member1", "member2"]),
+])
+def test_leaderboard_rankings(leaderboard: Leaderboard, order: LeaderboardOrder, expected: list[str]):
+    actual = [stats.member for stats in leaderboard.rankings[order]]
+    assert_that(actual, equal_to(expected))
+
+
+def test_leaderboard_page(leaderboard: Leaderboard):
+    assert_that(leaderboard.total_pages(), equal_to(2))
+    assert_that([stats.member for stats in leaderboard.page(LeaderboardOrder.POINTS, 2)], equal_to(["member3"]))
+    assert_that([stats.member for stats in leaderboard.page(LeaderboardOrder.POINTS, 99)], equal_to(["member3"]))
+
+
+def test_leaderboard_as_message(leaderboard: Leaderboard):
+    actual = leaderboard.as_message(LeaderboardOrder.COINS, 1)
+    assert_that(actual, equal_to("Clasificación por KeroCoins (página 1/2)\n"
+                                 "1. member3: 30\n"
+                                 "2. member1: 5"))
+
+
+def test_leaderboard_empty():
+    leaderboard = Leaderboard([], page_size=10)
+    assert_that(leaderboard.total_pages(), equal_to(1))
+    assert_that(leaderboard.as_message(LeaderboardOrder.POINTS, 0), equal_to("Clasificación por Puntos (página 1/1)"))
+
+
+@pytest.mark.parametrize("stats_filter, expected", [
+    (StatsFilter(), ""),
+    (StatsFilter(start=date(2024, 1, 1)), "(desde 2024-01-01)"),
+    (StatsFilter(date(2024, 1, 1), date(2024, 6, 30), AttendanceEventType.OFFICIAL_MEETING),
+     "(desde 2024-01-01, hasta 2024-06-30, solo Quedada Oficial)"),
+])
+def test_stats_filter_as_message(stats_filter: StatsFilter, expected: str):
+    assert_that(stats_filter.as_message(), equal_to(expected))
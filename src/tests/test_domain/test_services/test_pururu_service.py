@@ -1,10 +1,13 @@
-from datetime import datetime
-from unittest.mock import patch
+import threading
+import time
+from datetime import datetime, date
+from unittest.mock import patch, Mock
 
 from hamcrest import assert_that, equal_to, calling, raises
 
+from pururu.domain.attendance_matrix import AttendanceMatrix
 from pururu.domain.entities import BotEvent, Attendance, MemberStats, AttendanceEventType, MemberAttendance, Clocking, \
-    SessionInfo
+    SessionInfo, Leaderboard, LeaderboardOrder, StatsFilter
 from pururu.domain.exceptions import CannotStartNewGame, CannotEndGame, GameEndedWithoutPrecondition
 from pururu.domain.services.pururu_service import PururuService
 from tests.test_domain.test_entities import attendance, member_stats
@@ -49,8 +52,8 @@ def test_calculate_player_stats_ok(member_stats: MemberStats):
         Attendance(game_id=3, members=[MemberAttendance(member_stats.member, True, True, "")],
                    date="2023-08-12", event_type=AttendanceEventType.OFFICIAL_GAME),
     ]
-    service.database_service.get_all_attendances.return_value = attendances
-    service.database_service.get_player_coins.return_value = member_stats.coins
+    service.database_service.get_attendance_matrix.return_value = AttendanceMatrix.of(attendances)
+    service.database_service.get_all_player_coins.return_value = {member_stats.member: member_stats.coins}
     # When
     actual = service.calculate_player_stats(member_stats.member)
     # Then
@@ -61,11 +64,105 @@ def test_calculate_player_stats_ok(member_stats: MemberStats):
     assert_that(actual.points, equal_to(member_stats.points))
     assert_that(actual.absent_events, equal_to(member_stats.absent_events))
     assert_that(actual.coins, equal_to(member_stats.coins))
-    service.database_service.get_all_attendances.assert_called_once()
-    service.database_service.get_player_coins.assert_called_once_with(member_stats.member)
+    service.database_service.get_attendance_matrix.assert_called_once()
+    service.database_service.get_all_player_coins.assert_called_once()
     service.current_session.assert_not_called()
 
 
+def test_calculate_player_stats_filtered():
+    # Given
+    service = set_up()
+    attendances = [
+        Attendance(game_id=1, members=[MemberAttendance("member1", False, True, "")],
+                   date="2023-08-10", event_type=AttendanceEventType.OFFICIAL_GAME),
+        Attendance(game_id=2, members=[MemberAttendance("member1", True, True, "")],
+                   date="2023-09-10", event_type=AttendanceEventType.OFFICIAL_MEETING),
+    ]
+    service.database_service.get_attendance_matrix.return_value = AttendanceMatrix.of(attendances)
+    service.database_service.get_all_player_coins.return_value = {"member1": 2}
+    # When
+    actual = service.calculate_player_stats("member1", StatsFilter(start=date(2023, 9, 1)))
+    # Then
+    assert_that(actual.total_events, equal_to(1))
+    assert_that(actual.absences, equal_to(0))
+    assert_that(actual.points, equal_to(3))
+    assert_that(actual.coins, equal_to(2))
+
+
+@patch("pururu.config.LEADERBOARD_PAGE_SIZE", 10)
+@patch("pururu.config.PLAYERS", ["member1", "member2"])
+def test_refresh_leaderboard_ok():
+    # Given
+    service = set_up()
+    attendances = [
+        Attendance(game_id=1, members=[MemberAttendance("member1", False, False, ""),
+                                       MemberAttendance("member2", True, True, "")],
+                   date="2023-08-10", event_type=AttendanceEventType.OFFICIAL_GAME),
+    ]
+    service.database_service.get_attendance_matrix.return_value = AttendanceMatrix.of(attendances)
+    service.database_service.get_all_player_coins.return_value = {"member1": 5}
+    # When
+    actual = service.refresh_leaderboard()
+    # Then
+    ranking = actual.rankings[LeaderboardOrder.POINTS]
+    assert_that([stats.member for stats in ranking], equal_to(["member2", "member1"]))
+    assert_that([stats.coins for stats in ranking], equal_to([0, 5]))
+    assert_that(service.leaderboard, equal_to(actual))
+    service.database_service.get_attendance_matrix.assert_called_once()
+    service.database_service.get_all_player_coins.assert_called_once()
+
+
+@patch("pururu.config.LEADERBOARD_PAGE_SIZE", 10)
+@patch("pururu.config.PLAYERS", ["member1", "member2"])
+def test_refresh_leaderboard_guild_players():
+    # Given
+    service = set_up()
+    service.guild_players = ["member3"]
+    service.database_service.get_attendance_matrix.return_value = AttendanceMatrix.of([])
+    service.database_service.get_all_player_coins.return_value = {"member1": 5, "member3": 2}
+    # When
+    actual = service.refresh_leaderboard()
+    # Then
+    assert_that([stats.member for stats in actual.rankings[LeaderboardOrder.POINTS]], equal_to(["member3"]))
+
+
+@patch("pururu.config.LEADERBOARD_PAGE_SIZE", 10)
+@patch("pururu.config.PLAYERS", ["member1"])
+def test_refresh_leaderboard_fresh():
+    # Given
+    service = set_up()
+    service.database_service.load_attendance_matrix.return_value = AttendanceMatrix.of([])
+    service.database_service.get_all_player_coins.return_value = {"member1": 5}
+    # When
+    actual = service.refresh_leaderboard(fresh=True)
+    # Then
+    assert_that([stats.coins for stats in actual.rankings[LeaderboardOrder.POINTS]], equal_to([5]))
+    service.database_service.load_attendance_matrix.assert_called_once()
+    service.database_service.get_attendance_matrix.assert_not_called()
+
+
+def test_get_leaderboard_cached():
+    # Given
+    service = set_up()
+    service.leaderboard = Leaderboard([], 10)
+    # When
+    actual = service.get_leaderboard()
+    # Then
+    assert_that(actual, equal_to(service.leaderboard))
+    service.database_service.get_attendance_matrix.assert_not_called()
+
+
+@patch("pururu.config.PLAYERS", [])
+def test_get_leaderboard_not_cached():
+    # Given
+    service = set_up()
+    # When
+    actual = service.get_leaderboard()
+    # Then
+    assert_that(service.leaderboard, equal_to(actual))
+    service.database_service.get_attendance_matrix.assert_called_once()
+
+
 def test_register_bot_event():
     # Given
     service = set_up()
@@ -145,6 +242,7 @@ def test_start_new_game_ok(attendance: Attendance):
     # Given
     service = set_up()
     service.current_session.should_start_new_game.return_value = True
+    service.current_session.game_id = None
     service.database_service.get_last_attendance.return_value = attendance
     service.current_session.get_players.return_value = ["member1"]
     start_time = datetime(2023, 8, 10, 10)
@@ -158,6 +256,87 @@ def test_start_new_game_ok(attendance: Attendance):
     service.current_session.adjust_players_clocking_start_time.assert_called_once_with(start_time)
 
 
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 1)
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_start_new_game_concurrent_channels(attendance: Attendance):
+    # Given
+    service = PururuService(Mock())
+    service.database_service.get_last_attendance.return_value = attendance
+    start_time = datetime(2023, 8, 10, 10)
+    service.add_player("member1", start_time, "General")
+    service.add_player("member2", start_time, "Squad 2")
+    # When
+    general = service.start_new_game(start_time, "General")
+    squad = service.start_new_game(start_time, "Squad 2")
+    # Then
+    assert_that(general.game_id, equal_to(attendance.game_id + 1))
+    assert_that(squad.game_id, equal_to(attendance.game_id + 2))
+    assert_that(general.players, equal_to(["member1"]))
+    assert_that(service.get_session_info("Squad 2").players, equal_to(["member2"]))
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 1)
+def test_start_new_game_concurrent_threads(attendance: Attendance):
+    # Given
+    service = PururuService(Mock())
+    service.database_service.get_last_attendance.return_value = attendance
+    running_game_ids = service.sessions.game_ids
+
+    def slow_game_ids():
+        game_ids = running_game_ids()
+        time.sleep(0.05)  # the other threads read the running games before this one reserves its id
+        return game_ids
+
+    service.sessions.game_ids = slow_game_ids
+    start_time = datetime(2023, 8, 10, 10)
+    channels = ["General", "Squad 2", "Squad 3"]
+    for idx, channel in enumerate(channels):
+        service.add_player(f"member{idx}", start_time, channel)
+    game_ids = []
+    threads = [threading.Thread(target=lambda channel=channel: game_ids.append(
+        service.start_new_game(start_time, channel).game_id)) for channel in channels]
+    # When
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Then
+    assert_that(sorted(game_ids), equal_to([attendance.game_id + 1, attendance.game_id + 2, attendance.game_id + 3]))
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+@patch("pururu.config.MIN_ATTENDANCE_MEMBERS", 1)
+@patch("pururu.config.PLAYERS", ["member1", "member2"])
+def test_start_new_game_reuses_unstored_game_id(attendance: Attendance):
+    # Given
+    service = PururuService(Mock())
+    service.database_service.get_last_attendance.return_value = attendance
+    start_time = datetime(2023, 8, 10, 10)
+    service.add_player("member1", start_time, "General")
+    service.add_player("member2", start_time, "Squad 2")
+    general = service.start_new_game(start_time, "General")
+    service.start_new_game(start_time, "Squad 2")
+    service.remove_player("member1", start_time, "General")
+    # When
+    assert_that(calling(service.end_game).with_args(start_time, "General"), raises(GameEndedWithoutPrecondition))
+    service.add_player("member1", start_time, "General")
+    result = service.start_new_game(start_time, "General")
+    # Then
+    assert_that(result.game_id, equal_to(general.game_id))
+    assert_that(service.released_game_ids, equal_to(set()))
+
+
+def test_current_session_read_does_not_open():
+    # Given
+    service = PururuService(Mock())
+    # When
+    session = service.current_session
+    # Then
+    assert_that(session.game_id, equal_to(None))
+    assert_that(len(service.sessions), equal_to(0))
+
+
 def test_end_game_conditions_not_met():
     # Given
     service = set_up()
@@ -0,0 +1,61 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from hamcrest import assert_that, equal_to, is_not, same_instance
+
+from pururu.domain.entities import VoiceChannel
+from pururu.domain.session_manager import SessionManager
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_open_and_get():
+    # Given
+    sessions = SessionManager()
+    # When
+    general = sessions.open("General")
+    # Then
+    assert_that(sessions.get("General"), same_instance(general))
+    assert_that(sessions.open("General"), same_instance(general))
+    assert_that(sessions.get("Squad 2"), is_not(same_instance(sessions.get("Squad 2"))))
+    assert_that(len(sessions), equal_to(1))
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_release_idle_only():
+    # Given
+    sessions = SessionManager()
+    sessions.open("General").clock_in("member1", datetime(2023, 8, 10, 9))
+    sessions.open("Squad 2").game_id = 5
+    sessions.open("Empty")
+    # When
+    for channel in ["General", "Squad 2", "Empty"]:
+        sessions.release(channel)
+    # Then
+    assert_that(sorted(sessions.sessions), equal_to(["General", "Squad 2"]))
+    assert_that(sessions.game_ids(), equal_to([5]))
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", False)
+def test_single_session():
+    # Given
+    sessions = SessionManager()
+    # When
+    general = sessions.open("General")
+    # Then
+    assert_that(sessions.get("Squad 2"), same_instance(general))
+    assert_that(list(sessions.sessions), equal_to([None]))
+
+
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_keyed_by_channel_id():
+    # Given
+    sessions = SessionManager()
+    general = sessions.open(VoiceChannel(1, "General"))
+    # When
+    renamed = sessions.get(VoiceChannel(1, "Ranked"))
+    namesake = sessions.open(VoiceChannel(2, "General"))
+    # Then
+    assert_that(renamed, same_instance(general))
+    assert_that(namesake, is_not(same_instance(general)))
+    assert_that(sorted(sessions.sessions), equal_to([1, 2]))
+
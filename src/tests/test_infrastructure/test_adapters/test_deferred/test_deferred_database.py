@@ -0,0 +1,76 @@
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import assert_that, equal_to, calling, raises
+
+from pururu.infrastructure.adapters.deferred.deferred_database import DeferredDatabase
+
+
+def test_calls_wait_for_the_database():
+    # Given
+    future = Future()
+    deferred = DeferredDatabase(future)
+    database = Mock()
+    database.get_player_coins.return_value = 10
+    ready_before = deferred.is_ready()
+    # When
+    future.set_result(database)
+    actual = deferred.get_player_coins("member1")
+    # Then
+    assert_that(ready_before, equal_to(False))
+    assert_that(actual, equal_to(10))
+    database.get_player_coins.assert_called_once_with("member1")
+
+
+def test_bot_events_buffered_until_the_database_is_ready():
+    # Given
+    future = Future()
+    deferred = DeferredDatabase(future)
+    database = Mock()
+    # When
+    deferred.insert_bot_event("event1")
+    deferred.insert_bot_event("event2")
+    # Then
+    assert_that(deferred.buffered_events, equal_to(["event1", "event2"]))
+    # When
+    future.set_result(database)
+    deferred.insert_bot_event("event3")
+    # Then
+    assert_that([event.args[0] for event in database.insert_bot_event.call_args_list],
+                equal_to(["event1", "event2", "event3"]))
+    assert_that(deferred.buffered_events, equal_to([]))
+
+
+def test_buffered_bot_events_dropped_if_the_construction_failed():
+    # Given
+    future = Future()
+    deferred = DeferredDatabase(future)
+    deferred.logger = Mock()
+    deferred.insert_bot_event("event1")
+    # When
+    future.set_exception(FileNotFoundError("credentials.json"))
+    # Then
+    assert_that(deferred.buffered_events, equal_to([]))
+    deferred.logger.error.assert_called_once()
+    assert_that(calling(deferred.insert_bot_event).with_args("event2"), raises(FileNotFoundError))
+
+
+def test_calls_raise_the_construction_error():
+    # Given
+    future = Future()
+    future.set_exception(FileNotFoundError("credentials.json"))
+    deferred = DeferredDatabase(future)
+    # When-Then
+    assert_that(calling(deferred.get_attendance_matrix), raises(FileNotFoundError))
+
+
+@pytest.mark.asyncio
+async def test_ready_raises_the_construction_error():
+    # Given
+    future = Future()
+    future.set_exception(FileNotFoundError("credentials.json"))
+    deferred = DeferredDatabase(future)
+    # When-Then
+    with pytest.raises(FileNotFoundError):
+        await deferred.ready()
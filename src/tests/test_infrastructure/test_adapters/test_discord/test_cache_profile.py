@@ -0,0 +1,30 @@
+import pytest
+from hamcrest import assert_that, equal_to, none, is_
+
+from pururu.infrastructure.adapters.discord.cache_profile import CacheProfile, DEFAULT, LEAN
+
+
+def test_default_profile():
+    # When
+    actual = CacheProfile.of(DEFAULT)
+    # Then
+    assert_that(actual.intents.guild_messages, is_(True))
+    assert_that(actual.member_cache_flags.voice, is_(True))
+    assert_that(actual.options()["max_messages"], equal_to(1000))
+
+
+def test_lean_profile():
+    # When
+    actual = CacheProfile.of(LEAN)
+    # Then
+    assert_that(actual.intents.guilds and actual.intents.voice_states, is_(True))
+    assert_that(actual.intents.guild_messages or actual.intents.guild_typing or actual.intents.members, is_(False))
+    assert_that(actual.member_cache_flags.value, equal_to(0))
+    assert_that(actual.options()["max_messages"], none())
+
+
+def test_unknown_profile():
+    # When-Then
+    with pytest.raises(ValueError):
+        CacheProfile.of("huge")
+
@@ -0,0 +1,55 @@
+import discord
+from discord import app_commands
+from hamcrest import assert_that, equal_to, none, is_not
+
+from pururu.infrastructure.adapters.discord.command_sync import CommandSyncState, command_tree_fingerprint
+
+GUILD = discord.Object(id=123456)
+
+
+def build_tree(description: str = "Sends a ping to Pururu") -> app_commands.CommandTree:
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.default()))
+
+    @tree.command(name="ping", description=description, guild=GUILD)
+    async def ping_command(interaction: discord.Interaction):
+        pass
+
+    @tree.command(name="stats", description="Shows your attendance stats", guild=GUILD)
+    async def stats_command(interaction: discord.Interaction, season: str = None):
+        pass
+
+    return tree
+
+
+def test_fingerprint_is_stable():
+    # When
+    actual = command_tree_fingerprint(build_tree(), GUILD)
+    # Then
+    assert_that(actual, equal_to(command_tree_fingerprint(build_tree(), GUILD)))
+
+
+def test_fingerprint_changes_with_the_commands():
+    # When
+    actual = command_tree_fingerprint(build_tree("Ping"), GUILD)
+    # Then
+    assert_that(actual, is_not(equal_to(command_tree_fingerprint(build_tree(), GUILD))))
+
+
+def test_sync_state_save_and_load(tmp_path):
+    # Given
+    state = CommandSyncState(str(tmp_path / "command_sync.json"))
+    # When
+    state.save(123456, "abc")
+    # Then
+    assert_that(CommandSyncState(state.path).load(123456), equal_to("abc"))
+    assert_that(state.load(654321), none())
+
+
+def test_sync_state_unreadable(tmp_path):
+    # Given
+    path = tmp_path / "command_sync.json"
+    path.write_text("{not json")
+    # When
+    actual = CommandSyncState(str(path)).load(123456)
+    # Then
+    assert_that(actual, none())
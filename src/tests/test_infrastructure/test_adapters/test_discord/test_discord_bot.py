@@ -1,22 +1,42 @@
-from unittest.mock import patch, AsyncMock, Mock
+import asyncio
+import threading
+from concurrent.futures import Future
+from unittest.mock import patch, AsyncMock, Mock, ANY
 
 import discord
 import pytest
 from discord.app_commands import Command
+from hamcrest import assert_that, equal_to, none, not_none, greater_than_or_equal_to, contains_string
 
-from pururu.domain.entities import MemberStats
-from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot
+from pururu.application.services.guild_registry import GuildRegistry, GuildContext, GuildSettings
+from pururu.domain.entities import MemberStats, Leaderboard, LeaderboardOrder, StatsFilter, AttendanceEventType, \
+    VoiceChannel
+from pururu.domain.exceptions import InvalidStatsFilter
+from pururu.infrastructure.adapters.deferred.deferred_database import DeferredDatabase
+from pururu.infrastructure.adapters.discord.discord_bot import PururuDiscordBot, VOICE_UPDATES, \
+    UNKNOWN_GUILD_MESSAGE, SHARD_VOICE_UPDATES, SHARD_LATENCY
 from tests.test_domain.test_entities import member_stats
 
 
+GUILD_ID = 123456
+
+
 @patch('pururu.application.services.pururu_handler.PururuHandler')
 def set_up(pururu_handler_mock):
-    discord_bot = PururuDiscordBot(pururu_handler_mock)
+    guild_registry = GuildRegistry()
+    guild_registry.register(GuildContext(GuildSettings(GUILD_ID, ['member'], 'spreadsheet_id', {}),
+                                         pururu_handler_mock))
+    discord_bot = PururuDiscordBot(guild_registry)
     discord_bot.logger = Mock()
+    discord_bot.command_sync_state = Mock()
+    discord_bot.command_sync_state.load.return_value = None
     return discord_bot
 
 
-@patch('pururu.config.GUILD_ID', 123456)
+def handler(discord_bot: PururuDiscordBot) -> Mock:
+    return discord_bot.guild_registry.get(GUILD_ID).pururu_handler
+
+
 @pytest.mark.asyncio
 @patch.object(PururuDiscordBot, 'setup_commands', new_callable=AsyncMock)
 @patch.object(discord.app_commands.CommandTree, 'clear_commands', new_callable=AsyncMock)
@@ -31,11 +51,100 @@ async def test_setup_hook(mock_sync, mock_copy_global, mock_clear_commands, mock
     mock_sync.return_value = [command_mock]
     # When
     await bot_instance.setup_hook()
+    await asyncio.gather(*bot_instance.startup_tasks)
     # Then
     mock_setup_commands.assert_called_once()
+    handler(bot_instance).warm_up.assert_called_once()
     mock_clear_commands.assert_called_once_with(guild=guild)
     mock_copy_global.assert_called_once_with(guild=guild)
     mock_sync.assert_called_once_with(guild=guild)
+    bot_instance.command_sync_state.save.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch.object(discord.app_commands.CommandTree, 'sync', new_callable=AsyncMock)
+async def test_setup_hook_every_guild(mock_sync):
+    # Given
+    bot_instance = set_up()
+    bot_instance.guild_registry.register(GuildContext(GuildSettings(654321, ['member'], 'spreadsheet_id', {}),
+                                                      Mock()))
+    mock_sync.return_value = []
+    # When
+    await bot_instance.setup_hook()
+    await asyncio.gather(*bot_instance.startup_tasks)
+    # Then
+    assert_that([sync_call.kwargs['guild'].id for sync_call in mock_sync.call_args_list], equal_to([GUILD_ID, 654321]))
+    for guild in bot_instance.guild_registry:
+        guild.pururu_handler.warm_up.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch.object(discord.app_commands.CommandTree, 'sync', new_callable=AsyncMock)
+async def test_setup_hook_skips_unchanged_sync(mock_sync):
+    # Given
+    bot_instance = set_up()
+    mock_sync.return_value = []
+    await bot_instance.setup_hook()
+    await asyncio.gather(*bot_instance.startup_tasks)
+    bot_instance.command_sync_state.load.return_value = bot_instance.command_sync_state.save.call_args.args[1]
+    restarted = set_up()
+    restarted.command_sync_state = bot_instance.command_sync_state
+    # When
+    await restarted.setup_hook()
+    await asyncio.gather(*restarted.startup_tasks)
+    # Then
+    mock_sync.assert_awaited_once()
+    restarted.logger.info.assert_called_once_with("Commands of guild %s unchanged (%s), sync skipped", GUILD_ID,
+                                                  ANY)
+
+
+@patch('pururu.config.COMMAND_SYNC_FORCE', True)
+@pytest.mark.asyncio
+@patch('pururu.infrastructure.adapters.discord.discord_bot.command_tree_fingerprint', Mock(return_value="abc"))
+@patch.object(discord.app_commands.CommandTree, 'sync', new_callable=AsyncMock)
+async def test_setup_hook_forced_sync(mock_sync):
+    # Given
+    bot_instance = set_up()
+    mock_sync.return_value = []
+    bot_instance.command_sync_state.load.return_value = "abc"
+    # When
+    await bot_instance.setup_hook()
+    await asyncio.gather(*bot_instance.startup_tasks)
+    # Then
+    mock_sync.assert_awaited_once()
+
+
+@patch('pururu.config.METRICS_ENABLED', True)
+@pytest.mark.asyncio
+@patch('pururu.infrastructure.adapters.discord.discord_bot.MetricsServer')
+@patch.object(PururuDiscordBot, 'setup_commands')
+@patch.object(discord.app_commands.CommandTree, 'sync', new_callable=AsyncMock)
+async def test_setup_hook_starts_metrics_server(mock_sync, mock_setup_commands, metrics_server_mock):
+    # Given
+    metrics_server_mock.return_value.start = AsyncMock()
+    metrics_server_mock.return_value.stop = AsyncMock()
+    mock_sync.return_value = []
+    bot_instance = set_up()
+    # When
+    await bot_instance.setup_hook()
+    await bot_instance.close()
+    # Then
+    metrics_server_mock.return_value.start.assert_awaited_once()
+    metrics_server_mock.return_value.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_monitor_shards():
+    # Given
+    discord_bot = set_up()
+    discord_bot.shard_latencies = Mock(return_value=[(0, 0.05), (1, float('inf'))])
+    # When
+    monitor = asyncio.create_task(discord_bot.monitor_shards())
+    await asyncio.sleep(0)
+    monitor.cancel()
+    # Then
+    assert_that(SHARD_LATENCY.labels('0').value, equal_to(0.05))
+    assert_that(SHARD_LATENCY.children.get(('1',)), none())
 
 
 # ------------------------------
@@ -52,21 +161,216 @@ async def test_on_ready_ok():
     discord_bot.logger.info.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_on_ready_database_failed():
+    # Given
+    discord_bot = set_up()
+    future = Future()
+    future.set_exception(FileNotFoundError("credentials.json"))
+    handler(discord_bot).domain_service.database_service = DeferredDatabase(future)
+    discord_bot.close = AsyncMock()
+    # When
+    await discord_bot.on_ready()
+    # Then
+    assert_that(discord_bot.startup_failed, equal_to(True))
+    assert_that(discord_bot.startup.elapsed("ready"), none())
+    discord_bot.logger.critical.assert_called_once()
+    discord_bot.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch.object(discord.app_commands.CommandTree, 'sync', new_callable=AsyncMock)
+async def test_setup_hook_logs_startup_errors(mock_sync):
+    # Given
+    discord_bot = set_up()
+    mock_sync.side_effect = Exception("rate limited")
+    handler(discord_bot).warm_up.side_effect = Exception("auth failed")
+    # When
+    await discord_bot.setup_hook()
+    await asyncio.gather(*discord_bot.startup_tasks)
+    # Then
+    assert_that(discord_bot.logger.error.call_count, equal_to(2))
+    assert_that(discord_bot.startup.elapsed("sync"), not_none())
+    assert_that(discord_bot.startup.elapsed("warm_up"), not_none())
+
+
+@pytest.mark.asyncio
+async def test_on_ready_reports_startup():
+    # Given
+    discord_bot = set_up()
+    discord_bot.startup.mark("login")
+    # When
+    await discord_bot.on_ready()
+    await discord_bot.on_ready()
+    # Then
+    assert_that(discord_bot.startup.elapsed("ready"), greater_than_or_equal_to(discord_bot.startup.elapsed("login")))
+    assert_that(discord_bot.logger.info.call_args.args[-1], contains_string("ready at"))
+
+
 @pytest.mark.asyncio
 async def test_on_voice_state_update_ok():
     # Given
     discord_bot = set_up()
-    member = Mock(spec=discord.Member)
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
     member.name = 'member'
-    before_state = Mock(spec=discord.VoiceState, channel=Mock())
+    before_state = Mock(spec=discord.VoiceState, channel=Mock(id=1))
     before_state.channel.name = 'before_state'
-    after_state = Mock(spec=discord.VoiceState, channel=Mock())
+    after_state = Mock(spec=discord.VoiceState, channel=Mock(id=2))
+    after_state.channel.name = 'after_state'
+    shard = SHARD_VOICE_UPDATES.labels('0')
+    shard_before = shard.value
+    # When
+    await discord_bot.on_voice_state_update(member, before_state, after_state)
+    # Then
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_called_once_with(
+        'member', VoiceChannel(1, 'before_state'), VoiceChannel(2, 'after_state'))
+    assert_that(str(handler(discord_bot).handle_voice_state_update_dc_event.call_args.args[2]), equal_to('after_state'))
+    assert_that(shard.value - shard_before, equal_to(1))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_voice_handler():
+    # Given
+    discord_bot = set_up()
+    discord_bot.guild_registry.get(GUILD_ID).voice_handler = Mock()
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
+    member.name = 'member'
+    before_state = Mock(spec=discord.VoiceState, channel=None)
+    after_state = Mock(spec=discord.VoiceState, channel=Mock(id=2))
     after_state.channel.name = 'after_state'
     # When
     await discord_bot.on_voice_state_update(member, before_state, after_state)
     # Then
-    discord_bot.pururu_handler.handle_voice_state_update_dc_event.assert_called_once_with('member', 'before_state',
-                                                                                          'after_state')
+    discord_bot.guild_registry.get(GUILD_ID).voice_handler.handle_voice_state_update_dc_event.assert_called_once_with(
+        'member', None, VoiceChannel(2, 'after_state'))
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_off_the_loop_in_order():
+    # Given
+    discord_bot = set_up()
+    release = threading.Event()
+    handled = []
+
+    def handle(member, before_channel, after_channel):
+        release.wait(5)  # e.g. waiting on the domain worker
+        handled.append((threading.current_thread(), str(after_channel)))
+
+    handler(discord_bot).handle_voice_state_update_dc_event.side_effect = handle
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
+    member.name = 'member'
+    states = [Mock(spec=discord.VoiceState, channel=None)]
+    for channel_id, name in [(1, 'first'), (2, 'second')]:
+        states.append(Mock(spec=discord.VoiceState, channel=Mock(id=channel_id)))
+        states[-1].channel.name = name
+    # When
+    updates = [asyncio.create_task(discord_bot.on_voice_state_update(member, before, after))
+               for before, after in zip(states, states[1:])]
+    await asyncio.sleep(0.05)
+    # Then
+    assert_that(handled, equal_to([]))
+    # When
+    release.set()
+    await asyncio.gather(*updates)
+    # Then
+    assert_that([channel for _, channel in handled], equal_to(['first', 'second']))
+    assert_that(threading.current_thread() in [thread for thread, _ in handled], equal_to(False))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_before_the_database_is_ready():
+    # Given
+    discord_bot = set_up()
+    database_future = Future()
+    deferred = DeferredDatabase(database_future)
+    handler(discord_bot).handle_voice_state_update_dc_event.side_effect = \
+        lambda *args: deferred.get_last_attendance()
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
+    member.name = 'member'
+    after_state = Mock(spec=discord.VoiceState, channel=Mock(id=1))
+    after_state.channel.name = 'General'
+    # When
+    update = asyncio.create_task(
+        discord_bot.on_voice_state_update(member, Mock(spec=discord.VoiceState, channel=None), after_state))
+    await asyncio.sleep(0.05)
+    # Then
+    assert_that(update.done(), equal_to(False))
+    # When
+    database_future.set_result(Mock())
+    await update
+    # Then
+    database_future.result().get_last_attendance.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_unknown_guild_filtered():
+    # Given
+    discord_bot = set_up()
+    member = Mock(spec=discord.Member, guild=Mock(id=654321, shard_id=0))
+    member.name = 'member'
+    before_state = Mock(spec=discord.VoiceState, channel=None)
+    after_state = Mock(spec=discord.VoiceState, channel=Mock())
+    unknown_guild = VOICE_UPDATES.labels('unknown_guild')
+    unknown_guild_before = unknown_guild.value
+    # When
+    await discord_bot.on_voice_state_update(member, before_state, after_state)
+    # Then
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_not_called()
+    assert_that(unknown_guild.value - unknown_guild_before, equal_to(1))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_unchanged_channel_filtered():
+    # Given
+    discord_bot = set_up()
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
+    member.name = 'member'
+    channel = Mock()
+    before_state = Mock(spec=discord.VoiceState, channel=channel, self_mute=False)
+    after_state = Mock(spec=discord.VoiceState, channel=channel, self_mute=True)
+    unchanged = VOICE_UPDATES.labels('unchanged')
+    unchanged_before = unchanged.value
+    # When
+    await discord_bot.on_voice_state_update(member, before_state, after_state)
+    # Then
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_not_called()
+    assert_that(unchanged.value - unchanged_before, equal_to(1))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_not_player_filtered():
+    # Given
+    discord_bot = set_up()
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=0))
+    member.name = 'guest'
+    before_state = Mock(spec=discord.VoiceState, channel=None)
+    after_state = Mock(spec=discord.VoiceState, channel=Mock())
+    not_player, passed = VOICE_UPDATES.labels('not_player'), VOICE_UPDATES.labels('passed')
+    not_player_before, passed_before = not_player.value, passed.value
+    # When
+    await discord_bot.on_voice_state_update(member, before_state, after_state)
+    # Then
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_not_called()
+    assert_that(not_player.value - not_player_before, equal_to(1))
+    assert_that(passed.value - passed_before, equal_to(0))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_lean_cache_filters_guests():
+    # Given
+    with patch('pururu.config.DISCORD_CACHE_PROFILE', 'lean'):
+        discord_bot = set_up()
+    guild = Mock(id=GUILD_ID, shard_id=0)
+    guest = Mock(spec=discord.Member, id=1, guild=guild)
+    guest.name = 'guest'
+    before = Mock(spec=discord.VoiceState, channel=None)
+    after = Mock(spec=discord.VoiceState, channel=Mock())
+    # When
+    await discord_bot.on_voice_state_update(guest, before, after)
+    # Then
+    assert_that(discord_bot.intents.guild_messages, equal_to(False))
+    handler(discord_bot).handle_voice_state_update_dc_event.assert_not_called()
 
 
 # ------------------------------
@@ -113,16 +417,153 @@ async def test_stats_command_ok(member_stats: MemberStats):
     discord_bot = set_up()
     discord_bot.setup_commands()
     stats_command: Command = next(filter(lambda x: x.name == 'stats', discord_bot.tree.get_commands()))
-    interaction = AsyncMock()
+    interaction = AsyncMock(guild_id=GUILD_ID)
     interaction.response = AsyncMock()
     interaction.followup = AsyncMock()
     interaction.user.name = 'user_name'
     interaction.user.mention = 'user_mention'
-    discord_bot.pururu_handler.retrieve_player_stats.return_value = member_stats
+    handler(discord_bot).build_stats_filter.return_value = None
+    handler(discord_bot).render_player_stats.return_value = member_stats.as_message()
     # When
     await stats_command.callback(interaction=interaction)
     # Then
     interaction.response.defer.assert_called_once_with(ephemeral=True, thinking=True)
-    discord_bot.pururu_handler.retrieve_player_stats.assert_called_once_with('user_name')
+    handler(discord_bot).render_player_stats.assert_called_once_with('user_name')
     interaction.followup.send.assert_called_once_with("Hola user_mention! Estos son tus Stats:\n"
                                                       + member_stats.as_message())
+
+
+@pytest.mark.asyncio
+async def test_stats_command_filtered(member_stats: MemberStats):
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    stats_command: Command = next(filter(lambda x: x.name == 'stats', discord_bot.tree.get_commands()))
+    interaction = AsyncMock(guild_id=GUILD_ID)
+    interaction.user.name = 'user_name'
+    interaction.user.mention = 'user_mention'
+    stats_filter = StatsFilter(event_type=AttendanceEventType.OFFICIAL_MEETING)
+    handler(discord_bot).build_stats_filter.return_value = stats_filter
+    handler(discord_bot).render_player_stats.return_value = member_stats.as_message()
+    # When
+    await stats_command.callback(interaction=interaction, event_type='OFFICIAL_MEETING')
+    # Then
+    handler(discord_bot).build_stats_filter.assert_called_once_with(None, None, None, 'OFFICIAL_MEETING')
+    handler(discord_bot).render_player_stats.assert_called_once_with('user_name', stats_filter)
+    interaction.followup.send.assert_called_once_with("Hola user_mention! Estos son tus Stats (solo Quedada Oficial):\n"
+                                                      + member_stats.as_message())
+
+
+@pytest.mark.asyncio
+async def test_stats_command_invalid_filter():
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    stats_command: Command = next(filter(lambda x: x.name == 'stats', discord_bot.tree.get_commands()))
+    interaction = AsyncMock(guild_id=GUILD_ID)
+    handler(discord_bot).build_stats_filter.side_effect = InvalidStatsFilter("Fecha inválida")
+    # When
+    await stats_command.callback(interaction=interaction, start_date='yesterday')
+    # Then
+    handler(discord_bot).render_player_stats.assert_not_called()
+    interaction.followup.send.assert_called_once_with("Fecha inválida")
+
+
+@pytest.mark.asyncio
+async def test_stats_command_unknown_guild():
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    stats_command: Command = next(filter(lambda x: x.name == 'stats', discord_bot.tree.get_commands()))
+    interaction = AsyncMock(guild_id=None)
+    # When
+    await stats_command.callback(interaction=interaction)
+    # Then
+    handler(discord_bot).render_player_stats.assert_not_called()
+    interaction.followup.send.assert_called_once_with(UNKNOWN_GUILD_MESSAGE)
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_command_ok(member_stats: MemberStats):
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    leaderboard_command: Command = next(filter(lambda x: x.name == 'leaderboard', discord_bot.tree.get_commands()))
+    interaction = AsyncMock(guild_id=GUILD_ID)
+    interaction.response = AsyncMock()
+    interaction.followup = AsyncMock()
+    leaderboard = Leaderboard([member_stats], 10)
+    handler(discord_bot).retrieve_leaderboard.return_value = leaderboard
+    # When
+    await leaderboard_command.callback(interaction=interaction, order=LeaderboardOrder.COINS.value, page=1)
+    # Then
+    interaction.response.defer.assert_called_once_with(thinking=True)
+    handler(discord_bot).retrieve_leaderboard.assert_called_once()
+    interaction.followup.send.assert_called_once_with(leaderboard.as_message(LeaderboardOrder.COINS, 1))
+
+
+@pytest.mark.asyncio
+async def test_stats_and_leaderboard_commands_call_the_service_off_the_loop(member_stats: MemberStats):
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    commands = {command.name: command for command in discord_bot.tree.get_commands()}
+    interaction = AsyncMock(guild_id=GUILD_ID)
+    interaction.user.name = 'user_name'
+    threads = []
+    handler(discord_bot).render_player_stats.side_effect = \
+        lambda *args: threads.append(threading.current_thread()) or member_stats.as_message()
+    handler(discord_bot).retrieve_leaderboard.side_effect = \
+        lambda: threads.append(threading.current_thread()) or Leaderboard([member_stats], 10)
+    # When
+    await commands['stats'].callback(interaction=interaction)
+    await commands['leaderboard'].callback(interaction=interaction)
+    # Then
+    assert_that(len(threads), equal_to(2))
+    assert_that(threading.current_thread() in threads, equal_to(False))
+
+
+@patch('pururu.config.PROFILE_SAMPLE_INTERVAL', 0.001)
+@pytest.mark.asyncio
+async def test_profile_command_ok():
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    profile_command: Command = next(filter(lambda x: x.name == 'profile', discord_bot.tree.get_commands()))
+    interaction = AsyncMock()
+    # When
+    await profile_command.callback(interaction=interaction, seconds=0.05)
+    # Then
+    interaction.response.defer.assert_called_once_with(ephemeral=True, thinking=True)
+    files = interaction.followup.send.call_args.kwargs['files']
+    assert_that([file.filename for file in files], equal_to(["profile_top.txt", "profile_stacks.collapsed"]))
+    assert_that(profile_command.default_permissions.administrator, equal_to(True))
+
+
+@pytest.mark.asyncio
+async def test_profile_command_already_running():
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    profile_command: Command = next(filter(lambda x: x.name == 'profile', discord_bot.tree.get_commands()))
+    interaction = AsyncMock()
+    # When
+    async with discord_bot.profiling:
+        await profile_command.callback(interaction=interaction, seconds=1)
+    # Then
+    interaction.response.send_message.assert_called_once_with("Ya hay un perfilado en curso", ephemeral=True)
+    interaction.followup.send.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_profile_command_missing_permissions():
+    # Given
+    discord_bot = set_up()
+    discord_bot.setup_commands()
+    profile_command: Command = next(filter(lambda x: x.name == 'profile', discord_bot.tree.get_commands()))
+    interaction = AsyncMock()
+    # When
+    await profile_command.on_error(interaction, discord.app_commands.MissingPermissions(['administrator']))
+    # Then
+    interaction.response.send_message.assert_called_once_with("Solo los administradores pueden perfilar el bot",
+                                                              ephemeral=True)
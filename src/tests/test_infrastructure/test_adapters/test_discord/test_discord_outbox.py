@@ -0,0 +1,191 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import discord
+import pytest
+from hamcrest import assert_that, equal_to, close_to
+
+from pururu.domain.entities import Message
+from pururu.infrastructure.adapters.discord.discord_outbox import DiscordOutbox, RateLimiter, OUTBOX_MESSAGES
+
+CHANNEL_ID = 123456
+
+
+def set_up() -> DiscordOutbox:
+    discord_service = AsyncMock()
+    message_ids = iter(range(1, 100))
+
+    async def send_message(message: Message) -> Message:
+        message.message_id = next(message_ids)
+        return message
+
+    async def edit_message(message: Message) -> Message:
+        return message
+
+    discord_service.send_message.side_effect = send_message
+    discord_service.edit_message.side_effect = edit_message
+    return DiscordOutbox(discord_service)
+
+
+def test_rate_limiter():
+    # Given
+    now = [0.0]
+    limiter = RateLimiter(2, 10, lambda: now[0])
+    # When-Then
+    assert_that(limiter.reserve(), equal_to(0.0))
+    assert_that(limiter.reserve(), equal_to(0.0))
+    assert_that(limiter.reserve(), close_to(5.0, 1e-9))
+    now[0] = 10.0
+    assert_that(limiter.reserve(), close_to(0.0, 1e-9))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 0)
+async def test_send_message_queued_and_burst_merged():
+    # Given
+    outbox = set_up()
+    messages = [Message(f"game {i}", CHANNEL_ID) for i in range(3)]
+    merged = OUTBOX_MESSAGES.labels('merged')
+    merged_before = merged.value
+    # When
+    for message in messages:
+        await outbox.send_message(message)
+    # Then
+    outbox.discord_service.send_message.assert_not_called()
+    # When
+    await outbox.flush()
+    # Then
+    outbox.discord_service.send_message.assert_called_once()
+    sent = outbox.discord_service.send_message.call_args.args[0]
+    assert_that(sent.content, equal_to("game 0\ngame 1\ngame 2"))
+    assert_that([message.message_id for message in messages], equal_to([1, 1, 1]))
+    assert_that(merged.value - merged_before, equal_to(2))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 10)
+async def test_send_message_appended_with_edit():
+    # Given
+    outbox = set_up()
+    await outbox.send_message(Message("game 1 started", CHANNEL_ID))
+    await outbox.flush()
+    # When
+    second = await outbox.send_message(Message("game 1 ended", CHANNEL_ID))
+    await outbox.flush()
+    # Then
+    outbox.discord_service.send_message.assert_called_once()
+    edited = outbox.discord_service.edit_message.call_args.args[0]
+    assert_that(edited.content, equal_to("game 1 started\ngame 1 ended"))
+    assert_that(edited.message_id, equal_to(1))
+    assert_that(second.message_id, equal_to(1))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 0)
+@patch("pururu.config.OUTBOX_RATE", 1)
+@patch("pururu.config.OUTBOX_RATE_PERIOD", 0.05)
+async def test_send_message_rate_limited_per_channel():
+    # Given
+    outbox = set_up()
+    # When
+    await outbox.send_message(Message("first", CHANNEL_ID))
+    await asyncio.sleep(0)
+    await outbox.send_message(Message("second", CHANNEL_ID))
+    await outbox.send_message(Message("third", CHANNEL_ID))
+    await outbox.send_message(Message("other", 654321))
+    await asyncio.sleep(0.01)
+    # Then
+    assert_that([call.args[0].content for call in outbox.discord_service.send_message.call_args_list],
+                equal_to(["first", "other"]))
+    # When
+    await outbox.flush()
+    # Then
+    assert_that(outbox.discord_service.send_message.call_args_list[-1].args[0].content, equal_to("second\nthird"))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 0)
+async def test_send_message_error_dropped():
+    # Given
+    outbox = set_up()
+    outbox.logger = Mock()
+    outbox.discord_service.send_message.side_effect = discord.HTTPException(AsyncMock(status=500), "error")
+    dropped = OUTBOX_MESSAGES.labels('dropped')
+    dropped_before = dropped.value
+    # When
+    await outbox.send_message(Message("game", CHANNEL_ID))
+    await outbox.flush()
+    # Then
+    assert_that(dropped.value - dropped_before, equal_to(1))
+    outbox.logger.error.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 10)
+async def test_send_message_not_mergeable_kept_apart():
+    # Given
+    outbox = set_up()
+    status = Message("game 1 status", CHANNEL_ID, mergeable=False)
+    # When
+    await outbox.send_message(Message("game 1 started", CHANNEL_ID))
+    await outbox.send_message(status)
+    await outbox.send_message(Message("game 2 started", CHANNEL_ID))
+    await outbox.flush()
+    # Then
+    assert_that([call.args[0].content for call in outbox.discord_service.send_message.call_args_list],
+                equal_to(["game 1 started", "game 1 status", "game 2 started"]))
+    outbox.discord_service.edit_message.assert_not_called()
+    assert_that(status.message_id, equal_to(2))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_MERGE_WINDOW", 0)
+async def test_send_message_unexpected_error_keeps_draining():
+    # Given
+    outbox = set_up()
+    outbox.logger = Mock()
+    send_message = outbox.discord_service.send_message.side_effect
+
+    async def fail_first(message: Message) -> Message:
+        if message.content == "first":
+            raise ValueError("invalid payload")
+        return await send_message(message)
+
+    outbox.discord_service.send_message.side_effect = fail_first
+    first = Message("first", CHANNEL_ID, mergeable=False)
+    second = Message("second", CHANNEL_ID, mergeable=False)
+    # When
+    await outbox.send_message(first)
+    await outbox.send_message(second)
+    await outbox.flush()
+    # Then
+    outbox.logger.error.assert_called_once()
+    assert_that(first.message_id, equal_to(None))
+    assert_that(second.message_id, equal_to(1))
+
+
+@pytest.mark.asyncio
+@patch("pururu.config.OUTBOX_RATE", 1)
+@patch("pururu.config.OUTBOX_RATE_PERIOD", 0.05)
+async def test_edit_message_rate_limited_and_merged():
+    # Given
+    outbox = set_up()
+    edits = []
+    for content in ["0m", "1m", "2m"]:
+        edit = Message(content, CHANNEL_ID, mergeable=False)
+        edit.message_id = 7
+        edits.append(edit)
+    # When
+    await outbox.edit_message(edits[0])
+    await asyncio.sleep(0)
+    queued = [await outbox.edit_message(edit) for edit in edits[1:]]
+    await asyncio.sleep(0.01)
+    # Then
+    assert_that(outbox.discord_service.edit_message.call_count, equal_to(1))
+    assert_that(queued[1], equal_to(queued[0]))
+    # When
+    await outbox.flush()
+    # Then
+    assert_that([call.args[0].content for call in outbox.discord_service.edit_message.call_args_list],
+                equal_to(["0m", "2m"]))
+    outbox.discord_service.send_message.assert_not_called()
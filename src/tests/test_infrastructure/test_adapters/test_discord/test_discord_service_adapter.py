@@ -1,7 +1,8 @@
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock, Mock
 
+import discord
 import pytest
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, equal_to, none
 
 from pururu.domain.entities import Message
 from pururu.infrastructure.adapters.discord.discord_service_adapter import DiscordServiceAdapter
@@ -9,9 +10,9 @@ from tests.test_domain.test_entities import message
 
 
 @patch('pururu.config.GUILD_ID', 123456)
-def set_up():
-    mock_bot = AsyncMock(name='my_client_mock')
-    mock_bot.guilds = [MagicMock(id=123456)]
+def set_up(text_channels: list = None):
+    mock_bot = MagicMock(name='my_client_mock')
+    mock_bot.get_guild.return_value = MagicMock(spec=discord.Guild, id=123456, text_channels=text_channels or [])
     dc_service = DiscordServiceAdapter(mock_bot)
     return dc_service
 
@@ -19,10 +20,10 @@ def set_up():
 @pytest.mark.asyncio
 async def test_send_message_ok(message: Message):
     # Given
-    dc_service = set_up()
     response_message = AsyncMock(id=2222)
     text_channel = AsyncMock(id=123456, send=AsyncMock(return_value=response_message))
-    dc_service.guild.text_channels = [text_channel]
+    other_channel = AsyncMock(id=654321)
+    dc_service = set_up([other_channel, text_channel])
     expected_message = Message(content=message.content, channel_id=message.channel_id)
     expected_message.message_id = 2222
     # When
@@ -32,3 +33,52 @@ async def test_send_message_ok(message: Message):
     assert_that(result.message_id, equal_to(expected_message.message_id))
     assert_that(result.content, equal_to(expected_message.content))
     text_channel.send.assert_called_once_with(message.content)
+    other_channel.send.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_send_message_channel_not_found(message: Message):
+    # Given
+    dc_service = set_up()
+    dc_service.logger = Mock()
+    # When
+    result = await dc_service.send_message(message)
+    # Then
+    assert_that(result.message_id, none())
+    dc_service.logger.error.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_edit_message(message: Message):
+    # Given
+    partial_message = AsyncMock()
+    text_channel = Mock(id=123456, get_partial_message=Mock(return_value=partial_message))
+    dc_service = set_up([text_channel])
+    message.message_id = 2222
+    # When
+    await dc_service.edit_message(message)
+    # Then
+    text_channel.get_partial_message.assert_called_once_with(2222)
+    partial_message.edit.assert_called_once_with(content=message.content)
+
+
+@pytest.mark.asyncio
+async def test_channel_index_refreshed_on_channel_events():
+    # Given
+    dc_service = set_up()
+    guild = MagicMock(spec=discord.Guild, id=123456, text_channels=[Mock(id=1)])
+    other_guild = MagicMock(spec=discord.Guild, id=654321, text_channels=[Mock(id=2)])
+    # When
+    await dc_service.on_channel_event(other_guild)
+    # Then
+    assert_that(list(dc_service.channels), equal_to([]))
+    # When
+    await dc_service.on_channel_event(Mock(guild=guild))
+    # Then
+    assert_that(list(dc_service.channels), equal_to([1]))
+    # When
+    guild.text_channels = [Mock(id=1), Mock(id=3)]
+    await dc_service.on_channel_event(Mock(guild=guild), Mock(guild=guild))
+    # Then
+    assert_that(list(dc_service.channels), equal_to([1, 3]))
+    assert_that(dc_service.bot.add_listener.call_count, equal_to(5))
@@ -0,0 +1,59 @@
+from unittest.mock import patch, Mock
+
+import discord
+import pytest
+from hamcrest import assert_that, equal_to, instance_of
+
+from pururu.application.services.guild_registry import GuildRegistry, GuildContext, GuildSettings
+from pururu.domain.entities import VoiceChannel
+from pururu.infrastructure.adapters.discord.discord_bot import SHARD_VOICE_UPDATES
+from pururu.infrastructure.adapters.discord.sharded_discord_bot import PururuShardedDiscordBot
+
+GUILD_ID = 123456
+
+
+@patch('pururu.config.DISCORD_SHARD_COUNT', 2)
+def set_up() -> PururuShardedDiscordBot:
+    guild_registry = GuildRegistry()
+    guild_registry.register(GuildContext(GuildSettings(GUILD_ID, ['member'], 'spreadsheet_id', {}), Mock()))
+    discord_bot = PururuShardedDiscordBot(guild_registry)
+    discord_bot.logger = Mock()
+    return discord_bot
+
+
+def test_shard_count():
+    # When
+    discord_bot = set_up()
+    # Then
+    assert_that(discord_bot, instance_of(discord.AutoShardedClient))
+    assert_that(discord_bot.shard_count, equal_to(2))
+    assert_that(discord_bot.shard_latencies(), equal_to([]))
+
+
+@pytest.mark.asyncio
+async def test_on_voice_state_update_routed_from_shard():
+    # Given
+    discord_bot = set_up()
+    member = Mock(spec=discord.Member, guild=Mock(id=GUILD_ID, shard_id=1))
+    member.name = 'member'
+    before_state = Mock(spec=discord.VoiceState, channel=None)
+    after_state = Mock(spec=discord.VoiceState, channel=Mock(id=3000))
+    after_state.channel.name = 'General'
+    shard = SHARD_VOICE_UPDATES.labels('1')
+    shard_before = shard.value
+    # When
+    await discord_bot.on_voice_state_update(member, before_state, after_state)
+    # Then
+    discord_bot.guild_registry.get(GUILD_ID).pururu_handler.handle_voice_state_update_dc_event.assert_called_once_with(
+        'member', None, VoiceChannel(3000, 'General'))
+    assert_that(shard.value - shard_before, equal_to(1))
+
+
+@pytest.mark.asyncio
+async def test_on_shard_ready():
+    # Given
+    discord_bot = set_up()
+    # When
+    await discord_bot.on_shard_ready(1)
+    # Then
+    discord_bot.logger.info.assert_called_once_with("Shard %s ready with guilds %s", 1, "")
@@ -1,13 +1,15 @@
 import pytest
-from hamcrest import assert_that, has_length, equal_to
+from hamcrest import assert_that, has_length, equal_to, calling, raises
 
+from pururu.domain.attendance_matrix import AttendanceMatrix
 from pururu.domain.entities import Attendance, Clocking, BotEvent
 from pururu.infrastructure.adapters.google_sheets.entities import AttendanceSheet, ClockingSheet, BotEventSheet, \
     CoinsSheet
 from tests.test_domain.test_entities import attendance, clocking, bot_event
 from tests.test_infrastructure.test_adapters.test_google_sheets.test_entities import attendance_sheet, clocking_sheet, \
     bot_event_sheet
-from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter
+from pururu.infrastructure.adapters.google_sheets.google_sheets_adapter import GoogleSheetsAdapter, \
+    SHEETS_CALL_LATENCY, SHEETS_CALL_ERRORS, SHEETS_PAYLOAD_CELLS
 
 from unittest.mock import patch, Mock, MagicMock
 
@@ -22,6 +24,18 @@ def set_up(gspread_mock, credentials_mock, logger_mock) -> GoogleSheetsAdapter:
     return GoogleSheetsAdapter('credentials.json', 'spreadsheet_id')
 
 
+@patch('pururu.infrastructure.adapters.google_sheets.google_sheets_adapter.gspread')
+def test_shared_client_and_guild_mapping(gspread_mock):
+    # Given
+    client = Mock()
+    # When
+    adapter = GoogleSheetsAdapter(None, 'guild_spreadsheet_id', {"member1": "C", "member2": "AB"}, client)
+    # Then
+    gspread_mock.authorize.assert_not_called()
+    client.open_by_key.assert_called_once_with('guild_spreadsheet_id')
+    assert_that(adapter.attendance_codec.plan, equal_to((("member1", 2), ("member2", 27))))
+
+
 @patch('pururu.infrastructure.adapters.google_sheets.google_sheets_adapter.mapper')
 @pytest.mark.usefixtures("attendance", "attendance_sheet")
 def test_upsert_attendance_ok(mapper_mock, attendance: Attendance, attendance_sheet: AttendanceSheet):
@@ -33,7 +47,7 @@ def test_upsert_attendance_ok(mapper_mock, attendance: Attendance, attendance_sh
     # Then
     adapter.spreadsheet.values_update.assert_called_with(
         range=f"{AttendanceSheet.SHEET}!{AttendanceSheet.DATA_COL_INIT}{attendance_sheet.game_id}:"
-              f"{AttendanceSheet.DATA_COL_END}{attendance_sheet.game_id}",
+              f"{adapter.attendance_codec.col_end}{attendance_sheet.game_id}",
         params=adapter.DEFAULT_PARAMS, body={"values": [attendance_sheet.to_row_values()]}
     )
 
@@ -106,35 +120,119 @@ def test_insert_bot_event_ok(mapper_mock, bot_event: BotEvent, bot_event_sheet:
         params=adapter.DEFAULT_PARAMS, body={"values": [bot_event_sheet.to_row_values()]})
 
 
-@patch('pururu.infrastructure.adapters.google_sheets.google_sheets_adapter.mapper')
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
 @pytest.mark.usefixtures("attendance", "attendance_sheet")
-def test_get_last_attendance_ok(mapper_mock, attendance: Attendance, attendance_sheet: AttendanceSheet):
+def test_get_last_attendance_ok(attendance: Attendance, attendance_sheet: AttendanceSheet):
     # Given
     adapter = set_up()
-    adapter.spreadsheet.values_get.side_effect = [{'values': []}, {'values': [attendance_sheet.to_row_values()]}]
-    mapper_mock.gs_to_attendance_sheet.return_value = attendance_sheet
-    mapper_mock.sheet_to_attendance.return_value = attendance
+    adapter.spreadsheet.values_get.side_effect = [{'values': [[], [], []]}, {'values': [attendance_sheet.to_row_values()]}]
     # When
     result = adapter.get_last_attendance()
     # Then
-    assert_that(result, equal_to(attendance))
+    assert_that(result.game_id, equal_to(3))
+    assert_that(result.date, equal_to(attendance.date))
+    assert_that(result.event_type, equal_to(attendance.event_type))
+    assert_that([member.member for member in result.members], equal_to(["member1", "member2", "member3"]))
+    adapter.spreadsheet.values_get.assert_called_with(
+        f"{AttendanceSheet.SHEET}!{AttendanceSheet.DATA_COL_INIT}3:{AttendanceSheet.DATA_COL_END}3")
 
 
-@patch('pururu.infrastructure.adapters.google_sheets.google_sheets_adapter.mapper')
-def test_get_all_attendances_ok(mapper_mock, attendance_sheet: AttendanceSheet):
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
+def test_get_last_attendance_short_row():
     # Given
     adapter = set_up()
-    adapter.spreadsheet.values_get.return_value = {
-        'values': [attendance_sheet.to_row_values(), attendance_sheet.to_row_values()]}
-    mapper_mock.gs_to_attendance_sheet.return_value = attendance_sheet
+    adapter.spreadsheet.values_get.side_effect = [{'values': [[], [], []]}, {'values': [["Juegueo Oficial"]]}]
+    # When
+    result = adapter.get_last_attendance()
+    # Then
+    assert_that(result.game_id, equal_to(3))
+    assert_that(result.members, equal_to([]))
+
+
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
+def test_get_all_attendances_ok(attendance_sheet: AttendanceSheet):
+    # Given
+    adapter = set_up()
+    adapter.cache[f'{AttendanceSheet.SHEET}_last_row'] = 5
+    adapter.spreadsheet.values_get.side_effect = [
+        {'values': [[]]},
+        {'values': [attendance_sheet.to_row_values(), attendance_sheet.to_row_values()]}]
     # When
     result = adapter.get_all_attendances()
     # Then
     assert_that(result, has_length(2))
-    assert_that(mapper_mock.gs_to_attendance_sheet.call_count, equal_to(2))
+    assert_that([attendance.game_id for attendance in result],
+                equal_to([AttendanceSheet.DATA_ROW_INIT, AttendanceSheet.DATA_ROW_INIT + 1]))
     adapter.spreadsheet.values_get.assert_called_with(
         f"{AttendanceSheet.SHEET}!{AttendanceSheet.DATA_COL_INIT}{AttendanceSheet.DATA_ROW_INIT}"
-        f":{AttendanceSheet.DATA_COL_END}2")
+        f":{AttendanceSheet.DATA_COL_END}5")
+
+
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "AB"})
+def test_attendance_range_covers_multi_letter_columns():
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.side_effect = [{'values': [[]]}, {'values': []}]
+    # When
+    adapter.get_all_attendances()
+    # Then
+    adapter.spreadsheet.values_get.assert_called_with(
+        f"{AttendanceSheet.SHEET}!{AttendanceSheet.DATA_COL_INIT}{AttendanceSheet.DATA_ROW_INIT}:AD1")
+
+
+@patch("pururu.config.ATTENDANCE_CACHE_TTL", 300)
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
+def test_get_attendance_matrix_is_cached(attendance_sheet: AttendanceSheet):
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.side_effect = [{'values': [[]]}, {'values': [attendance_sheet.to_row_values()]}]
+    # When
+    first = adapter.get_attendance_matrix()
+    second = adapter.get_attendance_matrix()
+    # Then
+    assert_that(second, equal_to(first))
+    assert_that(first.game_ids, equal_to([AttendanceSheet.DATA_ROW_INIT]))
+    assert_that(adapter.spreadsheet.values_get.call_count, equal_to(2))
+
+
+@patch("pururu.config.ATTENDANCE_CACHE_TTL", 300)
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
+def test_load_attendance_matrix_rereads_the_sheet(attendance_sheet: AttendanceSheet):
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.return_value = {'values': [attendance_sheet.to_row_values()]}
+    cached = adapter.get_attendance_matrix()
+    # When
+    actual = adapter.load_attendance_matrix()
+    # Then
+    assert_that(actual is cached, equal_to(False))
+    assert_that(adapter.get_attendance_matrix() is actual, equal_to(True))
+
+
+@patch("pururu.config.ATTENDANCE_CACHE_TTL", 0)
+@patch("pururu.config.GS_ATTENDANCE_PLAYER_MAPPING", {"member1": "C", "member2": "F", "member3": "I"})
+def test_get_attendance_matrix_expired(attendance_sheet: AttendanceSheet):
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.return_value = {'values': [attendance_sheet.to_row_values()]}
+    # When
+    first = adapter.get_attendance_matrix()
+    second = adapter.get_attendance_matrix()
+    # Then
+    assert_that(second is first, equal_to(False))
+
+
+@patch('pururu.infrastructure.adapters.google_sheets.google_sheets_adapter.mapper')
+def test_upsert_attendance_updates_cached_matrix(mapper_mock, attendance: Attendance,
+                                                 attendance_sheet: AttendanceSheet):
+    # Given
+    adapter = set_up()
+    adapter.cache['attendance_matrix'] = AttendanceMatrix()
+    mapper_mock.attendance_to_sheet.return_value = attendance_sheet
+    # When
+    adapter.upsert_attendance(attendance)
+    # Then
+    assert_that(adapter.cache['attendance_matrix'].game_ids, equal_to([attendance.game_id]))
 
 
 def test_get_player_coins_ok():
@@ -150,3 +248,42 @@ def test_get_player_coins_ok():
     adapter.spreadsheet.values_get.assert_called_with(
         f"{CoinsSheet.SHEET}!{CoinsSheet.DATA_COL_INIT}{CoinsSheet.DATA_ROW_INIT}"
         f":{CoinsSheet.DATA_COL_END}{CoinsSheet.DATA_ROW_END}")
+
+
+def test_get_all_player_coins_ok():
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.return_value = {
+        'values': [['member1', 'member2'], ['10', '20']]}
+    # When
+    result = adapter.get_all_player_coins()
+    # Then
+    assert_that(result, equal_to({'member1': 10, 'member2': 20}))
+    adapter.spreadsheet.values_get.assert_called_once_with(
+        f"{CoinsSheet.SHEET}!{CoinsSheet.DATA_COL_INIT}{CoinsSheet.DATA_ROW_INIT}"
+        f":{CoinsSheet.DATA_COL_END}{CoinsSheet.DATA_ROW_END}")
+
+
+def test_sheets_call_metrics():
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.return_value = {'values': [['member1', 'member2'], ['10', '20']]}
+    latency = SHEETS_CALL_LATENCY.labels('get_all_player_coins', CoinsSheet.SHEET)
+    cells = SHEETS_PAYLOAD_CELLS.labels('get_all_player_coins', CoinsSheet.SHEET)
+    calls_before, cells_before = sum(latency.counts), cells.sum
+    # When
+    adapter.get_all_player_coins()
+    # Then
+    assert_that(sum(latency.counts) - calls_before, equal_to(1))
+    assert_that(cells.sum - cells_before, equal_to(4))
+
+
+def test_sheets_call_error_metrics():
+    # Given
+    adapter = set_up()
+    adapter.spreadsheet.values_get.side_effect = ConnectionError("timeout")
+    errors = SHEETS_CALL_ERRORS.labels('get_all_player_coins', CoinsSheet.SHEET)
+    errors_before = errors.value
+    # When-Then
+    assert_that(calling(adapter.get_all_player_coins), raises(ConnectionError))
+    assert_that(errors.value - errors_before, equal_to(1))
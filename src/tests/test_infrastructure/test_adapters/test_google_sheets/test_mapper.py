@@ -77,6 +77,61 @@ def test_gs_to_attendance_sheet_empty_motive_column(attendance_sheet: Attendance
     assert_that(actual.description, equal_to(attendance_sheet.description))
 
 
+@pytest.mark.usefixtures("attendance_sheet", "attendance")
+def test_attendance_row_codec_decode(attendance_sheet: AttendanceSheet, attendance: Attendance):
+    codec = mapper.compile_attendance_codec({"member1": "C", "member2": "F", "member3": "I"})
+    actual = codec.decode(attendance.game_id, attendance_sheet.to_row_values())
+    assert_that(actual.game_id, equal_to(attendance.game_id))
+    for idx, member in enumerate(attendance.members):
+        assert_that(actual.members[idx].member, equal_to(member.member))
+        assert_that(actual.members[idx].attendance, equal_to(member.attendance))
+        assert_that(actual.members[idx].justified, equal_to(member.justified))
+        assert_that(actual.members[idx].motive, equal_to(member.motive))
+    assert_that(actual.date, equal_to(attendance.date))
+    assert_that(actual.event_type, equal_to(attendance.event_type))
+
+
+@pytest.mark.usefixtures("attendance_sheet")
+def test_attendance_row_codec_decode_rows_empty_motive_column(attendance_sheet: AttendanceSheet):
+    codec = mapper.compile_attendance_codec({"member1": "C", "member2": "F", "member3": "I"})
+    row = attendance_sheet.to_row_values()
+    row.pop()
+    actual = codec.decode_rows(4, [row, ["unknown type", "2023-08-11"] + ["TRUE", "TRUE", ""] * 3])
+    assert_that([attendance.game_id for attendance in actual], equal_to([4, 5]))
+    assert_that(actual[0].members[2].motive, equal_to(""))
+    assert_that(actual[1].event_type, equal_to(AttendanceEventType.UNKNOWN))
+    assert_that([member.attendance for member in actual[1].members], equal_to([False, False, False]))
+
+
+@pytest.mark.usefixtures("attendance_sheet")
+def test_attendance_row_codec_decode_rows_gap_row(attendance_sheet: AttendanceSheet):
+    codec = mapper.compile_attendance_codec({"member1": "C", "member2": "F", "member3": "I"})
+    row = attendance_sheet.to_row_values()
+    # Game 5 was never written (an empty row) and game 6 only has its description
+    actual = codec.decode_rows(4, [row, [], ["Juegueo Oficial"], row])
+    assert_that([attendance.game_id for attendance in actual], equal_to([4, 7]))
+    assert_that(codec.decode(5, []), equal_to(None))
+    assert_that(codec.decode(6, row[:7]), equal_to(None))
+
+
+@pytest.mark.parametrize("mapping, expected", [
+    ({}, "Q"),
+    ({"member1": "C", "member2": "F"}, "Q"),
+    ({"member1": "C", "member2": "Z"}, "AB"),
+])
+def test_compile_attendance_codec_col_end(mapping: dict, expected: str):
+    assert_that(mapper.compile_attendance_codec(mapping).col_end, equal_to(expected))
+
+
+def test_gs_to_player_coins():
+    actual = mapper.gs_to_player_coins([["member1", "member2", "member3"], ["10", "", "abc"]])
+    assert_that(actual, equal_to({"member1": 10, "member2": 0, "member3": 0}))
+
+
+def test_gs_to_player_coins_empty():
+    assert_that(mapper.gs_to_player_coins([]), equal_to({}))
+
+
 def test_parse_str_to_bool():
     assert_that(mapper.__parse_str_to_bool('FALSE'))
     assert_that(mapper.__parse_str_to_bool('TRUE'), is_not(True))
@@ -87,12 +142,14 @@ def test_parse_bool_to_str():
     assert_that(mapper.__parse_bool_to_str(False), equal_to("TRUE"))
 
 
-def test_column_to_index():
-    assert_that(mapper.__column_to_index("F"), equal_to(5))
+@pytest.mark.parametrize("col, idx", [("A", 0), ("F", 5), ("Z", 25), ("AA", 26), ("ab", 27), ("AZ", 51), ("BA", 52)])
+def test_column_to_index(col: str, idx: int):
+    assert_that(mapper.__column_to_index(col), equal_to(idx))
 
 
-def test_index_to_column():
-    assert_that(mapper.__index_to_column(5), equal_to("F"))
+@pytest.mark.parametrize("idx, col", [(0, "A"), (5, "F"), (25, "Z"), (26, "AA"), (27, "AB"), (51, "AZ"), (52, "BA")])
+def test_index_to_column(idx: int, col: str):
+    assert_that(mapper.__index_to_column(idx), equal_to(col))
 
 
 def test_map_attendance_event_type_ok():
@@ -0,0 +1,25 @@
+import aiohttp
+import pytest
+from hamcrest import assert_that, equal_to, contains_string
+
+from pururu.infrastructure.adapters.metrics.metrics_server import MetricsServer
+from pururu.metrics import MetricsRegistry
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    # Given
+    registry = MetricsRegistry()
+    registry.counter('events_total', 'Events').inc()
+    server = MetricsServer(registry, '127.0.0.1', 0)
+    await server.start()
+    port = server.runner.addresses[0][1]
+    # When
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+            status, content_type, body = response.status, response.headers['Content-Type'], await response.text()
+    await server.stop()
+    # Then
+    assert_that(status, equal_to(200))
+    assert_that(content_type, contains_string('version=0.0.4'))
+    assert_that(body, contains_string('events_total 1\n'))
@@ -0,0 +1,29 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from hamcrest import assert_that, equal_to
+
+import pururu.tracing as tracing
+from pururu.domain.entities import Attendance
+from pururu.infrastructure.adapters.tracing.traced_database import TracedDatabase
+from tests.test_domain.test_entities import attendance
+from tests.test_tracing import MemoryExporter
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+@pytest.mark.usefixtures("attendance")
+def test_traced_database_calls(attendance: Attendance):
+    # Given
+    database_service = Mock()
+    database_service.get_last_attendance.return_value = attendance
+    traced_database = TracedDatabase(database_service)
+    exporter = MemoryExporter()
+    # When
+    with patch.object(tracing.TRACER, 'exporter', exporter):
+        actual = traced_database.get_last_attendance()
+        traced_database.upsert_attendance(attendance)
+    # Then
+    assert_that(actual, equal_to(attendance))
+    database_service.upsert_attendance.assert_called_once_with(attendance)
+    assert_that([span.name for span in exporter.spans], equal_to(["db:get_last_attendance", "db:upsert_attendance"]))
+    assert_that(exporter.spans[1].attributes, equal_to({"game_id": attendance.game_id}))
@@ -0,0 +1,42 @@
+import threading
+
+from hamcrest import assert_that, equal_to, contains_string, greater_than
+
+from pururu.infrastructure.profiling.sampling_profiler import SamplingProfiler, ProfileReport
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_report_aggregation():
+    # Given
+    report = ProfileReport(1.0, 3)
+    # When
+    report.add_stack("MainThread", ["main", "handle", "values_get"])
+    report.add_stack("MainThread", ["main", "handle", "values_get"])
+    report.add_stack("Thread-1", ["run", "handle"])
+    # Then
+    assert_that(report.collapsed_stacks(), equal_to("MainThread;main;handle;values_get 2\n"
+                                                    "Thread-1;run;handle 1\n"))
+    assert_that(report.self_counts, equal_to({"values_get": 2, "handle": 1}))
+    assert_that(report.total_counts["handle"], equal_to(3))
+    assert_that(report.top_functions(), contains_string("  66.7%   66.7%  values_get\n  33.3%  100.0%  handle"))
+
+
+def test_profiler_samples_other_threads():
+    # Given
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name="busy-thread")
+    thread.start()
+    # When
+    report = SamplingProfiler(interval=0.001).run(0.1)
+    stop.set()
+    thread.join()
+    # Then
+    assert_that(report.samples, greater_than(0))
+    busy_stacks = [stack for stack in report.stacks if stack.startswith("busy-thread;")]
+    assert_that(len(busy_stacks), greater_than(0))
+    assert_that(busy_stacks[0], contains_string("busy_loop (test_sampling_profiler.py:"))
+    assert_that(any(stack.startswith("MainThread;") for stack in report.stacks), equal_to(False))
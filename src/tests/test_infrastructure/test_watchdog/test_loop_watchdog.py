@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import time
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import assert_that, equal_to
+
+from pururu.application.services.pururu_handler import PururuHandler
+from pururu.infrastructure.watchdog.loop_watchdog import LoopWatchdog, find_culprit, LOOP_STALLS
+
+
+def set_up(side_effect) -> PururuHandler:
+    domain_service = Mock()
+    domain_service.calculate_player_stats.side_effect = side_effect
+    return PururuHandler(domain_service, Mock())
+
+
+def test_find_culprit_handler_call():
+    # Given
+    handler = set_up(lambda player, stats_filter: find_culprit(sys._getframe()))
+    # When
+    actual = handler.retrieve_player_stats("member1")
+    # Then
+    assert_that(actual, equal_to("PururuHandler.retrieve_player_stats"))
+
+
+def test_find_culprit_outside_pururu():
+    # When
+    actual = find_culprit(sys._getframe())
+    # Then
+    assert_that(actual, equal_to("unknown"))
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocking_call():
+    # Given
+    handler = set_up(lambda player, stats_filter: time.sleep(0.5))
+    stalls = LOOP_STALLS.labels("PururuHandler.retrieve_player_stats")
+    stalls_before = stalls.value
+    watchdog = LoopWatchdog(interval=0.05, threshold=0.1)
+    watchdog.logger = Mock()
+    watchdog.start()
+    await asyncio.sleep(0.1)
+    # When
+    handler.retrieve_player_stats("member1")
+    await asyncio.sleep(0.1)
+    watchdog.stop()
+    # Then
+    assert_that(stalls.value - stalls_before, equal_to(1))
+    assert_that(watchdog.stall_reported, equal_to(False))
+    assert_that(watchdog.logger.warning.call_count, equal_to(2))
+
+
+def test_watchdog_check_not_blocked():
+    # Given
+    watchdog = LoopWatchdog(interval=0.05, threshold=0.1)
+    watchdog.last_beat = time.monotonic()
+    # When-Then
+    assert_that(watchdog.check(), equal_to(None))
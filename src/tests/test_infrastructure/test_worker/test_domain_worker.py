@@ -0,0 +1,244 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, equal_to, calling, raises, none, not_none, contains_string
+
+from pururu.domain.exceptions import CannotStartNewGame, GameEndedWithoutPrecondition
+from pururu.domain.services.pururu_service import PururuService
+from pururu.infrastructure.worker.domain_worker import DomainServiceProxy, DomainWorker, DomainWorkerError, \
+    DomainWorkerOverloaded, DomainWorkerUnavailable, serve, STOP, PING
+
+
+class ThreadWorker:
+    """
+    DomainWorker test double serving the requests in a thread instead of a process
+    """
+
+    def __init__(self, service, maxsize: int = 10):
+        self.service = service
+        self.requests = queue.Queue(maxsize=maxsize)
+        self.responses = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=serve, args=(self.service, self.requests, self.responses), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.requests.put(STOP)
+        self.thread.join(1)
+
+    def close(self):
+        pass
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def queue_size(self):
+        return self.requests.qsize()
+
+
+def build_fake_service() -> PururuService:
+    return PururuService(Mock())
+
+
+def set_up(service=None, maxsize: int = 10) -> DomainServiceProxy:
+    proxy = DomainServiceProxy(ThreadWorker(service or Mock(), maxsize))
+    proxy.start()
+    return proxy
+
+
+def test_serve_ok():
+    # Given
+    service = Mock()
+    service.add_player.return_value = True
+    requests, responses = queue.Queue(), queue.Queue()
+    requests.put((1, "add_player", ("member1",), {"time": None}))
+    requests.put((None, "register_bot_event", ("event",), {}))
+    requests.put((2, PING, (), {}))
+    requests.put(STOP)
+    # When
+    serve(service, requests, responses)
+    # Then
+    assert_that(responses.get_nowait(), equal_to((1, True, True)))
+    assert_that(responses.get_nowait(), equal_to((2, True, True)))
+    assert_that(responses.empty(), equal_to(True))
+    service.add_player.assert_called_once_with("member1", time=None)
+    service.register_bot_event.assert_called_once_with("event")
+
+
+def test_serve_wraps_unexpected_errors():
+    # Given
+    service = Mock()
+    service.end_game.side_effect = KeyError("boom")
+    requests, responses = queue.Queue(), queue.Queue()
+    requests.put((1, "end_game", (), {}))
+    requests.put(STOP)
+    # When
+    serve(service, requests, responses)
+    # Then
+    request_id, ok, result = responses.get_nowait()
+    assert_that(ok, equal_to(False))
+    assert_that(type(result), equal_to(DomainWorkerError))
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_proxy_call_ok():
+    # Given
+    service = Mock()
+    service.add_player.return_value = True
+    proxy = set_up(service)
+    # When
+    actual = proxy.add_player("member1", datetime(2023, 8, 10, 10))
+    # Then
+    assert_that(actual, equal_to(True))
+    service.add_player.assert_called_once_with("member1", datetime(2023, 8, 10, 10))
+    proxy.stop()
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_proxy_call_raises_domain_exceptions():
+    # Given
+    service = Mock()
+    service.start_new_game.side_effect = CannotStartNewGame("Cannot start new game")
+    proxy = set_up(service)
+    # When-Then
+    assert_that(calling(proxy.start_new_game).with_args(datetime(2023, 8, 10, 10)), raises(CannotStartNewGame))
+    proxy.stop()
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_proxy_fire_and_forget():
+    # Given
+    service = Mock()
+    proxy = set_up(service)
+    # When
+    actual = proxy.register_bot_event("event")
+    proxy.get_session_info()
+    # Then
+    assert_that(actual, none())
+    service.register_bot_event.assert_called_once_with("event")
+    proxy.stop()
+
+
+def test_proxy_unknown_attribute():
+    # Given
+    proxy = DomainServiceProxy(ThreadWorker(Mock()))
+    # When-Then
+    assert_that(calling(getattr).with_args(proxy, "current_session"), raises(AttributeError))
+    assert_that(calling(getattr).with_args(proxy, "_PururuService__get_new_game_id"), raises(AttributeError))
+
+
+@patch("pururu.config.DOMAIN_WORKER_TIMEOUT", 0.05)
+def test_proxy_backpressure():
+    # Given
+    proxy = DomainServiceProxy(ThreadWorker(Mock(), maxsize=1))
+    proxy.worker.requests.put((None, "get_session_info", (), {}))
+    # When-Then
+    assert_that(calling(proxy.get_session_info), raises(DomainWorkerOverloaded))
+    proxy.register_bot_event("event")
+    assert_that(proxy.worker.requests.qsize(), equal_to(1))
+
+
+@patch("pururu.config.DOMAIN_WORKER_TIMEOUT", 0.05)
+def test_proxy_worker_not_answering():
+    # Given
+    proxy = DomainServiceProxy(ThreadWorker(Mock()))
+    # When-Then
+    assert_that(calling(proxy.get_session_info), raises(DomainWorkerUnavailable))
+    assert_that(proxy.pending, equal_to({}))
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_health_check_ok():
+    # Given
+    proxy = set_up()
+    # When
+    actual = proxy.health_check()
+    # Then
+    assert_that(actual.alive, equal_to(True))
+    assert_that(actual.latency, not_none())
+    assert_that(actual.queue_size, equal_to(0))
+    proxy.stop()
+
+
+def test_health_check_worker_down():
+    # Given
+    proxy = DomainServiceProxy(ThreadWorker(Mock()))
+    # When
+    actual = proxy.health_check()
+    # Then
+    assert_that(actual.alive, equal_to(False))
+    assert_that(actual.latency, none())
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_proxy_stop_joins_its_threads():
+    # Given
+    proxy = set_up()
+    # When
+    proxy.stop()
+    # Then
+    assert_that(proxy.dispatcher.is_alive(), equal_to(False))
+    assert_that(proxy.monitor.is_alive(), equal_to(False))
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+@patch("pururu.config.CHANNEL_SESSIONS", True)
+def test_proxy_mirrors_the_sessions():
+    # Given
+    service = Mock()
+    service.start_new_game.return_value = Mock(game_id=7)
+    service.end_game.side_effect = GameEndedWithoutPrecondition("Attendance not enough")
+    proxy = set_up(service)
+    # When
+    proxy.add_player("member1", datetime(2023, 8, 10, 10), "General")
+    proxy.add_player("member2", datetime(2023, 8, 10, 10), channel="Other")
+    proxy.start_new_game(datetime(2023, 8, 10, 10), "General")
+    proxy.remove_player("member2", datetime(2023, 8, 10, 11), "Other")
+    # Then
+    assert_that([str(session) for session in proxy.sessions.values()],
+                equal_to(["General (game 7, players ['member1'])"]))
+    # When
+    assert_that(calling(proxy.end_game).with_args(datetime(2023, 8, 10, 11), "General"),
+                raises(GameEndedWithoutPrecondition))
+    # Then
+    assert_that(proxy.sessions, equal_to({}))
+    proxy.stop()
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 0.01)
+def test_monitor_logs_the_lost_sessions():
+    # Given
+    proxy = set_up(build_fake_service())
+    proxy.logger = Mock()
+    proxy.add_player("member1", datetime(2023, 8, 10, 10))
+    # When
+    proxy.worker.stop()
+    for _ in range(100):
+        if proxy.logger.error.called:
+            break
+        time.sleep(0.01)
+    # Then
+    message = proxy.logger.error.call_args.args[0] % proxy.logger.error.call_args.args[1:]
+    assert_that(message, contains_string("lost sessions: default (game None, players ['member1'])"))
+    assert_that(proxy.sessions, equal_to({}))
+    proxy.stop()
+
+
+@patch("pururu.config.DOMAIN_WORKER_HEALTH_INTERVAL", 60)
+def test_domain_worker_process_round_trip():
+    # Given
+    proxy = DomainServiceProxy(DomainWorker(build_fake_service))
+    proxy.start()
+    # When
+    should_start = proxy.add_player("member1", datetime(2023, 8, 10, 10))
+    session_info = proxy.get_session_info()
+    # Then
+    assert_that(should_start, equal_to(False))
+    assert_that(session_info.players, equal_to(["member1"]))
+    proxy.stop()
+    assert_that(proxy.worker.is_alive(), equal_to(False))
@@ -0,0 +1,82 @@
+from hamcrest import assert_that, equal_to, calling, raises, contains_string, same_instance
+
+from pururu.metrics import MetricsRegistry
+
+
+def test_counter_render():
+    # Given
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', 'Events', ('event_type',))
+    # When
+    counter.labels('JOINED').inc()
+    counter.labels('JOINED').inc(2)
+    counter.labels('LEFT').inc()
+    # Then
+    assert_that(registry.render(), equal_to('# HELP events_total Events\n'
+                                            '# TYPE events_total counter\n'
+                                            'events_total{event_type="JOINED"} 3\n'
+                                            'events_total{event_type="LEFT"} 1\n'))
+
+
+def test_gauge_without_labels():
+    # Given
+    registry = MetricsRegistry()
+    gauge = registry.gauge('pending', 'Pending events')
+    # When
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    # Then
+    assert_that(registry.render(), contains_string('\npending 1\n'))
+    gauge.set(0.5)
+    assert_that(registry.render(), contains_string('\npending 0.5\n'))
+
+
+def test_histogram_render():
+    # Given
+    registry = MetricsRegistry()
+    histogram = registry.histogram('call_seconds', 'Calls', ('method',), buckets=(0.1, 1))
+    # When
+    histogram.labels('get').observe(0.05)
+    histogram.labels('get').observe(0.1)
+    histogram.labels('get').observe(3)
+    # Then
+    assert_that(registry.render(), equal_to('# HELP call_seconds Calls\n'
+                                            '# TYPE call_seconds histogram\n'
+                                            'call_seconds_bucket{method="get",le="0.1"} 2\n'
+                                            'call_seconds_bucket{method="get",le="1"} 2\n'
+                                            'call_seconds_bucket{method="get",le="+Inf"} 3\n'
+                                            'call_seconds_sum{method="get"} 3.15\n'
+                                            'call_seconds_count{method="get"} 3\n'))
+
+
+def test_histogram_time():
+    # Given
+    registry = MetricsRegistry()
+    histogram = registry.histogram('block_seconds', 'Blocks')
+    # When
+    with histogram.time():
+        pass
+    # Then
+    assert_that(histogram.labels().counts[0], equal_to(1))
+    assert_that(registry.render(), contains_string('block_seconds_bucket{le="0.001"} 1\n'))
+
+
+def test_label_values_escaped():
+    # Given
+    registry = MetricsRegistry()
+    counter = registry.counter('names_total', 'Names', ('name',))
+    # When
+    counter.labels('a"b\\c').inc()
+    # Then
+    assert_that(registry.render(), contains_string('names_total{name="a\\"b\\\\c"} 1\n'))
+
+
+def test_register_twice():
+    # Given
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', 'Events', ('event_type',))
+    # When-Then
+    assert_that(registry.counter('events_total', 'Events', ('event_type',)), same_instance(counter))
+    assert_that(calling(registry.gauge).with_args('events_total', 'Events', ('event_type',)), raises(ValueError))
+    assert_that(calling(counter.labels).with_args('JOINED', 'extra'), raises(ValueError))
@@ -0,0 +1,74 @@
+from hamcrest import assert_that, equal_to, none, contains_string, greater_than_or_equal_to
+
+from pururu.startup import StartupTimer, STARTUP_PHASE, BOOT_PHASES, boot_phase
+
+
+def test_phase_recorded():
+    # Given
+    timer = StartupTimer()
+    # When
+    with timer.phase("auth"):
+        pass
+    # Then
+    start, end = timer.phases["auth"]
+    assert_that(end, greater_than_or_equal_to(start))
+    assert_that(timer.elapsed("auth"), equal_to(end))
+    assert_that(STARTUP_PHASE.labels("auth").value, equal_to(end - start))
+
+
+def test_phase_recorded_on_error():
+    # Given
+    timer = StartupTimer()
+    # When
+    try:
+        with timer.phase("auth"):
+            raise ValueError("invalid credentials")
+    except ValueError:
+        pass
+    # Then
+    assert_that(timer.elapsed("auth"), greater_than_or_equal_to(0))
+
+
+def test_mark_keeps_first():
+    # Given
+    timer = StartupTimer(0)
+    timer.record("ready", 1, 1)
+    # When
+    timer.mark("ready")
+    # Then
+    assert_that(timer.elapsed("ready"), equal_to(1))
+    assert_that(timer.elapsed("sync"), none())
+
+
+def test_repeated_phase_merged():
+    # Given
+    timer = StartupTimer(0)
+    timer.record("auth", 0.5, 1.5)
+    # When
+    timer.record("auth", 1.5, 1.75)
+    # Then
+    assert_that(timer.phases["auth"], equal_to((0.5, 1.75)))
+    assert_that(STARTUP_PHASE.labels("auth").value, equal_to(1.25))
+
+
+def test_report():
+    # Given
+    timer = StartupTimer(10)
+    timer.record("auth", 10.5, 12)
+    timer.record("import", 10, 10.5)
+    timer.record("ready", 13.25, 13.25)
+    # When
+    actual = timer.report()
+    # Then
+    assert_that(actual, equal_to("import 0.00-0.50s, auth 0.50-2.00s, ready at 3.25s"))
+
+
+def test_boot_phases():
+    # Given
+    with boot_phase("config"):
+        pass
+    # When
+    timer = StartupTimer(0, BOOT_PHASES)
+    # Then
+    assert_that(timer.phases["config"], equal_to(BOOT_PHASES["config"]))
+    assert_that(StartupTimer(0).elapsed("config"), none())
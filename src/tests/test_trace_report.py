@@ -0,0 +1,54 @@
+import json
+
+from hamcrest import assert_that, equal_to, contains_string
+
+from pururu.trace_report import critical_path, load_traces, main
+
+
+def build_span(name: str, span_id: str, parent_id: str | None, start: float, end: float, **attributes) -> dict:
+    return {"name": name, "trace_id": "trace1", "span_id": span_id, "parent_id": parent_id, "start": start,
+            "end": end, "attributes": attributes}
+
+
+def game_start_spans() -> list[dict]:
+    return [
+        build_span("discord:voice_state_update", "root", None, 0.0, 1.0, member="member1"),
+        build_span("emit:member_joined_channel", "join", "root", 0.1, 0.9),
+        build_span("db:insert_bot_event", "bot_event", "root", 0.9, 1.0),
+        build_span("delay:attendance_check", "delay", "join", 0.5, 120.5, delay=120),
+        build_span("emit:new_game_intent", "intent", "delay", 120.5, 123.5),
+        build_span("db:get_last_attendance", "last", "intent", 120.5, 122.5),
+        build_span("emit:game_started", "started", "intent", 122.5, 123.0, game_id=42),
+    ]
+
+
+def test_critical_path():
+    # Given
+    spans = game_start_spans()
+    # When
+    actual = critical_path(spans)
+    # Then
+    assert_that([(span["name"], round(self_time, 3)) for span, self_time in actual], equal_to([
+        ("discord:voice_state_update", 0.1),
+        ("emit:member_joined_channel", 0.4),
+        ("delay:attendance_check", 120.0),
+        ("emit:new_game_intent", 0.5),
+        ("db:get_last_attendance", 2.0),
+        ("emit:game_started", 0.5),
+    ]))
+    assert_that(round(sum(self_time for _, self_time in actual), 3), equal_to(123.5))
+
+
+def test_main_report(tmp_path, capsys):
+    # Given
+    path = tmp_path / "traces.jsonl"
+    other_game = [dict(span, trace_id="trace2", attributes={"game_id": 7}) for span in game_start_spans()[:1]]
+    path.write_text("\n".join(json.dumps(span) for span in game_start_spans() + other_game) + "\n")
+    # When
+    main([str(path), "42"])
+    # Then
+    output = capsys.readouterr().out
+    assert_that(output, contains_string("game 42 - trace trace1 (discord:voice_state_update): 123.500s"))
+    assert_that(output, contains_string("delay 120.000s (97%)"))
+    assert_that(len(load_traces(str(path))), equal_to(2))
+    assert_that("game 7" in output, equal_to(False))
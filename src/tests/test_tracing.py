@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+from hamcrest import assert_that, equal_to, none, calling, raises, not_none
+
+from pururu.tracing import Tracer, SpanContext, current_context
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def set_up() -> tuple[Tracer, MemoryExporter]:
+    exporter = MemoryExporter()
+    return Tracer(exporter), exporter
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+def test_nested_spans():
+    # Given
+    tracer, exporter = set_up()
+    # When
+    with tracer.span("discord:voice_state_update", member="member1") as root:
+        with tracer.span("db:get_last_attendance") as child:
+            actual = current_context()
+    # Then
+    assert_that(actual, equal_to(child.context()))
+    assert_that([span.name for span in exporter.spans], equal_to(["db:get_last_attendance",
+                                                                  "discord:voice_state_update"]))
+    assert_that(child.trace_id, equal_to(root.trace_id))
+    assert_that(child.parent_id, equal_to(root.span_id))
+    assert_that(root.parent_id, none())
+    assert_that(root.attributes, equal_to({"member": "member1"}))
+    assert_that(current_context(), none())
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+def test_span_explicit_parent():
+    # Given
+    tracer, exporter = set_up()
+    parent = SpanContext("trace", "parent")
+    # When
+    with tracer.span("emit:game_started", parent):
+        pass
+    # Then
+    assert_that(exporter.spans[0].trace_id, equal_to("trace"))
+    assert_that(exporter.spans[0].parent_id, equal_to("parent"))
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+def test_span_records_errors():
+    # Given
+    tracer, exporter = set_up()
+
+    def failing_call():
+        with tracer.span("db:upsert_attendance"):
+            raise ConnectionError("timeout")
+
+    # When-Then
+    assert_that(calling(failing_call), raises(ConnectionError))
+    assert_that(exporter.spans[0].attributes, equal_to({"error": "ConnectionError: timeout"}))
+    assert_that(exporter.spans[0].end, not_none())
+
+
+@patch("pururu.config.TRACING_ENABLED", True)
+def test_record():
+    # Given
+    tracer, exporter = set_up()
+    parent = SpanContext("trace", "parent")
+    # When
+    actual = tracer.record("delay:attendance_check", parent, 10.0, 130.0, delay=120)
+    # Then
+    span = exporter.spans[0]
+    assert_that(actual, equal_to(span.context()))
+    assert_that((span.start, span.end, span.parent_id), equal_to((10.0, 130.0, "parent")))
+
+
+@patch("pururu.config.TRACING_ENABLED", False)
+def test_tracing_disabled():
+    # Given
+    tracer, exporter = set_up()
+    # When
+    with tracer.span("discord:voice_state_update") as span:
+        context = current_context()
+    recorded = tracer.record("delay:concurrency", None, 0, 1)
+    # Then
+    assert_that(span, none())
+    assert_that(context, none())
+    assert_that(recorded, none())
+    assert_that(exporter.spans, equal_to([]))
@@ -1,20 +1,116 @@
 import logging
-from datetime import datetime
+import queue
+from datetime import datetime, date
 from unittest.mock import patch
 
 from freezegun import freeze_time
+import pytest
 from hamcrest import assert_that, equal_to
 
+import pururu.config as config
 import pururu.utils as utils
 
 
-@patch("pururu.config.LOG_LEVEL", "DEBUG")
 def test_get_logger():
     # Given-When
     actual = utils.get_logger("name")
     # Then
     assert_that(actual.name, equal_to("name"))
-    assert_that(actual.getEffectiveLevel(), equal_to(logging.DEBUG))
+    assert_that(actual.getEffectiveLevel(), equal_to(logging.getLevelName(config.LOG_LEVEL)))
+
+
+def test_get_logger_configures_once():
+    # Given
+    utils.get_logger("name")
+    handlers = list(logging.getLogger().handlers)
+    # When
+    utils.get_logger("other")
+    # Then
+    assert_that(logging.getLogger().handlers, equal_to(handlers))
+    assert_that(len([handler for handler in handlers if type(handler) is utils.LazyQueueHandler]), equal_to(1))
+
+
+def test_configure_logging_force():
+    # Given
+    with patch("pururu.config.LOG_LEVEL", "DEBUG"):
+        # When
+        utils.configure_logging(force=True)
+        # Then
+        assert_that(utils.get_logger("name").getEffectiveLevel(), equal_to(logging.DEBUG))
+    utils.configure_logging(force=True)
+    assert_that(utils.get_logger("name").getEffectiveLevel(), equal_to(logging.getLevelName(config.LOG_LEVEL)))
+
+
+def build_record(msg: str = "Player %s clock in", args: tuple = ("member1",)) -> logging.LogRecord:
+    return logging.LogRecord("name", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_lazy_queue_handler_merges_args_only():
+    # Given
+    log_queue = queue.SimpleQueue()
+    handler = utils.LazyQueueHandler(log_queue)
+    players = ["member1"]
+    record = build_record("Players %s", (players,))
+    # When
+    handler.emit(record)
+    players.append("member2")
+    # Then
+    actual = log_queue.get_nowait()
+    assert_that(actual.msg, equal_to("Players ['member1']"))
+    assert_that(actual.args, equal_to(None))
+    assert_that(hasattr(actual, "asctime"), equal_to(False))
+
+
+def test_rate_limit_filter_burst():
+    # Given
+    rate_limit = utils.RateLimitFilter(interval=60, burst=2)
+    # When
+    actual = [rate_limit.filter(build_record(args=(f"member{i}",))) for i in range(4)]
+    # Then
+    assert_that(actual, equal_to([True, True, False, False]))
+    assert_that(rate_limit.filter(build_record("Another %s")), equal_to(True))
+
+
+def test_rate_limit_filter_reports_suppressed():
+    # Given
+    rate_limit = utils.RateLimitFilter(interval=60, burst=1)
+    with freeze_time("2021-09-01 12:00:00") as frozen:
+        rate_limit.filter(build_record())
+        rate_limit.filter(build_record())
+        rate_limit.filter(build_record())
+        frozen.tick(61)
+        record = build_record()
+        # When
+        actual = rate_limit.filter(record)
+    # Then
+    assert_that(actual, equal_to(True))
+    assert_that(record.getMessage(), equal_to("Player member1 clock in (2 similar messages suppressed)"))
+
+
+def test_rate_limit_filter_evicts_expired_windows():
+    # Given
+    with freeze_time("2021-09-01 12:00:00") as frozen:
+        rate_limit = utils.RateLimitFilter(interval=60, burst=1)
+        for i in range(100):
+            rate_limit.filter(build_record(f"Message {i}"))
+        rate_limit.filter(build_record())
+        rate_limit.filter(build_record())
+        frozen.tick(61)
+        # When
+        rate_limit.filter(build_record("Another %s"))
+        windows_after_interval = len(rate_limit.windows)
+        frozen.tick(60)
+        rate_limit.filter(build_record("Another %s"))
+    # Then
+    assert_that(windows_after_interval, equal_to(2))
+    assert_that(len(rate_limit.windows), equal_to(1))
+
+
+def test_rate_limit_filter_disabled():
+    # Given
+    rate_limit = utils.RateLimitFilter(interval=0, burst=1)
+    # When-Then
+    assert_that(all(rate_limit.filter(build_record()) for _ in range(5)), equal_to(True))
 
 
 @freeze_time("2021-09-01 12:00:00")
@@ -41,3 +137,18 @@ def test_parse_time():
     actual = utils.parse_time(time)
     # Then
     assert_that(actual, equal_to(datetime(2021, 9, 1, 12)))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2021-09-01 12:00:00", date(2021, 9, 1)),
+    ("2021-09-01", date(2021, 9, 1)),
+    ("01/09/2021 12:00:00", date(2021, 9, 1)),
+    ("01/09/2021", date(2021, 9, 1)),
+    ("not a date", None),
+    (None, None),
+])
+def test_parse_date(value: str, expected: date):
+    # Given-When
+    actual = utils.parse_date(value)
+    # Then
+    assert_that(actual, equal_to(expected))